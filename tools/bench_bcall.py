@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+# Copyright(C) 2010-2014 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Measure the time needed by BackendsCall to deliver every result of fast
+backends, compared to the former consumer which polled the responses
+every 0.1 second.
+
+Usage: bench_bcall.py [-n CALLS] [-b BACKENDS] [-i ITEMS] [-d DELAY]
+"""
+
+from __future__ import print_function
+
+import argparse
+import time
+from threading import RLock
+try:
+    import Queue
+except ImportError:
+    import queue as Queue
+
+from weboob.core.bcall import BackendsCall
+from weboob.core.workers import WorkerPool
+
+
+class FakeBackend(object):
+    def __init__(self, name, items, delay):
+        self.name = name
+        self.items = items
+        self.delay = delay
+        self.lock = RLock()
+
+    def __enter__(self):
+        self.lock.acquire()
+
+    def __exit__(self, t, v, tb):
+        self.lock.release()
+
+    def iter_items(self):
+        # simulate a fast website: one request to get items, then a last
+        # one to find there is no next page.
+        time.sleep(self.delay)
+        for i in range(self.items):
+            yield i
+        time.sleep(self.delay)
+
+
+class PollingBackendsCall(BackendsCall):
+    def __init__(self, *args, **kwargs):
+        self.queue = Queue.Queue()
+        super(PollingBackendsCall, self).__init__(*args, **kwargs)
+
+    def store_result(self, backend, result):
+        self.queue.put(result)
+
+
+def consume_polling(call):
+    # Behaviour of BackendsCall.__iter__ before it was event-driven: wait
+    # at most 0.1 second for a result, then check whether backends are
+    # finished.
+    while call.pending or not call.queue.empty():
+        try:
+            yield call.queue.get(timeout=0.1)
+        except Queue.Empty:
+            continue
+
+
+def bench(klass, consume, calls, backends, items, delay, workers):
+    durations = []
+    for _ in range(calls):
+        start = time.time()
+        call = klass([FakeBackend('b%d' % i, items, delay) for i in range(backends)], 'iter_items', workers=workers)
+        count = sum(1 for _ in consume(call))
+        durations.append(time.time() - start)
+        assert count == backends * items
+
+    durations.sort()
+    return sum(durations) / len(durations), durations[len(durations) // 2], durations[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark BackendsCall time-to-completion.')
+    parser.add_argument('-n', '--calls', type=int, default=50)
+    parser.add_argument('-b', '--backends', type=int, default=10)
+    parser.add_argument('-i', '--items', type=int, default=10)
+    parser.add_argument('-d', '--delay', type=float, default=0.005, help='duration of a backend call, in seconds')
+    args = parser.parse_args()
+
+    workers = WorkerPool(name='bench')
+    for label, klass, consume in (('polling (0.1s)', PollingBackendsCall, consume_polling),
+                                  ('event-driven', BackendsCall, iter)):
+        mean, median, worst = bench(klass, consume, args.calls, args.backends, args.items, args.delay, workers)
+        print('%-16s mean=%.2fms median=%.2fms max=%.2fms' % (label, mean * 1000, median * 1000, worst * 1000))
+    workers.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+
+# Copyright(C) 2010-2014 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Measure the startup time of "weboob bank" compared to "boobank", with the
+applications manifest of the launcher up to date (warm) or missing (cold,
+i.e. every application is imported as before the manifest).
+
+Each command is run with --help and exits once the application is set up.
+Repositories are the local modules of this tree, so no network access is
+needed.
+
+Usage: bench_launcher.py [-n RUNS] [CAPABILITY [APPLICATION]]
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+
+PROJECT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir))
+
+
+def run(args, env, runs, before=None):
+    durations = []
+    for _ in range(runs):
+        if before:
+            before()
+        start = time.time()
+        # When several applications provide the capability, choose the
+        # first one.
+        proc = subprocess.Popen([sys.executable, '-c'] + args, env=env, stdin=subprocess.PIPE,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        proc.communicate(b'1\n')
+        durations.append(time.time() - start)
+
+    durations.sort()
+    return durations[len(durations) // 2], durations[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark startup time of the weboob launcher.')
+    parser.add_argument('-n', '--runs', type=int, default=5)
+    parser.add_argument('capability', nargs='?', default='bank')
+    parser.add_argument('application', nargs='?', default='boobank')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='weboob_bench_')
+    try:
+        # The index of the repository is written next to the modules, so
+        # build it from a copy to keep the source tree clean.
+        modules = os.path.join(workdir, 'modules')
+        shutil.copytree(os.path.join(PROJECT, 'modules'), modules,
+                        ignore=shutil.ignore_patterns('__pycache__', '*.pyc', 'modules.list'))
+        with open(os.path.join(workdir, 'sources.list'), 'w') as f:
+            f.write('file://%s\n' % modules)
+
+        env = os.environ.copy()
+        env['WEBOOB_WORKDIR'] = workdir
+        env['WEBOOB_DATADIR'] = workdir
+        env['PYTHONPATH'] = os.pathsep.join([PROJECT] + [p for p in [env.get('PYTHONPATH')] if p])
+
+        from weboob.applications.weboobmain import WeboobMain
+        manifest = os.path.join(workdir, WeboobMain.MANIFEST_FILENAME)
+
+        def remove_manifest():
+            if os.path.exists(manifest):
+                os.remove(manifest)
+
+        launcher = ['from weboob.applications.weboobmain import WeboobMain; WeboobMain.run()',
+                    args.capability, '--help']
+        # Build index of the repository once.
+        subprocess.check_call([sys.executable, '-c', 'from weboob.core.ouiboube import Weboob; '
+                               'Weboob().repositories.update_repositories()'], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        results = [
+            ('weboob %s (cold)' % args.capability, run(launcher, env, args.runs, remove_manifest)),
+            ('weboob %s (warm)' % args.capability, run(launcher, env, args.runs)),
+            (args.application, run(['import weboob.applications.%s as app; getattr(app, app.__all__[0]).run()'
+                                    % args.application, '--help'], env, args.runs)),
+        ]
+        for label, (median, best) in results:
+            print('%-24s median=%.0fms best=%.0fms' % (label, median * 1000, best * 1000))
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+# Copyright(C) 2010-2014 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Report the time needed to import weboob modules, from the output of
+``python -X importtime``, to track regressions of the startup time.
+
+For each given module, the total import time is displayed, with the
+slowest imported modules, and the heavy dependencies which are loaded.
+A module can be given as ``name=MILLISECONDS`` to fail when its import is
+slower than this budget.
+
+Usage: import_report.py [-n TOP] [-r RUNS] [MODULE[=BUDGET] ...]
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+
+DEFAULT_MODULES = ['weboob.core', 'weboob.tools.backend', 'weboob.capabilities.bank',
+                   'weboob.browser.filters.standard', 'weboob.browser']
+
+HEAVY = ['requests', 'urllib3', 'lxml', 'dateutil', 'yaml', 'PIL', 'xlrd', 'pdfminer',
+         'html2text', 'Cryptodome', 'Crypto', 'babel', 'unidecode']
+
+LINE_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+
+def measure(module):
+    """
+    Import a module in a new interpreter.
+
+    :returns: list of (name, self time, cumulative time, depth), in µs
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([root] + [p for p in env.get('PYTHONPATH', '').split(os.pathsep) if p])
+    proc = subprocess.Popen([sys.executable, '-X', 'importtime', '-c', 'import %s' % module],
+                            stderr=subprocess.PIPE, env=env)
+    _, err = proc.communicate()
+    if proc.returncode != 0:
+        raise RuntimeError('Unable to import %s:\n%s' % (module, err.decode('utf-8', 'replace')))
+
+    entries = []
+    for line in err.decode('utf-8', 'replace').splitlines():
+        m = LINE_RE.match(line)
+        if m:
+            entries.append((m.group(4), int(m.group(1)), int(m.group(2)), (len(m.group(3)) - 1) // 2))
+    return entries
+
+
+def report(module, runs, top):
+    # keep the fastest run, the others are disturbed by the system.
+    entries = min((measure(module) for _ in range(runs)), key=lambda e: e[-1][2])
+
+    # -X importtime prints a module once its import is finished, so the
+    # modules imported by the requested one are just before it; the first
+    # ones are imported by the interpreter startup.
+    start = max(i for i, e in enumerate(entries[:-1]) if e[3] == 0) + 1 if len(entries) > 1 else 0
+    entries = entries[start:]
+    total = entries[-1][2] / 1000.
+    names = set(name for name, _, _, _ in entries)
+
+    print('%s: %.1fms, %d modules' % (module, total, len(entries)))
+    heavy = [name for name in HEAVY if name in names]
+    print('  heavy dependencies: %s' % (', '.join(heavy) or 'none'))
+    print('  slowest modules (self time):')
+    for name, self_time, _, _ in sorted(entries, key=lambda e: -e[1])[:top]:
+        print('    %8.1fms  %s' % (self_time / 1000., name))
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report import time of weboob modules.')
+    parser.add_argument('-n', '--top', type=int, default=10, help='number of slowest imports to display')
+    parser.add_argument('-r', '--runs', type=int, default=3, help='number of measures of each module')
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES, metavar='MODULE[=BUDGET]')
+    args = parser.parse_args()
+
+    over = []
+    for arg in args.modules:
+        module, _, budget = arg.partition('=')
+        duration = report(module, args.runs, args.top)
+        if budget and duration > float(budget):
+            over.append('%s: %.1fms > %sms' % (module, duration, budget))
+
+    if over:
+        print('Over budget:\n  %s' % '\n  '.join(over), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2009-2017  Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import absolute_import
+
+import inspect
+import json
+import os
+from importlib import import_module
+
+from weboob.core.modules import get_tree_fingerprint
+from weboob.tools.log import getLogger
+
+
+__all__ = ['ApplicationEntry', 'ApplicationsManifest']
+
+
+class ApplicationEntry(object):
+    """
+    Application described in the manifest.
+
+    The application is only imported when it is run.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.APPNAME = data['appname']
+        self.DESCRIPTION = data['description']
+        self.qt = data['qt']
+
+    def __repr__(self):
+        return '<ApplicationEntry %r>' % self.APPNAME
+
+    def load(self):
+        """
+        Import the application class.
+        """
+        modname, attrname = self.data['entry_point'].split(':')
+        return getattr(import_module(modname), attrname)
+
+    def run(self):
+        return self.load().run()
+
+
+class ApplicationsManifest(object):
+    """
+    Capabilities and entry points of applications, saved in a file to find
+    an application without importing the others.
+
+    The manifest is built again as soon as a file of the applications
+    changes.
+
+    :param filename: path of the manifest file
+    :type filename: :class:`str`
+    :param paths: directories of applications packages
+    :type paths: list[:class:`str`]
+    :param version: version of weboob
+    :type version: :class:`str`
+    """
+
+    def __init__(self, filename, paths, version):
+        self.logger = getLogger('manifest')
+        self.filename = filename
+        self.paths = []
+        for path in paths:
+            # pkgutil.extend_path() may give the same directory twice.
+            path = os.path.realpath(path)
+            if path not in self.paths:
+                self.paths.append(path)
+        self.version = version
+        self.applications = None
+
+    def get_fingerprint(self):
+        return [self.version] + [list(get_tree_fingerprint(path)) for path in self.paths]
+
+    def load(self):
+        """
+        Load the manifest, and build it if it is outdated.
+
+        :returns: applications
+        :rtype: list[:class:`ApplicationEntry`]
+        """
+        fingerprint = self.get_fingerprint()
+        data = None
+        try:
+            with open(self.filename, 'r') as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            pass
+
+        if data is None or data.get('fingerprint') != fingerprint:
+            self.logger.debug('Building the applications manifest')
+            data = {'fingerprint': fingerprint, 'applications': self.build()}
+            self.save(data)
+
+        self.applications = [ApplicationEntry(app) for app in data['applications']]
+        return self.applications
+
+    def save(self, data):
+        tmp = '%s.tmp' % self.filename
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(data, f, indent=1, sort_keys=True)
+            os.rename(tmp, self.filename)
+        except (IOError, OSError) as e:
+            self.logger.warning('Unable to save applications manifest %s: %s', self.filename, e)
+
+    def build(self):
+        """
+        Import every application to describe it.
+
+        :rtype: list[:class:`dict`]
+        """
+        try:
+            from weboob.tools.application.qt5 import QtApplication
+        except ImportError:
+            QtApplication = None
+
+        applications = []
+        for path in self.paths:
+            for name in sorted(os.listdir(path)):
+                if not os.path.exists(os.path.join(path, name, '__init__.py')):
+                    continue
+
+                modname = 'weboob.applications.%s.%s' % (name, name)
+                try:
+                    module = import_module(modname)
+                except ImportError:
+                    continue
+
+                attrnames = [x for x in dir(module) if x.lower() == name]
+                if not attrnames:
+                    continue
+                application = getattr(module, attrnames[0])
+
+                caps = getattr(application, 'CAPS', None)
+                if not caps:
+                    continue
+                caps = list(caps) if isinstance(caps, tuple) else [caps]
+
+                applications.append({
+                    'appname': application.APPNAME,
+                    'description': application.DESCRIPTION,
+                    'entry_point': '%s:%s' % (modname, attrnames[0]),
+                    'caps': [os.path.splitext(os.path.basename(inspect.getfile(cap)))[0] for cap in caps],
+                    'qt': QtApplication is not None and issubclass(application, QtApplication),
+                })
+        return applications
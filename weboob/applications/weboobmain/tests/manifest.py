@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2009-2017  Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from weboob.applications.weboobmain.manifest import ApplicationsManifest
+
+
+class CountingManifest(ApplicationsManifest):
+    def __init__(self, *args, **kwargs):
+        super(CountingManifest, self).__init__(*args, **kwargs)
+        self.builds = 0
+
+    def build(self):
+        self.builds += 1
+        return [{
+            'appname': 'myapp',
+            'description': 'My application',
+            'entry_point': 'weboob.applications.myapp.myapp:MyApp',
+            'caps': ['bank'],
+            'qt': False,
+        }]
+
+
+class ManifestTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp(prefix='weboob_manifest_')
+        self.apps = os.path.join(self.tmpdir, 'applications')
+        self.filename = os.path.join(self.tmpdir, 'applications.json')
+        self.write('myapp/__init__.py')
+        self.write('myapp/myapp.py')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, name, mtime=None):
+        path = os.path.join(self.apps, name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write('')
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+
+    def load(self, version='1.6'):
+        manifest = CountingManifest(self.filename, [self.apps], version)
+        applications = manifest.load()
+        self.assertEqual([app.APPNAME for app in applications], ['myapp'])
+        return manifest.builds
+
+    def test_reuse(self):
+        self.assertEqual(self.load(), 1)
+        self.assertTrue(os.path.exists(self.filename))
+        self.assertEqual(self.load(), 0)
+
+    def test_files_changed(self):
+        self.load()
+        self.write('myapp/myapp.py', mtime=os.stat(self.filename).st_mtime + 10)
+        self.assertEqual(self.load(), 1)
+
+        # Added with an older mtime, as when installed from an archive.
+        self.write('myapp/other.py', mtime=1)
+        self.assertEqual(self.load(), 1)
+
+        os.remove(os.path.join(self.apps, 'myapp', 'other.py'))
+        self.assertEqual(self.load(), 1)
+        self.assertEqual(self.load(), 0)
+
+    def test_bytecode_ignored(self):
+        self.load()
+        self.write('myapp/__pycache__/myapp.cpython-38.pyc')
+        self.write('myapp/other.pyc')
+        self.assertEqual(self.load(), 0)
+
+    def test_version_changed(self):
+        self.load()
+        self.assertEqual(self.load(version='1.7'), 1)
+
+    def test_invalid_file(self):
+        with open(self.filename, 'w') as f:
+            f.write('{')
+        self.assertEqual(self.load(), 1)
+        self.assertEqual(self.load(), 0)
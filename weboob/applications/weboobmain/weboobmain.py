@@ -23,9 +23,7 @@
 from __future__ import absolute_import
 from __future__ import print_function
 
-import inspect
 import os
-import re
 import sys
 from collections import OrderedDict
 from datetime import datetime, timedelta
@@ -34,11 +32,7 @@ import weboob.applications
 
 from weboob.tools.application.console import ConsoleApplication
 
-try:
-    from weboob.tools.application.qt5 import QtApplication
-except ImportError:
-    class QtApplication(object):
-        pass
+from .manifest import ApplicationsManifest
 
 
 __all__ = ['WeboobMain']
@@ -53,6 +47,8 @@ class WeboobMain(ConsoleApplication):
 
     UPDATE_DAYS_DELAY = 20
 
+    MANIFEST_FILENAME = 'applications.json'
+
     def main(self):
         interactive = sys.stdout.isatty()
         if interactive:
@@ -84,7 +80,7 @@ class WeboobMain(ConsoleApplication):
                 cap = None
 
         def appsortkey(app):
-            if issubclass(app, QtApplication):
+            if app.qt:
                 return '1' + app.APPNAME
             else:
                 return '0' + app.APPNAME
@@ -105,8 +101,8 @@ class WeboobMain(ConsoleApplication):
         for repository in self.weboob.repositories.repositories:
             update_date = datetime.strptime(str(repository.update), '%Y%m%d%H%M')
             if (datetime.now() - timedelta(days=self.UPDATE_DAYS_DELAY)) > update_date:
-                update = self.ask('The repositories have not been updated for %s days, do you want to update them ? (y/n)'
-                                  % self.UPDATE_DAYS_DELAY,
+                update = self.ask('The repositories have not been updated for %s days, '
+                                  'do you want to update them ? (y/n)' % self.UPDATE_DAYS_DELAY,
                                   default='n')
                 if update.upper() == 'Y':
                     self.weboob.repositories.update()
@@ -146,46 +142,19 @@ class WeboobMain(ConsoleApplication):
         return cap
 
     def init_CapApplicationDict(self):
+        filename = os.path.join(self.weboob.repositories.datadir, self.MANIFEST_FILENAME)
+        manifest = ApplicationsManifest(filename, weboob.applications.__path__, self.VERSION)
+
         capApplicationDict = {}
-        for path in weboob.applications.__path__:
-            regexp = re.compile('^%s/([\w\d_]+)$' % path)
-            for root, dirs, files in os.walk(path):
-                m = regexp.match(root)
-                if not (m and '__init__.py' in files):
-                    continue
-
-                application = self.get_applicaction_from_filename(m.group(1))
-                if not application:
-                    continue
-
-                capabilities = self.get_application_capabilities(application)
-                if not capabilities:
-                    continue
-
-                for capability in capabilities:
-                    if capability in capApplicationDict:
-                        capApplicationDict[capability].append(application)
-                    else:
-                        capApplicationDict[capability] = [application]
+        for application in manifest.load():
+            for capability in application.data['caps']:
+                if capability in capApplicationDict:
+                    capApplicationDict[capability].append(application)
+                else:
+                    capApplicationDict[capability] = [application]
 
         return OrderedDict([(k, v) for k, v in sorted(capApplicationDict.items())])
 
-    def get_application_capabilities(self, application):
-        if hasattr(application, 'CAPS') and application.CAPS:
-            _capabilities = list(application.CAPS) if isinstance(application.CAPS, tuple) else [application.CAPS]
-            return [os.path.splitext(os.path.basename(inspect.getfile(x)))[0] for x in _capabilities]
-
-    def get_applicaction_from_filename(self, name):
-        module = 'weboob.applications.%s.%s' % (name, name)
-        try:
-            _module = __import__(module, fromlist=['*'])
-        except ImportError:
-            return
-
-        _application = [x for x in dir(_module) if x.lower() == name]
-        if _application:
-            return getattr(_module, _application[0])
-
     @classmethod
     def run(cls):
         try:
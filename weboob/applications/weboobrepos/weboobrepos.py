@@ -51,6 +51,10 @@ class WeboobRepos(ReplApplication):
     weboob_commands = copy(ReplApplication.weboob_commands)
     weboob_commands.remove('backends')
 
+    def add_application_options(self, group):
+        group.add_option('-j', '--jobs', type='int',
+                         help='number of processes used to import modules when building a repository')
+
     def load_default_backends(self):
         pass
 
@@ -100,7 +104,7 @@ class WeboobRepos(ReplApplication):
             print('Use the "create" command before.', file=self.stderr)
             return 1
 
-        r.build_index(source_path, index_file)
+        r.build_index(source_path, index_file, processes=self.options.jobs)
 
         if r.signed:
             sigfiles = [r.KEYRING, Repository.INDEX]
@@ -17,8 +17,15 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with weboob. If not, see <http://www.gnu.org/licenses/>.
 
-from .browsers import Browser, DomainBrowser, UrlNotAllowed, PagesBrowser, LoginBrowser, need_login, AbstractBrowser, StatesMixin
-from .url import URL
+from weboob.tools.lazy import lazy_attributes
+
+
+# Submodules are imported on first use, so that filters or elements can be
+# imported without requests.
+lazy_attributes(__name__, dict(
+    [(name, '.browsers') for name in ('Browser', 'DomainBrowser', 'UrlNotAllowed', 'PagesBrowser',
+                                      'LoginBrowser', 'need_login', 'AbstractBrowser', 'StatesMixin')] +
+    [('URL', '.url')]))
 
 
 __all__ = ['Browser', 'DomainBrowser', 'UrlNotAllowed', 'PagesBrowser', 'URL',
@@ -18,17 +18,324 @@
 # along with weboob. If not, see <http://www.gnu.org/licenses/>.
 
 
+import socket
+from collections import Counter
+from threading import Lock, local
+
 import requests
+try:
+    from requests.packages.urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+    from requests.packages.urllib3.poolmanager import PoolManager, proxy_from_url
+except ImportError:
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+    from urllib3.poolmanager import PoolManager, proxy_from_url
+
+from weboob.tools.compat import urlparse
+
+from .exceptions import RequestAborted
+
+
+__all__ = ['HTTPAdapter', 'PoolRegistry', 'pool_registry']
+
+
+# Adapter sending a request in the current thread.
+_current = local()
+
+
+class AbortablePoolMixin(object):
+    """
+    Connection pool which lets the adapter sending a request know which
+    connections are in use, so that they can be shut down.
+
+    As pools can be shared by several adapters, each connection is bound to
+    the adapter which took it.
+    """
+
+    def _get_conn(self, timeout=None):
+        adapter = getattr(_current, 'adapter', None)
+        if adapter is not None and adapter.aborted:
+            # Do not let urllib3 retry an aborted request.
+            raise RequestAborted()
+
+        conn = super(AbortablePoolMixin, self)._get_conn(timeout)
+        if adapter is not None:
+            adapter._used_connection(conn)
+            if adapter.pool_registry is not None:
+                adapter.pool_registry._count_get(self, conn)
+        conn._weboob_adapter = adapter
+        return conn
+
+    def _put_conn(self, conn):
+        adapter = getattr(conn, '_weboob_adapter', None)
+        if adapter is not None:
+            conn._weboob_adapter = None
+            adapter._released_connection(conn)
+            if adapter.pool_registry is not None:
+                adapter.pool_registry._count_put(self, conn)
+        super(AbortablePoolMixin, self)._put_conn(conn)
+
+
+class AbortableHTTPConnectionPool(AbortablePoolMixin, HTTPConnectionPool):
+    pass
+
+
+class AbortableHTTPSConnectionPool(AbortablePoolMixin, HTTPSConnectionPool):
+    pass
+
+
+POOL_CLASSES = {'http': AbortableHTTPConnectionPool,
+                'https': AbortableHTTPSConnectionPool,
+               }
+
+
+def _set_pool_classes(manager):
+    # SOCKS proxy managers have their own pool classes.
+    if manager.pool_classes_by_scheme.get('http') is HTTPConnectionPool:
+        manager.pool_classes_by_scheme = POOL_CLASSES
+
+
+class PoolRegistry(object):
+    """
+    Registry of connection pools shared by adapters of the process.
+
+    Adapters using the same pool settings, TLS verification and proxy get
+    the same urllib3 pool managers, which keep a pool per scheme, host and
+    port: connections and TLS sessions opened by a browser are reused by
+    the others. Cookies are not concerned, they are handled by each session.
+    """
+
+    def __init__(self):
+        self.mutex = Lock()
+        self.managers = {}
+        self.counters = Counter()
+        self.active = Counter()
+
+    def get_manager(self, key, factory):
+        """
+        Get the pool manager for the given settings, and create it if needed.
 
+        :param key: settings of the manager
+        :type key: tuple
+        :param factory: function to call to create the manager
+        """
+        with self.mutex:
+            manager = self.managers.get(key)
+            if manager is None:
+                manager = self.managers[key] = factory()
+                _set_pool_classes(manager)
+            return manager
 
-__all__ = ['HTTPAdapter']
+    def _count_get(self, pool, conn):
+        with self.mutex:
+            # A connection which has a socket has already been used.
+            self.counters['reused' if getattr(conn, 'sock', None) is not None else 'opened'] += 1
+            self.active[pool.host] += 1
+
+    def _count_put(self, pool, conn):
+        with self.mutex:
+            self.active[pool.host] -= 1
+            if not self.active[pool.host]:
+                del self.active[pool.host]
+
+    def stats(self):
+        """
+        Get a snapshot of the usage of the shared pools.
+
+        :returns: number of connections taken from pools (`requests`), of
+                  ones which were already open (`reused`), its ratio
+                  (`hit_rate`), and number of `open` and `active`
+                  connections, per host (`hosts`)
+        :rtype: :class:`dict`
+        """
+        with self.mutex:
+            managers = list(self.managers.values())
+            counters = Counter(self.counters)
+            active = Counter(self.active)
+
+        hosts = {}
+        for manager in managers:
+            for key in list(manager.pools.keys()):
+                pool = manager.pools.get(key)
+                if pool is None or pool.pool is None:
+                    continue
+                idle = sum(1 for conn in list(pool.pool.queue)
+                           if conn is not None and getattr(conn, 'sock', None) is not None)
+                host = hosts.setdefault(pool.host, {'open': 0, 'active': 0})
+                host['open'] += idle
+        for host, count in active.items():
+            host = hosts.setdefault(host, {'open': 0, 'active': 0})
+            host['open'] += count
+            host['active'] += count
+
+        requests_count = counters['reused'] + counters['opened']
+        return {'requests': requests_count,
+                'reused': counters['reused'],
+                'hit_rate': float(counters['reused']) / requests_count if requests_count else 0.,
+                'open': sum(host['open'] for host in hosts.values()),
+                'active': sum(host['active'] for host in hosts.values()),
+                'hosts': hosts,
+               }
+
+    def clear(self):
+        """
+        Close every shared connection.
+        """
+        with self.mutex:
+            managers = list(self.managers.values())
+            self.managers.clear()
+        for manager in managers:
+            manager.clear()
+
+
+pool_registry = PoolRegistry()
+"""Registry of pools shared by browsers with :attr:`weboob.browser.browsers.Browser.SHARED_POOLS`."""
 
 
 class HTTPAdapter(requests.adapters.HTTPAdapter):
+    """
+    :param pool_registry: if given, connection pools are shared with the
+                          other adapters using this registry
+    :type pool_registry: :class:`PoolRegistry`
+    :param tls_key: TLS settings of the session, which can't share pools
+                    with sessions using other settings
+    :type tls_key: tuple
+    :param limiter: limits of requests to each host
+    :type limiter: :class:`weboob.browser.ratelimit.HostLimiter`
+    """
+
     def __init__(self, *args, **kwargs):
         self._proxy_headers = kwargs.pop('proxy_headers', {})
+        self.pool_registry = kwargs.pop('pool_registry', None)
+        self._tls_key = kwargs.pop('tls_key', None)
+        self.limiter = kwargs.pop('limiter', None)
+        self.aborted = False
+        self._connections_lock = Lock()
+        self._connections = set()
         super(HTTPAdapter, self).__init__(*args, **kwargs)
 
+    def init_poolmanager(self, connections, maxsize, block=requests.adapters.DEFAULT_POOLBLOCK, **pool_kwargs):
+        if self.pool_registry is None:
+            super(HTTPAdapter, self).init_poolmanager(connections, maxsize, block, **pool_kwargs)
+            _set_pool_classes(self.poolmanager)
+            return
+
+        # save these values for pickling
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+
+        key = (connections, maxsize, block, self._tls_key, None, None, tuple(sorted(pool_kwargs.items())))
+        self.poolmanager = self.pool_registry.get_manager(
+            key, lambda: PoolManager(num_pools=connections, maxsize=maxsize, block=block, **pool_kwargs))
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        if self.pool_registry is None or proxy.lower().startswith('socks'):
+            manager = super(HTTPAdapter, self).proxy_manager_for(proxy, **proxy_kwargs)
+            _set_pool_classes(manager)
+            return manager
+
+        if proxy not in self.proxy_manager:
+            proxy_headers = self.proxy_headers(proxy)
+            key = (self._pool_connections, self._pool_maxsize, self._pool_block, self._tls_key,
+                   proxy, tuple(sorted(proxy_headers.items())), tuple(sorted(proxy_kwargs.items())))
+            self.proxy_manager[proxy] = self.pool_registry.get_manager(
+                key, lambda: proxy_from_url(proxy, proxy_headers=proxy_headers,
+                                            num_pools=self._pool_connections,
+                                            maxsize=self._pool_maxsize,
+                                            block=self._pool_block,
+                                            **proxy_kwargs))
+        return self.proxy_manager[proxy]
+
+    def close(self):
+        if self.pool_registry is None:
+            super(HTTPAdapter, self).close()
+        else:
+            # Shared connections are kept for other adapters.
+            self.proxy_manager = {}
+
+    def __setstate__(self, state):
+        self.pool_registry = None
+        self._tls_key = None
+        self.limiter = None
+        super(HTTPAdapter, self).__setstate__(state)
+        self.aborted = False
+        self._connections_lock = Lock()
+        self._connections = set()
+
+    def _used_connection(self, conn):
+        with self._connections_lock:
+            self._connections.add(conn)
+
+    def _released_connection(self, conn):
+        with self._connections_lock:
+            self._connections.discard(conn)
+
+    def abort(self):
+        """
+        Abort requests in progress, and make next ones raise
+        :class:`weboob.browser.exceptions.RequestAborted`, until
+        :func:`reset_abort` is called.
+        """
+        self.aborted = True
+        with self._connections_lock:
+            connections = list(self._connections)
+
+        for conn in connections:
+            sock = getattr(conn, 'sock', None)
+            if sock is None:
+                continue
+            try:
+                # Wake up the thread blocked on this socket.
+                sock.shutdown(socket.SHUT_RDWR)
+            except (socket.error, OSError):
+                pass
+
+    def reset_abort(self):
+        self.aborted = False
+
+    def send(self, request, *args, **kwargs):
+        if self.aborted:
+            raise RequestAborted()
+
+        previous = getattr(_current, 'adapter', None)
+        _current.adapter = self
+        try:
+            if self.limiter is None:
+                return super(HTTPAdapter, self).send(request, *args, **kwargs)
+
+            host = urlparse(request.url).netloc.rpartition('@')[2].lower()
+            release = self.limiter.acquire(host, cancelled=lambda: self.aborted)
+            try:
+                response = super(HTTPAdapter, self).send(request, *args, **kwargs)
+            except BaseException:
+                release()
+                raise
+
+            release_conn = getattr(response.raw, 'release_conn', None)
+            if release_conn is None:
+                release()
+                return response
+
+            # The request is in progress until its body is read, which can
+            # happen after the end of send(), for example with stream=True.
+            # The connection is released once it is read, or the response
+            # closed.
+            def release_raw():
+                try:
+                    release_conn()
+                finally:
+                    release()
+            response.raw.release_conn = release_raw
+            return response
+        except RequestAborted:
+            raise
+        except Exception:
+            if self.aborted:
+                raise RequestAborted()
+            raise
+        finally:
+            _current.adapter = previous
+
     def add_proxy_header(self, key, value):
         self._proxy_headers[key] = value
 
@@ -19,7 +19,8 @@
 
 from __future__ import absolute_import, print_function
 
-from collections import OrderedDict
+from collections import OrderedDict, deque
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 from functools import wraps
 import re
 import pickle
@@ -33,11 +34,11 @@ except ImportError:
     import urllib3
 import os
 import sys
-from copy import deepcopy
+from copy import copy, deepcopy
 import inspect
 from datetime import datetime, timedelta
-from dateutil import parser
 from threading import Lock
+import time
 
 try:
     import requests
@@ -46,21 +47,28 @@ try:
 except ImportError:
     raise ImportError('Please install python3-requests >= 2.0')
 
-from weboob.exceptions import BrowserHTTPSDowngrade, ModuleInstallError, BrowserRedirect, BrowserIncorrectPassword
+from weboob.exceptions import (
+    BrowserHTTPSDowngrade, ModuleInstallError, BrowserRedirect, BrowserIncorrectPassword, BrowserUnavailable,
+)
 
 from weboob.tools.log import getLogger
 from weboob.tools.compat import basestring, unicode, urlparse, urljoin, urlencode, parse_qsl
+from weboob.tools.lazy import lazy_import
 from weboob.tools.json import json
 
-from .adapters import HTTPAdapter
+from .adapters import HTTPAdapter, pool_registry
 from .cookies import WeboobCookieJar
-from .exceptions import HTTPNotFound, ClientError, ServerError
+from .exceptions import HTTPNotFound, ClientError, ServerError, RequestAborted
 from .sessions import FuturesSession
 from .profiles import Firefox
-from .pages import NextPage
+from .pages import NextPage, PaginationPrefetcher
+from .ratelimit import HostLimiter
 from .url import URL, normalize_url
 
 
+parser = lazy_import('dateutil.parser')
+
+
 class Browser(object):
     """
     Simple browser class.
@@ -98,6 +106,55 @@ class Browser(object):
     Maximum of threads for asynchronous requests.
     """
 
+    RATE_LIMIT = None
+    """
+    Maximum number of requests per second to a host, shared by all browsers
+    of the process which reach this host. None to disable it.
+    """
+
+    RATE_LIMIT_BURST = 1
+    """
+    Number of requests which can be sent at once to a host before
+    :attr:`RATE_LIMIT` applies.
+    """
+
+    MAX_CONCURRENT_PER_HOST = None
+    """
+    Maximum number of requests in progress to a host, shared by all browsers
+    of the process. None to disable it.
+    """
+
+    RATE_LIMIT_SHARED = False
+    """
+    Share :attr:`RATE_LIMIT` and :attr:`MAX_CONCURRENT_PER_HOST` with other
+    processes of the user, using lock files.
+    """
+
+    COALESCE_WINDOW = None
+    """
+    Share responses between identical GET and HEAD requests without body
+    made while one of them is in progress, and up to this number of seconds
+    after it is finished. 0 only shares requests in progress, and None
+    disables it. The number of requests saved is counted in
+    :attr:`coalesced_requests`.
+
+    A blocking request waits for the one in progress up to its timeout, or
+    not at all without timeout, then sends its own request instead.
+    """
+
+    COALESCE_KEY_HEADERS = ('Accept', 'Accept-Language', 'Authorization', 'Content-Type', 'Cookie')
+    """
+    Headers which make requests different for :attr:`COALESCE_WINDOW`.
+    """
+
+    SHARED_POOLS = False
+    """
+    Share connection pools with the other browsers of the process which
+    use the same TLS settings and proxy, so that a host reached by several
+    backends is connected to only once. Statistics are available with
+    :meth:`weboob.browser.adapters.PoolRegistry.stats`.
+    """
+
     ALLOW_REFERRER = True
     """
     Controls the behavior of get_referrer.
@@ -139,6 +196,10 @@ class Browser(object):
 
         self.PROXIES = proxy
         self.proxy_headers = proxy_headers or {}
+        self.coalesced_requests = 0
+        self._inflight = {}
+        self._inflight_lock = Lock()
+        self._inflight_sweep = 0
         self._setup_session(self.PROFILE)
         self.url = None
         self.response = None
@@ -146,6 +207,22 @@ class Browser(object):
     def deinit(self):
         self.session.close()
 
+    def abort(self):
+        """
+        Interrupt requests in progress, possibly from another thread.
+
+        Pending and next requests raise
+        :class:`weboob.browser.exceptions.RequestAborted`, until
+        :func:`reset_abort` is called.
+        """
+        self.session.abort()
+
+    def reset_abort(self):
+        """
+        Allow requests again after a call to :func:`abort`.
+        """
+        self.session.reset_abort()
+
     def set_normalized_url(self, response, **kwargs):
         response.url = normalize_url(response.url)
 
@@ -234,6 +311,14 @@ class Browser(object):
         if self.MAX_WORKERS > requests.adapters.DEFAULT_POOLSIZE:
             adapter_kwargs.update(pool_connections=self.MAX_WORKERS,
                                   pool_maxsize=self.MAX_WORKERS)
+        if self.SHARED_POOLS:
+            # connections are shared with other browsers using the same TLS
+            # settings; cookies stay in the session.
+            adapter_kwargs.update(pool_registry=pool_registry,
+                                  tls_key=(repr(session.verify), repr(session.cert)))
+        if self.RATE_LIMIT or self.MAX_CONCURRENT_PER_HOST:
+            adapter_kwargs['limiter'] = HostLimiter(self.RATE_LIMIT, self.RATE_LIMIT_BURST,
+                                                    self.MAX_CONCURRENT_PER_HOST, self.RATE_LIMIT_SHARED)
         session.mount('https://', HTTPAdapter(**adapter_kwargs))
         session.mount('http://', HTTPAdapter(**adapter_kwargs))
 
@@ -366,18 +451,108 @@ class Browser(object):
             self.raise_for_status(response)
             return callback(response)
 
+        send_kwargs = dict(allow_redirects=allow_redirects,
+                           stream=stream,
+                           timeout=timeout,
+                           verify=verify,
+                           cert=cert,
+                           proxies=proxies)
+
+        if self.COALESCE_WINDOW is not None and not stream and preq.method in ('GET', 'HEAD') and not preq.body:
+            return self._coalesced_send(preq, send_kwargs, inner_callback, is_async)
+
         # call python3-requests
         response = self.session.send(preq,
-                                     allow_redirects=allow_redirects,
-                                     stream=stream,
-                                     timeout=timeout,
-                                     verify=verify,
-                                     cert=cert,
-                                     proxies=proxies,
                                      callback=inner_callback,
-                                     is_async=is_async)
+                                     is_async=is_async,
+                                     **send_kwargs)
         return response
 
+    def _coalesced_send(self, preq, send_kwargs, callback, is_async):
+        # The first request is sent, and the identical ones made meanwhile
+        # wait for its response, which is copied for each of them.
+        key = (preq.method, preq.url,
+               tuple(preq.headers.get(name) for name in self.COALESCE_KEY_HEADERS),
+               repr(sorted((name, value) for name, value in send_kwargs.items() if name != 'proxies')),
+               repr(sorted((send_kwargs['proxies'] or {}).items())))
+
+        with self._inflight_lock:
+            now = time.time()
+            expire = self._inflight.get(key, (None, None))[1]
+            if expire is not None and expire < now:
+                del self._inflight[key]
+            if now >= self._inflight_sweep:
+                # Forget other finished requests, once per window at most.
+                for k, (future, expire) in list(self._inflight.items()):
+                    if expire is not None and expire < now:
+                        del self._inflight[k]
+                self._inflight_sweep = now + (self.COALESCE_WINDOW or 0)
+
+            leader = key not in self._inflight
+            if leader:
+                shared = Future()
+                self._inflight[key] = (shared, None)
+            else:
+                shared = self._inflight[key][0]
+                self.coalesced_requests += 1
+
+        if leader:
+            def done(future):
+                with self._inflight_lock:
+                    if self.COALESCE_WINDOW and future.exception() is None:
+                        self._inflight[key] = (future, time.time() + self.COALESCE_WINDOW)
+                    else:
+                        self._inflight.pop(key, None)
+            shared.add_done_callback(done)
+
+            def set_response(session, response):
+                shared.set_result(response)
+                return callback(session, response)
+
+            def failed(future):
+                # The request has failed before getting a response.
+                if not shared.done():
+                    shared.set_exception(RequestAborted() if future.cancelled() else future.exception())
+
+            try:
+                result = self.session.send(preq, callback=set_response, is_async=is_async, **send_kwargs)
+            except BaseException as e:
+                if not shared.done():
+                    shared.set_exception(e)
+                raise
+            if is_async:
+                result.add_done_callback(failed)
+            return result
+
+        if not is_async:
+            timeout = send_kwargs['timeout']
+            if isinstance(timeout, tuple):
+                timeout = sum(timeout)
+            try:
+                # The first request may be waiting for this thread, for
+                # example in a pool of workers.
+                response = shared.result(timeout=timeout or 0)
+            except FutureTimeoutError:
+                self.logger.debug('Response of %s %s is late, sending the request', preq.method, preq.url)
+                with self._inflight_lock:
+                    self.coalesced_requests -= 1
+                return self.session.send(preq, callback=callback, is_async=False, **send_kwargs)
+
+            self.logger.debug('Share the response of %s %s', preq.method, preq.url)
+            return callback(self.session, copy(response))
+
+        self.logger.debug('Share the response of %s %s', preq.method, preq.url)
+
+        future = Future()
+
+        def chain(shared):
+            try:
+                future.set_result(callback(self.session, copy(shared.result())))
+            except BaseException as e:
+                future.set_exception(e)
+        shared.add_done_callback(chain)
+        return future
+
     def async_open(self, url, **kwargs):
         """
         Shortcut to open(url, is_async=True).
@@ -669,6 +844,22 @@ class PagesBrowser(DomainBrowser):
 
     _urls = None
 
+    PAGINATION_PREFETCH = 0
+    """
+    Number of next pages requested in advance by :meth:`pagination` and the
+    :func:`weboob.browser.pages.pagination` decorator, while the current
+    one is processed. The next page is known early when it is given by the
+    `next_page` attribute of a :class:`weboob.browser.elements.ListElement`.
+    See :class:`weboob.browser.pages.PaginationPrefetcher`.
+    """
+
+    PAGINATION_WORKERS = None
+    """
+    Maximum number of pages requested at once by :meth:`parallel_pagination`.
+    If None, :attr:`MAX_WORKERS` is used. Set it to 1 for websites which
+    require to visit pages one after the other.
+    """
+
     def __init__(self, *args, **kwargs):
         self.highlight_el = kwargs.pop('highlight_el', False)
         super(PagesBrowser, self).__init__(*args, **kwargs)
@@ -744,8 +935,9 @@ class PagesBrowser(DomainBrowser):
             # Call leave hook.
             self.page.on_leave()
 
-        response = self.open(*args, **kwargs)
+        return self._set_location(self.open(*args, **kwargs))
 
+    def _set_location(self, response):
         self.response = response
         self.page = response.page
         self.url = response.url
@@ -766,6 +958,9 @@ class PagesBrowser(DomainBrowser):
 
         :class:`NextPage` constructor can take an url or a Request object.
 
+        Next pages are requested in advance when :attr:`PAGINATION_PREFETCH`
+        is set.
+
         >>> from .pages import HTMLPage
         >>> class Page(HTMLPage):
         ...     def iter_values(self):
@@ -784,14 +979,120 @@ class PagesBrowser(DomainBrowser):
         >>> list(b.pagination(lambda: b.page.iter_values()))
         ['One', 'Two', 'Three', 'Four']
         """
-        while True:
+        prefetcher = PaginationPrefetcher(self, self.PAGINATION_PREFETCH) if self.PAGINATION_PREFETCH else None
+        try:
+            while True:
+                if prefetcher is not None:
+                    prefetcher.attach(self.page)
+                try:
+                    for r in func(*args, **kwargs):
+                        yield r
+                except NextPage as e:
+                    if prefetcher is not None:
+                        prefetcher.go(e.request)
+                    else:
+                        self.location(e.request)
+                else:
+                    return
+        finally:
+            if prefetcher is not None:
+                prefetcher.close()
+
+    def parallel_pagination(self, url, func, pages, start=1, param='pagenum', **kwargs):
+        r"""
+        Get items of pages numbered in their URL, requesting several pages
+        at once, up to :attr:`PAGINATION_WORKERS`.
+
+        Items are yielded in the order of pages. Pages are requested in
+        threads and are not visited: :attr:`page` and :attr:`url` are not
+        changed and :meth:`Page.on_load` is not called, but cookies set by
+        responses are kept in the session. When :attr:`PAGINATION_WORKERS`
+        is 1, pages are visited one after the other with :meth:`URL.go`.
+        As pages are known, :class:`NextPage` raised by `func` is ignored.
+        If a response is not handled by the page class of `url`,
+        :class:`weboob.exceptions.BrowserUnavailable` is raised.
+
+        >>> from .pages import HTMLPage
+        >>> class Page(HTMLPage):
+        ...     def iter_values(self):
+        ...         for el in self.doc.xpath('//li'):
+        ...             yield el.text
+        ...
+        >>> class Browser(PagesBrowser):
+        ...     BASEURL = 'https://romain.bignon.me'
+        ...     list = URL('/projects/weboob/list-(?P<pagenum>\d+).html', Page)
+        ...
+        >>> b = Browser()
+        >>> list(b.parallel_pagination(b.list, lambda page: page.iter_values(), 2)) # doctest: +SKIP
+        ['One', 'Two', 'Three', 'Four']
+
+        :param url: URL of pages
+        :type url: :class:`URL`
+        :param func: function called with each page, which returns its items
+        :param pages: number of pages, page numbers, or function called with
+                      the first page to get the number of pages
+        :type pages: :class:`int` or iterable or callable
+        :param start: number of the first page
+        :type start: :class:`int`
+        :param param: name of the page number parameter of the URL
+        :type param: :class:`str`
+        :param kwargs: other parameters of the URL
+        """
+        def params(num):
+            params = dict(kwargs)
+            params[param] = num
+            return params
+
+        def items(response):
+            # func always gets a page of the URL.
+            if url.klass is None or not isinstance(response.page, url.klass):
+                raise BrowserUnavailable('Unexpected page for %s' % response.url)
             try:
-                for r in func(*args, **kwargs):
+                for r in func(response.page):
                     yield r
-            except NextPage as e:
-                self.location(e.request)
-            else:
-                return
+            except NextPage:
+                # Pages are already known.
+                pass
+
+        if callable(pages):
+            url.go(**params(start))
+            response = self.response
+            for r in items(response):
+                yield r
+            numbers = range(start + 1, start + pages(response.page))
+        elif isinstance(pages, int):
+            numbers = range(start, start + pages)
+        else:
+            numbers = pages
+
+        workers = self.PAGINATION_WORKERS or self.MAX_WORKERS
+        if workers <= 1:
+            for num in numbers:
+                url.go(**params(num))
+                for r in items(self.response):
+                    yield r
+            return
+
+        numbers = iter(numbers)
+        futures = deque()
+
+        def submit():
+            num = next(numbers, None)
+            if num is not None:
+                futures.append(url.open(is_async=True, **params(num)))
+
+        try:
+            for _ in range(workers):
+                submit()
+
+            while futures:
+                response = futures.popleft().result()
+                submit()
+                for r in items(response):
+                    yield r
+        finally:
+            for future in futures:
+                future.cancel()
 
 
 def need_login(func):
@@ -17,37 +17,392 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with weboob. If not, see <http://www.gnu.org/licenses/>.
 
-__all__ = ['CacheMixin']
+import os
+import pickle
+import sqlite3
+import time
+from collections import Counter
+from concurrent.futures import Future
+from contextlib import contextmanager
+from email.utils import mktime_tz, parsedate_tz
+from hashlib import sha256
+from threading import Lock, local
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from weboob.tools.compat import parse_qsl, unicode, urlencode
+from weboob.tools.json import json
+
+__all__ = ['CacheMixin', 'SQLiteCacheStore']
+
+
+def parse_cache_control(value):
+    """
+    Parse a Cache-Control header.
+
+    >>> sorted(parse_cache_control('no-cache, Max-Age="60", private').items())
+    [('max-age', '60'), ('no-cache', None), ('private', None)]
+
+    :rtype: :class:`dict`
+    """
+    directives = {}
+    for directive in (value or '').split(','):
+        name, sep, arg = directive.strip().partition('=')
+        if name:
+            directives[name.lower()] = arg.strip('"') if sep else None
+    return directives
+
+
+def _seconds(value):
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_http_date(value):
+    """
+    Get the timestamp of an HTTP date, or None if it is invalid.
+    """
+    if not value:
+        return None
+    parsed = parsedate_tz(value)
+    if parsed is None:
+        return None
+    return mktime_tz(parsed)
 
 
 class CacheEntry(object):
-    def __init__(self, response):
+    def __init__(self, response, response_time=None):
         self.response = response
         self.etag = response.headers.get('ETag')
         self.last_modified = response.headers.get('Last-Modified')
+        self.response_time = time.time() if response_time is None else response_time
+
+    vary = None
 
     def has_cache_key(self):
         return (self.etag or self.last_modified)
 
+    def set_vary(self, request):
+        """
+        Keep values of the request headers listed in the Vary header of the
+        response, which have to match to use this entry.
+        """
+        names = [name.strip().lower() for name in self.response.headers.get('Vary', '').split(',') if name.strip()]
+        headers = CaseInsensitiveDict(request.headers)
+        self.vary = dict((name, headers.get(name)) for name in names) or None
+
+    def is_storable(self):
+        return 'no-store' not in self.cache_control and (not self.vary or '*' not in self.vary)
+
+    def matches(self, request):
+        if not self.vary:
+            return True
+        headers = CaseInsensitiveDict(request.headers)
+        return all(name != '*' and headers.get(name) == value for name, value in self.vary.items())
+
     def update_request(self, request):
         if self.last_modified:
             request.headers['If-Modified-Since'] = self.last_modified
         if self.etag:
             request.headers['If-None-Match'] = self.etag
 
+    def update(self, response):
+        """
+        Refresh the entry with headers of a "304 Not Modified" response.
+        """
+        for name, value in response.headers.items():
+            if name.lower() not in ('content-length', 'content-encoding', 'transfer-encoding'):
+                self.response.headers[name] = value
+        self.etag = self.response.headers.get('ETag')
+        self.last_modified = self.response.headers.get('Last-Modified')
+        self.response_time = time.time()
+
+    @property
+    def cache_control(self):
+        return parse_cache_control(self.response.headers.get('Cache-Control'))
+
+    @property
+    def freshness_lifetime(self):
+        """
+        Number of seconds during which the response can be used without
+        asking the server (RFC 7234, section 4.2.1).
+        """
+        cache_control = self.cache_control
+        if 'no-cache' in cache_control or 'no-store' in cache_control:
+            return 0
+        if 'max-age' in cache_control:
+            return _seconds(cache_control['max-age']) or 0
+
+        expires = self.response.headers.get('Expires')
+        if expires is not None:
+            # An invalid date means already expired.
+            expires = parse_http_date(expires)
+            date = parse_http_date(self.response.headers.get('Date')) or self.response_time
+            return max(0, expires - date) if expires is not None else 0
+
+        return 0
+
+    @property
+    def age(self):
+        """
+        Current age of the response, in seconds (RFC 7234, section 4.2.3).
+        """
+        date = parse_http_date(self.response.headers.get('Date')) or self.response_time
+        initial_age = max(self.response_time - date, _seconds(self.response.headers.get('Age')) or 0, 0)
+        return initial_age + time.time() - self.response_time
+
+    def is_fresh(self):
+        return self.age < self.freshness_lifetime
+
+    def can_serve_stale(self):
+        """
+        Whether the stale response can be used while it is revalidated
+        (RFC 5861).
+        """
+        window = _seconds(self.cache_control.get('stale-while-revalidate'))
+        return bool(window) and self.age < self.freshness_lifetime + window
+
+    def __getstate__(self):
+        # Only keep what is needed to rebuild the response: the request and
+        # its hooks are bound to the browser.
+        response = self.response
+        return {'etag': self.etag,
+                'last_modified': self.last_modified,
+                'response_time': self.response_time,
+                'vary': self.vary,
+                'url': response.url,
+                'status_code': response.status_code,
+                'reason': response.reason,
+                'headers': list(response.headers.items()),
+                'encoding': response.encoding,
+                'content': response.content,
+               }
+
+    def __setstate__(self, state):
+        self.etag = state['etag']
+        self.last_modified = state['last_modified']
+        self.response_time = state.get('response_time', 0)
+        self.vary = state.get('vary')
+
+        response = requests.Response()
+        response.url = state['url']
+        response.status_code = state['status_code']
+        response.reason = state['reason']
+        response.headers = CaseInsensitiveDict(state['headers'])
+        response.encoding = state['encoding']
+        response._content = state['content']
+        self.response = response
+
+
+class SQLiteCacheStore(object):
+    """
+    Persistent store of cache entries, in a SQLite database.
+
+    It behaves like a dict, and can be shared by several browsers, threads
+    and processes, and kept between runs. Entries are separated by
+    namespace, for example the name of the backend which uses it.
+
+    When the database exceeds its budgets, least recently used entries are
+    removed. Entries older than the TTL are removed too.
+
+    :param path: path of the database file
+    :type path: :class:`str`
+    :param namespace: namespace of the entries of this store
+    :type namespace: :class:`str`
+    :param max_size: maximum size of stored values, in bytes, for every namespace
+    :type max_size: :class:`int`
+    :param max_entries: maximum number of entries, for every namespace
+    :type max_entries: :class:`int`
+    :param ttl: entries stored for more than this number of seconds are removed
+    :type ttl: :class:`int`
+    """
+
+    MAX_SIZE = 64 * 1024 * 1024
+    MAX_ENTRIES = 10000
+    TTL = 30 * 24 * 3600
+
+    def __init__(self, path, namespace='', max_size=None, max_entries=None, ttl=None):
+        self.path = path
+        self.namespace = namespace
+        self.max_size = self.MAX_SIZE if max_size is None else max_size
+        self.max_entries = self.MAX_ENTRIES if max_entries is None else max_entries
+        self.ttl = self.TTL if ttl is None else ttl
+        self._local = local()
+
+        dirname = os.path.dirname(path)
+        if dirname and not os.path.isdir(dirname):
+            os.makedirs(dirname)
+
+        with self._transaction() as db:
+            db.execute('''CREATE TABLE IF NOT EXISTS entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                stored REAL NOT NULL,
+                accessed REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )''')
+            db.execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)')
+
+    @property
+    def db(self):
+        # sqlite3 connections can't be shared between threads, nor survive
+        # a fork.
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            db.execute('PRAGMA journal_mode = WAL')
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    @contextmanager
+    def _transaction(self):
+        db = self.db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        else:
+            db.execute('COMMIT')
+
+    @staticmethod
+    def hash_key(key):
+        """
+        Get the identifier stored in database of a cache key.
+        """
+        return sha256(repr(key).encode('utf-8')).hexdigest()
+
+    def __getitem__(self, key):
+        hashed = self.hash_key(key)
+        row = self.db.execute('SELECT value, stored FROM entries WHERE namespace = ? AND key = ?',
+                              (self.namespace, hashed)).fetchone()
+        now = time.time()
+        if row is None or (self.ttl and row[1] < now - self.ttl):
+            raise KeyError(key)
+
+        try:
+            value = pickle.loads(row[0])
+        except Exception:
+            # Stored by an incompatible version.
+            self._delete(hashed)
+            raise KeyError(key)
+
+        self.db.execute('UPDATE entries SET accessed = ? WHERE namespace = ? AND key = ?',
+                        (now, self.namespace, hashed))
+        return value
+
+    def __contains__(self, key):
+        row = self.db.execute('SELECT stored FROM entries WHERE namespace = ? AND key = ?',
+                              (self.namespace, self.hash_key(key))).fetchone()
+        return row is not None and not (self.ttl and row[0] < time.time() - self.ttl)
+
+    def __setitem__(self, key, value):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with self._transaction() as db:
+            db.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)',
+                       (self.namespace, self.hash_key(key), sqlite3.Binary(data), len(data), now, now))
+            self._evict(db, now)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def _delete(self, key):
+        with self._transaction() as db:
+            return db.execute('DELETE FROM entries WHERE namespace = ? AND key = ?',
+                              (self.namespace, key)).rowcount
+
+    def __delitem__(self, key):
+        if not self._delete(self.hash_key(key)):
+            raise KeyError(key)
+
+    def __len__(self):
+        return self.db.execute('SELECT COUNT(*) FROM entries WHERE namespace = ?', (self.namespace,)).fetchone()[0]
+
+    def clear(self):
+        with self._transaction() as db:
+            db.execute('DELETE FROM entries WHERE namespace = ?', (self.namespace,))
+
+    def _evict(self, db, now):
+        if self.ttl:
+            db.execute('DELETE FROM entries WHERE stored < ?', (now - self.ttl,))
+
+        count, size = db.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        if count <= self.max_entries and size <= self.max_size:
+            return
+
+        evicted = []
+        for rowid, entry_size in db.execute('SELECT rowid, size FROM entries ORDER BY accessed'):
+            if count <= self.max_entries and size <= self.max_size:
+                break
+            evicted.append((rowid,))
+            count -= 1
+            size -= entry_size
+        db.executemany('DELETE FROM entries WHERE rowid = ?', evicted)
+
+    def close(self):
+        db = getattr(self._local, 'db', None)
+        if db is not None and self._local.pid == os.getpid():
+            db.close()
+        self._local.db = None
+
 
 class CacheMixin(object):
     """Mixin to inherit in a Browser"""
 
+    PERSISTENT_CACHE = False
+    """
+    If True, modules give to the browser a :class:`SQLiteCacheStore`, kept
+    between runs and shared by every browser of the backend.
+    """
+
+    CACHE_KEY_HEADERS = ('Accept', 'Accept-Language', 'Authorization', 'Content-Type')
+    """
+    Request headers which are part of cache keys; other headers, like
+    Referer, do not prevent to use a cached response. None to use every
+    header. Response's Vary header is honoured in any case.
+    """
+
+    CACHE_KEY_IGNORED_PARAMS = ()
+    """
+    Query string parameters which are not part of cache keys, for example
+    cache busters or tracking parameters.
+    """
+
+    CACHE_KEY_SORT_QUERY = False
+    """
+    If True, the order of parameters in query strings does not matter. Only
+    enable it when the website ignores this order.
+    """
+
+    CACHE_ASYNC_OPEN = False
+    """
+    If True, :meth:`async_open` uses the cache too, so pages loaded
+    asynchronously (see :class:`weboob.browser.filters.standard.AsyncLoad`)
+    are reused.
+    """
+
     def __init__(self, *args, **kwargs):
+        cache = kwargs.pop('cache', None)
         super(CacheMixin, self).__init__(*args, **kwargs)
 
-        self.cache = {}
+        self.cache = {} if cache is None else cache
 
         """Cache store object
 
-        To limit the size of the cache, a :class:`weboob.tools.lrudict.LimitedLRUDict`
-        instance can be used.
+        Any mapping can be used. To limit the size of the cache, a
+        :class:`weboob.tools.lrudict.LimitedLRUDict` instance can be used;
+        to keep it between runs, a :class:`SQLiteCacheStore`.
         """
 
         self.is_updatable = True
@@ -57,42 +412,189 @@ class CacheMixin(object):
         If `False`, once a request has been successfully executed, its response
         will always be returned.
 
-        If `True`, the `ETag` and `Last-Modified` of the response will be
-        stored along with the cache. When the request is re-executed, instead
-        of simply returning the previous response, the server is queried to
-        check if a newer version of the page exists.
-        If a newer page exists, it is returned instead and overwrites the
-        obsolete page in the cache.
+        If `True`, a response is returned from the cache without any request
+        while it is fresh, according to its `Cache-Control` and `Expires`
+        headers. Once it is stale, the `ETag` and `Last-Modified` stored along
+        with it are used to ask the server if a newer version of the page
+        exists. If a newer page exists, it is returned instead and overwrites
+        the obsolete page in the cache.
+        """
+
+        self.stale_while_revalidate = False
+
+        """Whether stale responses can be returned while they are revalidated
+
+        If `True`, a stale response with a `stale-while-revalidate` directive
+        is returned immediately during the allowed period, and revalidated in
+        background for the next calls.
+        """
+
+        self.cache_stats = Counter()
+
+        """Counters of cache usage
+
+        * `hit`: fresh response returned without any request
+        * `stale`: stale response returned while revalidated in background
+        * `revalidated`: server answered that the cached response is still valid
+        * `miss`: response downloaded
+        """
+
+        self.cache_miss_reasons = Counter()
+
+        """Why cache misses happened
+
+        * `absent`: no entry for the key of the request
+        * `vary`: request headers differ from the ones of the cached response,
+          according to its `Vary` header
+        * `stale`: cached response was stale, without validators
+        * `modified`: server returned a new version of the cached response
         """
+        self._cache_stats_lock = Lock()
+
+    def _count(self, name, reason=None):
+        with self._cache_stats_lock:
+            self.cache_stats[name] += 1
+            if reason is not None:
+                self.cache_miss_reasons[reason] += 1
 
     def make_cache_key(self, request):
-        """Make a key for the cache corresponding to the request."""
+        """
+        Make a key for the cache corresponding to the request.
+
+        It is made of the method, the normalized URL, the body and the request
+        headers listed in :attr:`CACHE_KEY_HEADERS`.
+        """
+
+        url = request.url
+        params = getattr(request, 'params', None)
+        if params or self.CACHE_KEY_SORT_QUERY or self.CACHE_KEY_IGNORED_PARAMS:
+            url, _, query = url.partition('#')[0].partition('?')
+            query = parse_qsl(query, keep_blank_values=True)
+            if isinstance(params, dict):
+                query += list(params.items())
+            elif params:
+                query += list(params)
+            query = [(k, v) for k, v in query if k not in self.CACHE_KEY_IGNORED_PARAMS]
+            if self.CACHE_KEY_SORT_QUERY:
+                query.sort(key=lambda param: tuple(unicode(p) for p in param))
+            if query:
+                url = '%s?%s' % (url, urlencode(query))
 
         body = getattr(request, 'body', None)
-        headers = tuple(request.headers.values())
-        return (request.method, request.url, body, headers)
+        if body is None and getattr(request, 'json', None) is not None:
+            body = json.dumps(request.json, sort_keys=True)
+        elif body is None:
+            # Not a prepared request.
+            body = getattr(request, 'data', None) or None
+            if isinstance(body, dict):
+                body = repr(sorted(body.items(), key=lambda item: unicode(item[0])))
+            elif isinstance(body, list):
+                body = repr(body)
+
+        headers = CaseInsensitiveDict(request.headers)
+        if self.CACHE_KEY_HEADERS is None:
+            headers = tuple(sorted((name.lower(), value) for name, value in headers.items()))
+        else:
+            headers = tuple((name.lower(), headers[name]) for name in self.CACHE_KEY_HEADERS if name in headers)
+        return (request.method, url, body, headers)
+
+    def _restore_page(self, response):
+        # Responses returned from the cache are not handled by
+        # PagesBrowser.open(), and pages are not kept in persistent stores.
+        if getattr(response, 'page', None) is None and hasattr(self, '_urls'):
+            response.page = None
+            for url in self._urls.values():
+                response.page = url.handle(response)
+                if response.page is not None:
+                    break
+        return response
+
+    def _cached_result(self, request, response, is_async, callback):
+        if response.request is None:
+            # Entry loaded from a persistent store.
+            response.request = self.prepare_request(request)
+        result = callback(self._restore_page(response))
+        if not is_async:
+            return result
+
+        future = Future()
+        future.set_result(result)
+        return future
 
-    def open_with_cache(self, url, **kwargs):
+    def async_open(self, url, **kwargs):
+        """
+        Same as :meth:`weboob.browser.browsers.Browser.async_open`, using
+        the cache if :attr:`CACHE_ASYNC_OPEN` is True.
+        """
+        if not self.CACHE_ASYNC_OPEN:
+            return super(CacheMixin, self).async_open(url, **kwargs)
+
+        kwargs.pop('async', None)
+        kwargs.pop('is_async', None)
+        return self.open_with_cache(url, is_async=True, **kwargs)
+
+    def open_with_cache(self, url, is_async=False, callback=lambda response: response, **kwargs):
         """Perform a request using the cache if possible."""
         request = self.build_request(url, **kwargs)
+        if hasattr(self, 'absurl'):
+            # Relative and absolute URLs share the same entry.
+            request.url = self.absurl(request.url)
 
         key = self.make_cache_key(request)
-        if key in self.cache:
-            if not self.is_updatable:
-                self.logger.debug('cache HIT for %r', request.url)
-                return self.cache[key].response
+        # Headers listed in Vary are compared on the request as it is sent,
+        # with the headers and cookies of the session.
+        prepared = self.prepare_request(request)
+        try:
+            entry = self.cache[key]
+        except KeyError:
+            entry = None
+            reason = 'absent'
+        else:
+            if not entry.matches(prepared):
+                entry = None
+                reason = 'vary'
             else:
-                self.cache[key].update_request(request)
+                reason = 'modified' if entry.has_cache_key() else 'stale'
+
+        if entry is not None:
+            if not self.is_updatable or \
+               (entry.is_fresh() and 'no-cache' not in parse_cache_control(request.headers.get('Cache-Control'))):
+                self.logger.debug('cache HIT for %r', request.url)
+                self._count('hit')
+                return self._cached_result(request, entry.response, is_async, callback)
 
-        response = super(CacheMixin, self).open(request, **kwargs)
-        if response.status_code == 304:
-            self.logger.debug('cache HIT for %r', request.url)
-            return self.cache[key].response
-        elif response.status_code == 200:
+            entry.update_request(request)
+            if self.stale_while_revalidate and entry.can_serve_stale():
+                self.logger.debug('cache STALE for %r, revalidating', request.url)
+                self._count('stale')
+                def revalidate(response):
+                    return self._handle_cache_response(prepared, key, entry, response, reason)
+
+                super(CacheMixin, self).open(request, is_async=True, callback=revalidate, **kwargs)
+                return self._cached_result(request, entry.response, is_async, callback)
+
+        def handle_response(response):
+            return callback(self._handle_cache_response(prepared, key, entry, response, reason))
+
+        return super(CacheMixin, self).open(request, is_async=is_async, callback=handle_response, **kwargs)
+
+    def _handle_cache_response(self, request, key, entry, response, reason):
+        if response.status_code == 304 and entry is not None:
+            self.logger.debug('cache HIT for %r, not modified', request.url)
+            self._count('revalidated')
+            entry.update(response)
+            if entry.response.request is None:
+                # Entry loaded from a persistent store.
+                entry.response.request = response.request
+            self.cache[key] = entry
+            return self._restore_page(entry.response)
+
+        self.logger.debug('cache MISS for %r (%s)', request.url, reason)
+        self._count('miss', reason)
+        if response.status_code == 200:
             entry = CacheEntry(response)
-            if entry.has_cache_key():
+            entry.set_vary(request)
+            if entry.is_storable() and (entry.has_cache_key() or entry.freshness_lifetime):
                 self.logger.debug('storing %r response in cache', request.url)
                 self.cache[key] = entry
-
-        self.logger.debug('cache MISS for %r', request.url)
         return response
@@ -24,9 +24,7 @@ import re
 import sys
 from collections import OrderedDict
 from copy import deepcopy
-import traceback
-
-import lxml.html
+from dis import findlinestarts
 
 from weboob.tools.log import getLogger, DEBUG_FILTERS
 from weboob.tools.compat import basestring, unicode, with_metaclass
@@ -198,6 +196,11 @@ class ListElement(AbstractElement):
 
         self.parse(self.el)
 
+        prefetcher = getattr(self.page, 'prefetcher', None)
+        if prefetcher is not None and self.parent is None and hasattr(self, 'next_page'):
+            # The next page is requested while items are processed.
+            self._next_page = prefetcher.prefetch(self)
+
         items = []
         for el in self.find_elements():
             for attrname in dir(self):
@@ -226,16 +229,25 @@ class ListElement(AbstractElement):
         for obj in self.objects.values():
             yield obj
 
+    def get_next_page(self):
+        """
+        Get the next page given by the `next_page` attribute, which is
+        evaluated only once.
+
+        :returns: URL or request of the next page, or None
+        """
+        if '_next_page' not in self.__dict__:
+            try:
+                self._next_page = self.use_selector(getattr(self, 'next_page'))
+            except (AttributeNotFound, XPathNotFound):
+                self._next_page = None
+        return self._next_page
+
     def check_next_page(self):
         if not hasattr(self, 'next_page'):
             return
 
-        next_page = getattr(self, 'next_page')
-        try:
-            value = self.use_selector(next_page)
-        except (AttributeNotFound, XPathNotFound):
-            return
-
+        value = self.get_next_page()
         if value is None:
             return
 
@@ -274,7 +286,10 @@ class _ItemElementMeta(type):
         # constants first, then filters, then methods
         filters.sort(key=lambda x: x[1]._creation_counter if hasattr(x[1], '_creation_counter') else (sys.maxsize if callable(x[1]) else 0))
 
-        attrs['_class_file'], attrs['_class_line'] = traceback.extract_stack()[-2][:2]
+        # Only keep where the class statement is executed: its line is
+        # resolved if a warning needs it, without reading the source file.
+        frame = sys._getframe(1)
+        attrs['_class_site'] = (frame.f_code, frame.f_lasti)
         new_class = super(_ItemElementMeta, mcs).__new__(mcs, name, bases, attrs)
         new_class._attrs = _attrs + [f[0] for f in filters]
         return new_class
@@ -290,6 +305,20 @@ class ItemElement(with_metaclass(_ItemElementMeta, AbstractElement)):
     class Index(object):
         pass
 
+    @property
+    def _class_file(self):
+        return self._class_site[0].co_filename
+
+    @property
+    def _class_line(self):
+        code, lasti = self._class_site
+        line = code.co_firstlineno
+        for offset, lineno in findlinestarts(code):
+            if offset > lasti:
+                break
+            line = lineno
+        return line
+
     def __init__(self, *args, **kwargs):
         super(ItemElement, self).__init__(*args, **kwargs)
         self.logger = getLogger(self.__class__.__name__.lower())
@@ -323,6 +352,7 @@ class ItemElement(with_metaclass(_ItemElementMeta, AbstractElement)):
         if not self.should_highlight():
             return
 
+        import lxml.html
         responses_dirname = self.page.browser.responses_dirname
         html = lxml.html.tostring(self.el.getroottree().getroot())
 
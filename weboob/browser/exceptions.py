@@ -19,7 +19,6 @@
 
 import datetime
 
-from dateutil.relativedelta import relativedelta
 from requests.exceptions import HTTPError
 from weboob.exceptions import (
     BrowserHTTPError, BrowserHTTPNotFound, BrowserUnavailable,
@@ -42,6 +41,13 @@ class LoggedOut(Exception):
     pass
 
 
+class RequestAborted(Exception):
+    """
+    Raised when a request is interrupted because the browser has been
+    aborted, see :func:`weboob.browser.browsers.Browser.abort`.
+    """
+
+
 class BrowserTooManyRequests(BrowserUnavailable):
     """
     Client tries to perform too many requests within a certain timeframe.
@@ -55,6 +61,7 @@ class BrowserTooManyRequests(BrowserUnavailable):
             next_try = datetime.datetime.combine(next_try, datetime.datetime.min.time())
 
         if next_try is None:
+            from dateutil.relativedelta import relativedelta
             next_try = datetime.datetime.now() + relativedelta(days=1)
 
         if not isinstance(next_try, datetime.datetime):
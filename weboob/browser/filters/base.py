@@ -19,13 +19,15 @@
 
 from functools import wraps
 
-import lxml.html
-
 from weboob.exceptions import ParseError
 from weboob.tools.compat import unicode, basestring
+from weboob.tools.lazy import lazy_import
 from weboob.tools.log import getLogger, DEBUG_FILTERS
 
 
+html = lazy_import('lxml.html')
+
+
 __all__ = ['FilterError', 'ItemNotFound', 'Filter',]
 
 
@@ -171,11 +173,11 @@ class Filter(_Filter):
         else:
             ret = selector
 
-        if isinstance(ret, lxml.html.HtmlElement):
+        if isinstance(ret, html.HtmlElement):
             self.highlight_el(ret, item)
         elif isinstance(ret, list):
             for el in ret:
-                if isinstance(el, lxml.html.HtmlElement):
+                if isinstance(el, html.HtmlElement):
                     self.highlight_el(el, item)
 
         return ret
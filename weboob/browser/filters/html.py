@@ -19,11 +19,11 @@
 import datetime
 from decimal import Decimal
 
-import lxml.html as html
 from six.moves.html_parser import HTMLParser
 
 from weboob.tools.compat import basestring, unicode, urljoin
 from weboob.tools.html import html2text
+from weboob.tools.lazy import lazy_import
 
 from .base import _NO_DEFAULT, Filter, FilterError, _Selector, debug, ItemNotFound
 from .standard import (
@@ -31,6 +31,9 @@ from .standard import (
     CleanText,
 )
 
+
+html = lazy_import('lxml.html')
+
 __all__ = ['CSS', 'XPath', 'XPathNotFound', 'AttributeNotFound',
            'Attr', 'Link', 'AbsoluteLink',
            'CleanHTML', 'FormValue', 'HasElement',
@@ -26,12 +26,11 @@ from collections import Iterator
 from decimal import Decimal, InvalidOperation
 from itertools import islice
 
-from dateutil.parser import parse as parse_date
-
 from weboob.browser.url import URL
 from weboob.capabilities.base import Currency as BaseCurrency
 from weboob.capabilities.base import empty
 from weboob.tools.compat import basestring, long, parse_qs, unicode, urlparse
+from weboob.tools.lazy import lazy_import
 
 from .base import _NO_DEFAULT, Filter, FilterError, ItemNotFound, _Filter, debug
 
@@ -46,6 +45,13 @@ __all__ = [
 ]
 
 
+dateutil_parser = lazy_import('dateutil.parser')
+
+
+def parse_date(timestr, *args, **kwargs):
+    return dateutil_parser.parse(timestr, *args, **kwargs)
+
+
 class ColumnNotFound(FilterError):
     pass
 
@@ -19,7 +19,8 @@
 
 from __future__ import absolute_import
 
-from collections import OrderedDict
+from collections import OrderedDict, deque
+from copy import copy, deepcopy
 from functools import wraps
 import warnings
 from io import BytesIO, StringIO
@@ -28,16 +29,20 @@ from cgi import parse_header
 from functools import reduce
 import re
 import sys
-
-import requests
+from threading import RLock
+from weakref import WeakKeyDictionary
 
 from weboob.exceptions import ParseError, ModuleInstallError
 from weboob.tools.compat import basestring, unicode, urljoin
+from weboob.tools.lazy import lazy_import
 from weboob.tools.log import getLogger
 from weboob.tools.pdf import decompress_pdf
 from .exceptions import LoggedOut
 
 
+requests = lazy_import('requests')
+
+
 def pagination(func):
     r"""
     This helper decorator can be used to handle pagination pages easily.
@@ -70,18 +75,28 @@ def pagination(func):
 
     @wraps(func)
     def inner(page, *args, **kwargs):
-        while True:
-            try:
-                for r in func(page, *args, **kwargs):
-                    yield r
-            except NextPage as e:
-                if isinstance(e.request, Page):
-                    page = e.request
+        depth = getattr(page.browser, 'PAGINATION_PREFETCH', 0)
+        prefetcher = PaginationPrefetcher(page.browser, depth) if depth else None
+        try:
+            while True:
+                if prefetcher is not None:
+                    prefetcher.attach(page)
+                try:
+                    for r in func(page, *args, **kwargs):
+                        yield r
+                except NextPage as e:
+                    if isinstance(e.request, Page):
+                        page = e.request
+                    elif prefetcher is not None:
+                        page = prefetcher.go(e.request).page
+                    else:
+                        result = page.browser.location(e.request)
+                        page = result.page
                 else:
-                    result = page.browser.location(e.request)
-                    page = result.page
-            else:
-                return
+                    return
+        finally:
+            if prefetcher is not None:
+                prefetcher.close()
 
     return inner
 
@@ -99,6 +114,178 @@ class NextPage(Exception):
         self.request = request
 
 
+class PaginationPrefetcher(object):
+    """
+    Request the next pages of a pagination while the current one is
+    processed.
+
+    It is used by :meth:`weboob.browser.browsers.PagesBrowser.pagination`
+    and :func:`pagination` when
+    :attr:`weboob.browser.browsers.PagesBrowser.PAGINATION_PREFETCH` is set.
+    A :class:`weboob.browser.elements.ListElement` with a `next_page`
+    attribute gives its next page to :meth:`prefetch` before processing its
+    items, and the following ones are found on the fetched pages, until
+    `depth` pages are requested in advance. When the :class:`NextPage`
+    exception is raised, :meth:`go` takes the response if it was fetched.
+
+    The `next_page` of elements is then evaluated before their items are
+    processed, possibly in a thread, and must only depend on the document.
+
+    :param browser: browser used to make requests
+    :type browser: :class:`weboob.browser.browsers.PagesBrowser`
+    :param depth: maximum number of pages requested in advance
+    :type depth: :class:`int`
+    """
+
+    def __init__(self, browser, depth):
+        self.browser = browser
+        self.depth = depth
+        self.logger = getLogger('prefetch', browser.logger)
+        self.page = None
+        self.klass = None
+        self.env = None
+        self.lock = RLock()
+        self.pending = deque()
+        self.next_pages = WeakKeyDictionary()
+        self.closed = False
+
+    def attach(self, page):
+        """
+        Set the page processed by the pagination.
+        """
+        if self.page is not None and self.page is not page:
+            self.page.prefetcher = None
+        self.page = page
+        if page is not None:
+            page.prefetcher = self
+
+    def key(self, request, base):
+        """
+        Get a key identifying a request to a page.
+        """
+        if not isinstance(request, requests.Request):
+            request = requests.Request(url=request)
+        method = request.method or ('POST' if request.data or request.json else 'GET')
+        return (method.upper(), urljoin(base, request.url),
+                repr(request.params), repr(request.data), repr(request.json))
+
+    def prefetch(self, element):
+        """
+        Request the next page of a list element, if it is not already
+        requested.
+
+        :param element: element, on the page processed by the pagination
+        :type element: :class:`weboob.browser.elements.ListElement`
+        :returns: the next page of the element
+        """
+        page = element.page
+        with self.lock:
+            if self.klass is None:
+                self.klass = type(element)
+                self.env = deepcopy(element.env)
+
+            if type(element) is self.klass and page in self.next_pages:
+                value = self.next_pages[page]
+            else:
+                value = element.get_next_page()
+
+            if not self.closed and type(element) is self.klass:
+                self._request(page, value)
+        return value
+
+    def _request(self, page, value):
+        if value is None or isinstance(value, Page) or len(self.pending) >= self.depth:
+            return
+
+        key = self.key(value, page.url)
+        if any(pending_key == key for pending_key, _ in self.pending):
+            return
+
+        if isinstance(value, requests.Request):
+            request = copy(value)
+            request.url = url = urljoin(page.url, value.url)
+        else:
+            request = url = urljoin(page.url, value)
+
+        self.logger.debug('Prefetch %s', url)
+        future = self.browser.async_open(request, referrer=self.browser.get_referrer(page.url, url) or False,
+                                         callback=self._resolve)
+        self.pending.append((key, future))
+        future.add_done_callback(self._fill)
+
+    def _resolve(self, response):
+        # Called in the thread of the request, to find the following page
+        # while the document is at hand.
+        if self.depth > 1 and response.page is not None:
+            try:
+                element = self.klass(response.page)
+                element.env = deepcopy(self.env)
+                element.env.update(response.page.params or {})
+                value = element.get_next_page()
+            except Exception as e:
+                self.logger.debug('Unable to find the next page of %s: %s', response.url, e)
+            else:
+                with self.lock:
+                    self.next_pages[response.page] = value
+        return response
+
+    def _fill(self, future=None):
+        with self.lock:
+            if self.closed or not self.pending:
+                return
+
+            last = self.pending[-1][1]
+            if not last.done() or last.cancelled() or last.exception() is not None:
+                return
+
+            page = last.result().page
+            if page is not None and page in self.next_pages:
+                self._request(page, self.next_pages[page])
+
+    def pop(self, request):
+        """
+        Take the future of a request to the next page, if it was requested.
+        Pages requested in advance after another one are cancelled.
+
+        :rtype: :class:`concurrent.futures.Future` or None
+        """
+        key = self.key(request, self.page.url if self.page is not None else self.browser.url)
+        with self.lock:
+            while self.pending:
+                pending_key, future = self.pending.popleft()
+                if pending_key == key:
+                    return future
+                future.cancel()
+        return None
+
+    def go(self, request):
+        """
+        Like :meth:`weboob.browser.browsers.PagesBrowser.location`, but take
+        the response if it was requested in advance.
+        """
+        future = self.pop(request)
+        if future is None:
+            return self.browser.location(request)
+
+        if self.browser.page is not None:
+            self.browser.page.on_leave()
+        response = self.browser._set_location(future.result())
+        # Request the following pages, now that there is room for them.
+        self._fill()
+        return response
+
+    def close(self):
+        """
+        Cancel pages requested in advance which are not started yet.
+        """
+        with self.lock:
+            self.closed = True
+            while self.pending:
+                self.pending.popleft()[1].cancel()
+        if self.page is not None and self.page.prefetcher is self:
+            self.page.prefetcher = None
+
+
 class Page(object):
     """
     Represents a page.
@@ -133,6 +320,12 @@ class Page(object):
     :class:`LoginBrowser` and the :func:`need_login` decorator.
     """
 
+    prefetcher = None
+    """
+    :class:`PaginationPrefetcher` of the pagination processing this page,
+    if its next pages are requested in advance.
+    """
+
     def __new__(cls, *args, **kwargs):
         """ Accept any arguments, necessary for AbstractPage __new__ override.
 
@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2019 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Per-host rate limiting of requests, shared by all browsers of the process
+and, optionally, by all processes of the system.
+
+Each host has a token bucket: a request takes a token, and tokens are given
+back at `rate` per second, up to `burst` ones. When the bucket is empty, the
+request waits for its token.
+
+>>> bucket = TokenBucket()
+>>> bucket.reserve(rate=10, burst=2, now=0)
+0
+>>> bucket.reserve(rate=10, burst=2, now=0)
+0
+>>> round(bucket.reserve(rate=10, burst=2, now=0), 2)
+0.1
+>>> round(bucket.reserve(rate=10, burst=2, now=0.05), 2)
+0.15
+"""
+
+from contextlib import contextmanager
+import os
+import re
+from tempfile import gettempdir
+from threading import BoundedSemaphore, Lock
+from time import sleep, time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from .exceptions import RequestAborted
+
+
+__all__ = ['TokenBucket', 'FileTokenBucket', 'FileSemaphore', 'HostLimiter']
+
+
+class TokenBucket(object):
+    """
+    Token bucket of a host, used by threads of the process.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.tokens = None
+        self.stamp = None
+
+    @staticmethod
+    def take(tokens, stamp, rate, burst, now):
+        """
+        Take a token from a bucket.
+
+        :returns: new tokens, and delay to wait before the request
+        """
+        if tokens is None:
+            tokens = burst
+        else:
+            tokens = min(burst, tokens + (now - stamp) * rate)
+        # Tokens can be borrowed, the request waits until they are given back.
+        tokens -= 1
+        return tokens, max(0, -tokens / rate)
+
+    def reserve(self, rate, burst=1, now=None):
+        """
+        Take a token.
+
+        :param rate: number of tokens given back per second
+        :type rate: :class:`float`
+        :param burst: maximum number of tokens
+        :type burst: :class:`int`
+        :returns: delay, in seconds, to wait before the request
+        :rtype: :class:`float`
+        """
+        if now is None:
+            now = time()
+        with self.lock:
+            self.tokens, delay = self.take(self.tokens, self.stamp, float(rate), burst, now)
+            self.stamp = now
+        return delay
+
+
+class FileTokenBucket(TokenBucket):
+    """
+    Token bucket of a host, stored in a file to be shared with other
+    processes.
+
+    :param path: path of the file
+    :type path: :class:`str`
+    """
+
+    def __init__(self, path):
+        super(FileTokenBucket, self).__init__()
+        self.path = path
+
+    def reserve(self, rate, burst=1, now=None):
+        with self.lock:
+            with open(self.path, 'a+') as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    if now is None:
+                        now = time()
+                    f.seek(0)
+                    try:
+                        tokens, stamp = [float(value) for value in f.read().split()]
+                    except ValueError:
+                        tokens = stamp = None
+                    tokens, delay = self.take(tokens, stamp, float(rate), burst, now)
+                    f.seek(0)
+                    f.truncate()
+                    f.write('%r %r' % (tokens, now))
+                    f.flush()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        return delay
+
+
+class FileSemaphore(object):
+    """
+    Semaphore shared with other processes, made of `count` lock files.
+
+    :param path: prefix of paths of files
+    :type path: :class:`str`
+    :param count: number of holders at once
+    :type count: :class:`int`
+    """
+
+    POLL_DELAY = 0.05
+
+    def __init__(self, path, count):
+        self.path = path
+        self.count = count
+
+    def acquire(self, cancelled=lambda: False):
+        """
+        Wait for a free slot.
+
+        :param cancelled: function returning True to stop waiting
+        :returns: file of the slot, to give to :meth:`release`
+        """
+        while True:
+            for i in range(self.count):
+                f = open('%s.%d' % (self.path, i), 'a')
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except (IOError, OSError):
+                    f.close()
+                else:
+                    return f
+            if cancelled():
+                raise RequestAborted()
+            sleep(self.POLL_DELAY)
+
+    def release(self, f):
+        fcntl.flock(f, fcntl.LOCK_UN)
+        f.close()
+
+
+def wait(delay, cancelled=lambda: False):
+    """
+    Sleep, but stop if `cancelled` returns True.
+    """
+    end = time() + delay
+    while not cancelled():
+        remaining = end - time()
+        if remaining <= 0:
+            return
+        sleep(min(remaining, 0.1))
+    raise RequestAborted()
+
+
+class HostLimiter(object):
+    """
+    Limit the rate and the number of concurrent requests to each host.
+
+    Limits are shared by all limiters of the process with the same
+    settings, and by other processes of the user when `shared` is True,
+    using files in a temporary directory.
+
+    :param rate: maximum number of requests per second, or None
+    :type rate: :class:`float`
+    :param burst: number of requests which can be sent at once
+    :type burst: :class:`int`
+    :param max_concurrent: maximum number of requests in progress, or None
+    :type max_concurrent: :class:`int`
+    :param shared: share limits with other processes
+    :type shared: :class:`bool`
+    """
+
+    _lock = Lock()
+    _buckets = {}
+    _semaphores = {}
+
+    def __init__(self, rate=None, burst=1, max_concurrent=None, shared=False):
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrent = max_concurrent
+        self.shared = shared and fcntl is not None
+
+    @classmethod
+    def directory(cls):
+        # Other users must not be able to lock the files.
+        path = os.path.join(gettempdir(), 'weboob_ratelimit_%d' % os.getuid())
+        try:
+            os.mkdir(path, 0o700)
+        except OSError:
+            if not os.path.isdir(path):
+                raise
+        if os.stat(path).st_uid != os.getuid():
+            raise OSError('%s is owned by another user' % path)
+        return path
+
+    def _path(self, host):
+        return os.path.join(self.directory(), re.sub(r'[^\w.-]', '_', host))
+
+    def bucket(self, host):
+        with self._lock:
+            key = (host, self.shared, self.rate, self.burst)
+            if key not in self._buckets:
+                if self.shared:
+                    path = '%s.%r-%d' % (self._path(host), float(self.rate), self.burst)
+                    self._buckets[key] = FileTokenBucket(path)
+                else:
+                    self._buckets[key] = TokenBucket()
+            return self._buckets[key]
+
+    def semaphore(self, host):
+        with self._lock:
+            key = (host, self.shared, self.max_concurrent)
+            if key not in self._semaphores:
+                if self.shared:
+                    self._semaphores[key] = FileSemaphore(self._path(host) + '.slot', self.max_concurrent)
+                else:
+                    self._semaphores[key] = BoundedSemaphore(self.max_concurrent)
+            return self._semaphores[key]
+
+    def acquire(self, host, cancelled=lambda: False):
+        """
+        Wait until a request can be sent to a host, and count it as in
+        progress until the returned function is called.
+
+        :param host: host, with its port
+        :type host: :class:`str`
+        :param cancelled: function returning True to stop waiting, which
+                          raises :class:`weboob.browser.exceptions.RequestAborted`
+        :returns: function to call once the request is finished, which
+                  does nothing when it is called again
+        """
+        # Take the token first, so a request waiting for its turn does not
+        # prevent others from being sent.
+        if self.rate:
+            wait(self.bucket(host).reserve(self.rate, self.burst), cancelled)
+
+        if not self.max_concurrent:
+            return lambda: None
+
+        semaphore = self.semaphore(host)
+        if self.shared:
+            slot = semaphore.acquire(cancelled)
+        else:
+            while not semaphore.acquire(timeout=0.1):
+                if cancelled():
+                    raise RequestAborted()
+
+        lock = Lock()
+        released = []
+
+        def release():
+            with lock:
+                if released:
+                    return
+                released.append(True)
+            if self.shared:
+                semaphore.release(slot)
+            else:
+                semaphore.release()
+        return release
+
+    @contextmanager
+    def limit(self, host, cancelled=lambda: False):
+        """
+        Same as :meth:`acquire`, counting the request as in progress until
+        the end of the block.
+        """
+        release = self.acquire(host, cancelled)
+        try:
+            yield
+        finally:
+            release()
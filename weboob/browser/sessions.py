@@ -20,6 +20,8 @@
 # Inspired by: https://github.com/ross/requests-futures/blob/master/requests_futures/sessions.py
 # XXX Licence issues?
 
+from threading import Lock
+
 try:
     from concurrent.futures import ThreadPoolExecutor
 except ImportError:
@@ -127,6 +129,8 @@ class FuturesSession(WeboobSession):
                 self.mount('http://', HTTPAdapter(**adapter_kwargs))
 
         self.executor = executor
+        self._futures_lock = Lock()
+        self._futures = set()
 
     def send(self, *args, **kwargs):
         """Maintains the existing api for :meth:`Session.send`
@@ -157,10 +161,37 @@ class FuturesSession(WeboobSession):
         if is_async:
             if not self.executor:
                 raise ImportError('Please install python3-concurrent.futures')
-            return self.executor.submit(func, *args, **kwargs)
+            future = self.executor.submit(func, *args, **kwargs)
+            with self._futures_lock:
+                self._futures.add(future)
+            future.add_done_callback(self._future_done)
+            return future
 
         return func(*args, **kwargs)
 
+    def _future_done(self, future):
+        with self._futures_lock:
+            self._futures.discard(future)
+
+    def abort(self):
+        """
+        Cancel asynchronous requests not started yet, and interrupt requests
+        in progress. Next requests fail until :func:`reset_abort` is called.
+        """
+        with self._futures_lock:
+            futures = list(self._futures)
+        for future in futures:
+            future.cancel()
+
+        for adapter in self.adapters.values():
+            if hasattr(adapter, 'abort'):
+                adapter.abort()
+
+    def reset_abort(self):
+        for adapter in self.adapters.values():
+            if hasattr(adapter, 'reset_abort'):
+                adapter.reset_abort()
+
     def close(self):
         super(FuturesSession, self).close()
         if self.executor:
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+# Copyright(C) 2010-2014 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+try:
+    from http.server import BaseHTTPRequestHandler
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler
+
+from weboob.browser.adapters import pool_registry
+from weboob.browser.browsers import Browser
+from weboob.tools.test import LocalServerTest
+
+
+class MyHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.clients.add(self.client_address)
+        body = self.headers.get('Cookie', '').encode('utf-8')
+        self.send_response(200)
+        if self.path == '/login':
+            self.send_header('Set-Cookie', 'session=%d' % self.client_address[1])
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MySharedBrowser(Browser):
+    SHARED_POOLS = True
+
+
+class MyInsecureBrowser(MySharedBrowser):
+    VERIFY = False
+
+
+class PoolRegistryTest(LocalServerTest):
+    HANDLER = MyHandler
+
+    def setUp(self):
+        super(PoolRegistryTest, self).setUp()
+        self.server.clients = set()
+        pool_registry.clear()
+
+    def tearDown(self):
+        pool_registry.clear()
+        super(PoolRegistryTest, self).tearDown()
+
+    def test_shared(self):
+        first = MySharedBrowser()
+        second = MySharedBrowser()
+        first.open(self.url + 'login')
+        self.assertEqual(second.open(self.url + 'page').text, u'')
+        self.assertEqual(first.open(self.url + 'page').text, u'session=%d' % list(self.server.clients)[0][1])
+
+        # Both browsers used the same connection, but not the same cookies.
+        self.assertEqual(len(self.server.clients), 1)
+        stats = pool_registry.stats()
+        self.assertEqual(stats['requests'], 3)
+        self.assertEqual(stats['reused'], 2)
+        self.assertEqual(stats['open'], 1)
+        self.assertEqual(stats['active'], 0)
+        self.assertEqual(stats['hosts'], {'127.0.0.1': {'open': 1, 'active': 0}})
+
+        # Closing a browser does not close connections of the other ones.
+        first.session.close()
+        second.open(self.url + 'page')
+        self.assertEqual(len(self.server.clients), 1)
+
+    def test_not_shared(self):
+        first = Browser()
+        second = Browser()
+        first.open(self.url)
+        second.open(self.url)
+        self.assertEqual(len(self.server.clients), 2)
+        self.assertEqual(pool_registry.stats()['requests'], 0)
+
+    def test_tls_settings(self):
+        first = MySharedBrowser()
+        second = MyInsecureBrowser()
+        first.open(self.url)
+        second.open(self.url)
+
+        # Pools are not shared between different TLS settings.
+        self.assertEqual(len(self.server.clients), 2)
+        self.assertEqual(len(pool_registry.managers), 2)
@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+# Copyright(C) 2010-2014 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler
+
+from weboob.browser.browsers import Browser, PagesBrowser
+from weboob.browser.cache import CacheMixin, SQLiteCacheStore
+from weboob.browser.pages import RawPage
+from weboob.browser.url import URL
+from weboob.tools.test import LocalServerTest
+
+
+class MyHandler(BaseHTTPRequestHandler):
+    ETAG = '"v1"'
+    CACHE_CONTROL = {'/fresh': 'max-age=60',
+                     '/swr': 'max-age=0, stale-while-revalidate=60',
+                     '/nostore': 'no-store',
+                     '/vary': 'max-age=60',
+                     '/vary-cookie': 'max-age=60',
+                    }
+
+    def do_GET(self):
+        self.server.requests.append((self.path, dict(self.headers)))
+        if self.headers.get('If-None-Match') == self.ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        path = self.path.partition('?')[0]
+        if path == '/vary-cookie':
+            body = ('content for %s' % self.headers.get('Cookie')).encode('utf-8')
+        else:
+            body = ('content of %s' % self.path).encode('utf-8')
+        self.send_response(200)
+        self.send_header('ETag', self.ETAG)
+        if path in self.CACHE_CONTROL:
+            self.send_header('Cache-Control', self.CACHE_CONTROL[path])
+        elif path == '/expired':
+            self.send_header('Expires', 'Thu, 01 Jan 1970 00:00:00 GMT')
+        if path == '/vary':
+            self.send_header('Vary', 'X-Variant')
+        elif path == '/vary-cookie':
+            self.send_header('Vary', 'Cookie')
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MyCacheBrowser(CacheMixin, Browser):
+    pass
+
+
+class MyPage(RawPage):
+    pass
+
+
+class MyCachePagesBrowser(CacheMixin, PagesBrowser):
+    BASEURL = 'http://127.0.0.1/'
+    fresh = URL(r'/fresh', MyPage)
+
+
+def fill_store(path, start):
+    store = SQLiteCacheStore(path, namespace='shared')
+    for i in range(start, start + 50):
+        store[i] = i
+
+
+class CacheTest(LocalServerTest):
+    HANDLER = MyHandler
+
+    def setUp(self):
+        super(CacheTest, self).setUp()
+        self.server.requests = []
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'cache.sqlite')
+
+    def tearDown(self):
+        super(CacheTest, self).tearDown()
+        shutil.rmtree(self.tmpdir)
+
+    def test_store(self):
+        store = SQLiteCacheStore(self.path, namespace='a')
+        other = SQLiteCacheStore(self.path, namespace='b')
+        store[('GET', 'http://a/')] = {'x': 1}
+
+        self.assertIn(('GET', 'http://a/'), store)
+        self.assertEqual(store[('GET', 'http://a/')], {'x': 1})
+        self.assertNotIn(('GET', 'http://a/'), other)
+        self.assertIsNone(other.get(('GET', 'http://a/')))
+        self.assertEqual(len(store), 1)
+
+        del store[('GET', 'http://a/')]
+        self.assertNotIn(('GET', 'http://a/'), store)
+        self.assertRaises(KeyError, store.__delitem__, ('GET', 'http://a/'))
+
+    def test_eviction(self):
+        store = SQLiteCacheStore(self.path, max_entries=3)
+        for i in range(3):
+            store[i] = i
+            time.sleep(0.01)
+        # 0 is the least recently used once it is read.
+        store[0]
+        store[3] = 3
+        self.assertEqual(sorted(i for i in range(4) if i in store), [0, 2, 3])
+
+        store = SQLiteCacheStore(self.path, namespace='size', max_size=2000)
+        store['big'] = b'x' * 1500
+        store['small'] = b'x'
+        store['bigger'] = b'x' * 1500
+        self.assertNotIn('big', store)
+        self.assertIn('bigger', store)
+
+        store = SQLiteCacheStore(self.path, namespace='ttl', ttl=0.05)
+        store['old'] = 1
+        time.sleep(0.1)
+        self.assertNotIn('old', store)
+        self.assertRaises(KeyError, store.__getitem__, 'old')
+
+    def test_processes(self):
+        ctx = multiprocessing.get_context('fork')
+        processes = [ctx.Process(target=fill_store, args=(self.path, i * 50)) for i in range(3)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+            self.assertEqual(process.exitcode, 0)
+
+        self.assertEqual(len(SQLiteCacheStore(self.path, namespace='shared')), 150)
+
+    def test_revalidate_between_runs(self):
+        browser = MyCacheBrowser(cache=SQLiteCacheStore(self.path, namespace='backend'))
+        response = browser.open_with_cache(self.url + 'page')
+        self.assertEqual(response.text, u'content of /page')
+
+        # Another run: the entry is revalidated instead of downloaded.
+        browser = MyCacheBrowser(cache=SQLiteCacheStore(self.path, namespace='backend'))
+        response = browser.open_with_cache(self.url + 'page')
+        self.assertEqual(response.text, u'content of /page')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(response.request)
+
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertNotIn('If-None-Match', self.server.requests[0][1])
+        self.assertEqual(self.server.requests[1][1]['If-None-Match'], MyHandler.ETAG)
+
+    def test_freshness(self):
+        browser = MyCacheBrowser()
+        for path in ('fresh', 'expired', 'nostore', 'page'):
+            for _ in range(2):
+                self.assertEqual(browser.open_with_cache(self.url + path).text, u'content of /%s' % path)
+
+        # A fresh response is returned without any request, a stale one is
+        # revalidated, and a no-store one is never stored.
+        self.assertEqual([path for path, headers in self.server.requests],
+                         ['/fresh', '/expired', '/expired', '/nostore', '/nostore', '/page', '/page'])
+        self.assertEqual([headers.get('If-None-Match') for path, headers in self.server.requests],
+                         [None, None, MyHandler.ETAG, None, None, None, MyHandler.ETAG])
+        self.assertEqual(browser.cache_stats, {'hit': 1, 'miss': 5, 'revalidated': 2})
+
+    def test_stale_while_revalidate(self):
+        browser = MyCacheBrowser()
+        browser.stale_while_revalidate = True
+        browser.open_with_cache(self.url + 'swr')
+        response = browser.open_with_cache(self.url + 'swr')
+        self.assertEqual(response.text, u'content of /swr')
+        self.assertEqual(browser.cache_stats['stale'], 1)
+
+        # The revalidation is done in background.
+        for _ in range(50):
+            if browser.cache_stats['revalidated']:
+                break
+            time.sleep(0.05)
+        self.assertEqual(browser.cache_stats['revalidated'], 1)
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_key_normalization(self):
+        browser = MyCacheBrowser()
+        browser.open_with_cache(self.url + 'fresh?a=1&b=2')
+        browser.open_with_cache(self.url + 'fresh?b=2&a=1')
+        self.assertEqual(len(self.server.requests), 2)
+        self.server.requests[:] = []
+
+        browser = MyCacheBrowser()
+        browser.CACHE_KEY_SORT_QUERY = True
+        browser.CACHE_KEY_IGNORED_PARAMS = ('_',)
+        browser.open_with_cache(self.url + 'fresh?a=1&b=2&_=1234', headers={'Referer': 'http://a/'})
+        browser.open_with_cache(self.url + 'fresh?b=2&a=1&_=5678', headers={'Referer': 'http://b/'})
+        browser.open_with_cache(self.url + 'fresh', params={'b': '2', 'a': '1'})
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(browser.cache_stats['hit'], 2)
+
+        browser.open_with_cache(self.url + 'fresh?a=2&b=2')
+        browser.open_with_cache(self.url + 'fresh?a=1&b=2', headers={'Accept': 'application/json'})
+        self.assertEqual(browser.cache_miss_reasons, {'absent': 3})
+
+    def test_vary(self):
+        browser = MyCacheBrowser()
+        for variant in ('a', 'a', 'b', 'b'):
+            browser.open_with_cache(self.url + 'vary', headers={'X-Variant': variant})
+
+        # The entry is replaced by the one of the new variant.
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(browser.cache_miss_reasons, {'absent': 1, 'vary': 1})
+        self.assertEqual(browser.cache_stats['hit'], 2)
+
+    def test_vary_session(self):
+        # Cookies of the session are part of the request which is sent.
+        browsers = []
+        for value in ('a', 'b'):
+            browser = MyCacheBrowser(cache=SQLiteCacheStore(self.path))
+            browser.session.cookies.set('session', value)
+            browsers.append(browser)
+
+        for browser, value in zip(browsers * 2, 'abab'):
+            response = browser.open_with_cache(self.url + 'vary-cookie')
+            self.assertEqual(response.text, u'content for session=%s' % value)
+
+        self.assertEqual(len(self.server.requests), 4)
+        self.assertEqual(browsers[1].cache_miss_reasons, {'vary': 2})
+
+    def test_async_open(self):
+        browser = MyCachePagesBrowser(cache=SQLiteCacheStore(self.path))
+        browser.BASEURL = self.url
+        browser.async_open('/fresh').result()
+        self.assertEqual(len(browser.cache), 0)
+
+        browser.CACHE_ASYNC_OPEN = True
+        first = browser.async_open('/fresh').result()
+        self.assertIsInstance(first.page, MyPage)
+
+        # Pages loaded again, for example by AsyncLoad on another page of a
+        # list, are taken from the cache.
+        browser = MyCachePagesBrowser(cache=SQLiteCacheStore(self.path))
+        browser.BASEURL = self.url
+        browser.CACHE_ASYNC_OPEN = True
+        second = browser.async_open('/fresh').result()
+        self.assertIsInstance(second.page, MyPage)
+        self.assertEqual(second.text, first.text)
+        self.assertEqual(len(self.server.requests), 2)
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+# Copyright(C) 2010-2014 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+import time
+from threading import Lock
+
+try:
+    from http.server import BaseHTTPRequestHandler
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler
+
+from weboob.browser.browsers import PagesBrowser
+from weboob.browser.exceptions import HTTPNotFound
+from weboob.browser.pages import RawPage
+from weboob.browser.url import URL
+from weboob.tools.test import LocalServerTest
+
+
+class MyHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        with self.server.lock:
+            self.server.requests.append((self.command, self.path))
+        time.sleep(0.5 if self.path == '/slow' else 0.1)
+        body = ('content of %s' % self.path).encode('utf-8')
+        self.send_response(404 if self.path == '/missing' else 200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_POST = do_GET
+
+
+class DetailPage(RawPage):
+    pass
+
+
+class MyBrowser(PagesBrowser):
+    COALESCE_WINDOW = 0
+
+    detail = URL(r'/detail', DetailPage)
+
+
+class MyOneWorkerBrowser(MyBrowser):
+    MAX_WORKERS = 1
+
+
+class CoalesceTest(LocalServerTest):
+    HANDLER = MyHandler
+
+    def setUp(self):
+        super(CoalesceTest, self).setUp()
+        self.server.lock = Lock()
+        self.server.requests = []
+        self.browser = MyBrowser()
+        self.browser.BASEURL = self.url
+
+    def test_in_flight(self):
+        # Like AsyncLoad on rows linking to the same page.
+        futures = [self.browser.async_open('/detail') for _ in range(3)]
+        other = self.browser.async_open('/other')
+        response = self.browser.open('/detail')
+
+        responses = [future.result() for future in futures] + [response]
+        self.assertEqual(sorted(self.server.requests), [('GET', '/detail'), ('GET', '/other')])
+        self.assertEqual(self.browser.coalesced_requests, 3)
+        self.assertEqual(other.result().text, u'content of /other')
+
+        # Each caller gets its own response and page.
+        self.assertEqual(set(r.text for r in responses), set([u'content of /detail']))
+        self.assertEqual(len(set(id(r) for r in responses)), 4)
+        self.assertEqual(len(set(id(r.page) for r in responses)), 4)
+        self.assertTrue(all(isinstance(r.page, DetailPage) for r in responses))
+
+    def test_window(self):
+        self.browser.open('/detail')
+        self.browser.open('/detail')
+        self.assertEqual(len(self.server.requests), 2)
+
+        self.browser.COALESCE_WINDOW = 10
+        self.browser.open('/other')
+        self.browser.open('/other')
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(self.browser.coalesced_requests, 1)
+
+    def test_not_idempotent(self):
+        futures = [self.browser.async_open('/detail', data={'a': 1}) for _ in range(2)]
+        for future in futures:
+            future.result()
+        self.assertEqual(self.server.requests, [('POST', '/detail')] * 2)
+        self.assertEqual(self.browser.coalesced_requests, 0)
+
+    def test_headers(self):
+        futures = [self.browser.async_open('/detail', headers={'Accept': accept})
+                   for accept in ('text/html', 'application/json', 'text/html')]
+        for future in futures:
+            future.result()
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_error(self):
+        futures = [self.browser.async_open('/missing') for _ in range(2)]
+        for future in futures:
+            self.assertRaises(HTTPNotFound, future.result)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_send_settings(self):
+        futures = [self.browser.async_open('/detail', timeout=timeout) for timeout in (5, 6, 5)]
+        futures += [self.browser.async_open('/detail', verify=False)]
+        for future in futures:
+            future.result()
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_body(self):
+        futures = [self.browser.async_open('/detail', method='GET', data={'a': 1}) for _ in range(2)]
+        for future in futures:
+            future.result()
+        self.assertEqual(self.server.requests, [('GET', '/detail')] * 2)
+        self.assertEqual(self.browser.coalesced_requests, 0)
+
+    def test_late(self):
+        # The first request waits for the worker, busy with another request.
+        self.browser = MyOneWorkerBrowser()
+        self.browser.BASEURL = self.url
+        slow = self.browser.async_open('/slow')
+        first = self.browser.async_open('/detail', timeout=0.3)
+        response = self.browser.open('/detail', timeout=0.3)
+
+        self.assertEqual(response.text, u'content of /detail')
+        self.assertEqual(first.result().text, u'content of /detail')
+        slow.result()
+        self.assertEqual(self.server.requests.count(('GET', '/detail')), 2)
+        self.assertEqual(self.browser.coalesced_requests, 0)
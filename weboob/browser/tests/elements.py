@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+# Copyright(C) 2010-2014 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+import inspect
+from unittest import TestCase
+
+from weboob.browser.elements import ItemElement, ListElement, method
+from weboob.browser.filters.standard import Env
+from weboob.capabilities.base import BaseObject
+
+
+class MyMockPage(object):
+    params = {}
+
+    def __init__(self, doc):
+        self.doc = doc
+
+    @method
+    class iter_items(ListElement):
+        item_xpath = '//li'
+
+        class item(ItemElement):
+            klass = BaseObject
+
+            obj_id = Env('missing')
+
+
+class ItemElementTest(TestCase):
+    def test_warning_location(self):
+        from lxml import html
+
+        page = MyMockPage(html.fromstring('<ul><li>1</li></ul>'))
+        with self.assertLogs('item', 'WARNING') as cm:
+            with self.assertRaises(Exception):
+                list(page.iter_items())
+
+        # The definition site of the class is resolved when it is logged.
+        line = inspect.getsourcelines(MyMockPage.iter_items.klass.item)[1]
+        self.assertIn('Attribute id (in %s:%d)' % (__file__, line), cm.output[0])
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+# Copyright(C) 2010-2014 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+import re
+import time
+from threading import Lock
+
+try:
+    from http.server import BaseHTTPRequestHandler
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler
+
+from weboob.browser.browsers import PagesBrowser
+from weboob.browser.elements import ItemElement, ListElement, method
+from weboob.browser.filters.html import Link
+from weboob.browser.filters.standard import CleanText
+from weboob.browser.pages import HTMLPage, pagination
+from weboob.browser.url import URL
+from weboob.capabilities.base import BaseObject
+from weboob.exceptions import BrowserUnavailable
+from weboob.tools.test import LocalServerTest
+
+
+PAGES = 5
+
+
+class MyHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        with self.server.lock:
+            self.server.running += 1
+            self.server.max_running = max(self.server.max_running, self.server.running)
+        # Let concurrent requests overlap, and last pages come first.
+        num = int(re.match(r'/list-(\d+)', self.path).group(1))
+        time.sleep(self.server.delay * (PAGES - num))
+        with self.server.lock:
+            self.server.running -= 1
+
+        items = ''.join('<li>%d</li>' % (num * 10 + i) for i in range(3))
+        link = '<a href="list-%d">next</a>' % (num + 1) if num < PAGES else ''
+        body = ('<html><body><ul>%s</ul>%s<span id="total">%d</span></body></html>' % (items, link, PAGES))
+        body = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ListPage(HTMLPage):
+    @method
+    class iter_values(ListElement):
+        item_xpath = '//li'
+        next_page = Link('//a')
+
+        class item(ItemElement):
+            klass = BaseObject
+
+            obj_id = CleanText('.')
+
+    @pagination
+    @method
+    class iter_decorated(ListElement):
+        item_xpath = '//li'
+        next_page = Link('//a')
+
+        class item(ItemElement):
+            klass = BaseObject
+
+            obj_id = CleanText('.')
+
+
+    def get_total(self):
+        return int(self.doc.xpath('//span[@id="total"]')[0].text)
+
+
+class OtherPage(ListPage):
+    is_here = '//div[@id="other"]'
+
+
+class MyBrowser(PagesBrowser):
+    list = URL(r'/list-(?P<num>\d+)', ListPage)
+    other = URL(r'/list-(?P<num>\d+)', OtherPage)
+
+
+EXPECTED = ['%d' % (num * 10 + i) for num in range(1, PAGES + 1) for i in range(3)]
+
+
+class ServerTestCase(LocalServerTest):
+    HANDLER = MyHandler
+
+    def setUp(self):
+        super(ServerTestCase, self).setUp()
+        self.server.requests = []
+        self.server.lock = Lock()
+        self.server.running = self.server.max_running = 0
+        self.server.delay = 0
+        self.browser = MyBrowser()
+        self.browser.BASEURL = self.url
+
+    def wait_requests(self, count):
+        for _ in range(100):
+            if len(self.server.requests) >= count:
+                break
+            time.sleep(0.02)
+        return self.server.requests
+
+
+
+class PaginationTest(ServerTestCase):
+    def test_no_prefetch(self):
+        self.browser.list.go(num=1)
+        values = self.browser.pagination(lambda: self.browser.page.iter_values())
+        self.assertEqual(next(values).id, '10')
+        time.sleep(0.1)
+        self.assertEqual(self.server.requests, ['/list-1'])
+        self.assertEqual([obj.id for obj in values], EXPECTED[1:])
+
+    def test_prefetch(self):
+        self.browser.PAGINATION_PREFETCH = 2
+        self.browser.list.go(num=1)
+        values = self.browser.pagination(lambda: self.browser.page.iter_values())
+
+        # The next pages are requested when the first item is yielded, up
+        # to the prefetch depth.
+        self.assertEqual(next(values).id, '10')
+        self.assertEqual(self.wait_requests(3), ['/list-1', '/list-2', '/list-3'])
+        time.sleep(0.1)
+        self.assertEqual(len(self.server.requests), 3)
+
+        self.assertEqual([obj.id for obj in values], EXPECTED[1:])
+        self.assertEqual(self.server.requests, ['/list-%d' % num for num in range(1, PAGES + 1)])
+        self.assertTrue(self.browser.url.endswith('/list-%d' % PAGES))
+        self.assertIsNone(self.browser.page.prefetcher)
+
+    def test_decorator(self):
+        self.browser.PAGINATION_PREFETCH = 1
+        self.browser.list.go(num=1)
+        self.assertEqual([obj.id for obj in self.browser.page.iter_decorated()], EXPECTED)
+        self.assertEqual(self.server.requests, ['/list-%d' % num for num in range(1, PAGES + 1)])
+
+    def test_stop(self):
+        self.browser.PAGINATION_PREFETCH = 1
+        self.browser.list.go(num=1)
+        values = self.browser.pagination(lambda: self.browser.page.iter_values())
+        next(values)
+        values.close()
+
+        # The prefetched page is not used, and no other one is requested.
+        self.wait_requests(2)
+        time.sleep(0.1)
+        self.assertEqual(self.server.requests, ['/list-1', '/list-2'])
+        self.assertTrue(self.browser.url.endswith('/list-1'))
+
+
+class ParallelPaginationTest(ServerTestCase):
+    def iter_values(self, pages, **kwargs):
+        values = self.browser.parallel_pagination(self.browser.list, lambda page: page.iter_values(),
+                                                  pages, param='num', **kwargs)
+        return [obj.id for obj in values]
+
+    def test_parallel(self):
+        self.server.delay = 0.05
+        self.browser.PAGINATION_WORKERS = 3
+        self.assertEqual(self.iter_values(PAGES), EXPECTED)
+        self.assertEqual(sorted(self.server.requests), ['/list-%d' % num for num in range(1, PAGES + 1)])
+        self.assertEqual(self.server.max_running, 3)
+        self.assertIsNone(self.browser.page)
+
+    def test_total(self):
+        self.browser.PAGINATION_WORKERS = 3
+        self.assertEqual(self.iter_values(ListPage.get_total), EXPECTED)
+        self.assertEqual(self.server.requests[0], '/list-1')
+        self.assertTrue(self.browser.url.endswith('/list-1'))
+
+    def test_pages(self):
+        self.browser.PAGINATION_WORKERS = 3
+        self.assertEqual(self.iter_values([2, 4]), EXPECTED[3:6] + EXPECTED[9:12])
+
+    def test_serial(self):
+        self.server.delay = 0.01
+        self.browser.PAGINATION_WORKERS = 1
+        self.assertEqual(self.iter_values(PAGES), EXPECTED)
+        self.assertEqual(self.server.requests, ['/list-%d' % num for num in range(1, PAGES + 1)])
+        self.assertEqual(self.server.max_running, 1)
+        self.assertTrue(self.browser.url.endswith('/list-%d' % PAGES))
+
+    def test_unexpected_page(self):
+        # Responses which do not match the page of the URL are not given
+        # to the function.
+        for workers in (3, 1):
+            self.browser.PAGINATION_WORKERS = workers
+            values = self.browser.parallel_pagination(self.browser.other, lambda page: page.iter_values(),
+                                                      PAGES, param='num')
+            self.assertRaises(BrowserUnavailable, list, values)
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+# Copyright(C) 2010-2014 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+import os
+import shutil
+import tempfile
+import time
+from threading import Lock
+from unittest import TestCase
+
+try:
+    from http.server import BaseHTTPRequestHandler
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler
+
+from weboob.browser.browsers import Browser
+from weboob.browser.exceptions import RequestAborted
+from weboob.browser.ratelimit import FileSemaphore, FileTokenBucket, HostLimiter
+from weboob.tools.test import LocalServerTest
+
+
+class MyHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        with self.server.lock:
+            self.server.times.append(time.time())
+            self.server.running += 1
+            self.server.max_running = max(self.server.max_running, self.server.running)
+        time.sleep(self.server.delay)
+        with self.server.lock:
+            self.server.running -= 1
+
+        body = b'x' * 10 if self.path == '/body' else b''
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MyLimitedBrowser(Browser):
+    RATE_LIMIT = 20
+
+
+class MySlowBrowser(Browser):
+    RATE_LIMIT = 0.1
+
+
+class MyOneRequestBrowser(Browser):
+    MAX_CONCURRENT_PER_HOST = 1
+
+
+class MyConcurrencyBrowser(Browser):
+    MAX_CONCURRENT_PER_HOST = 2
+
+
+class RateLimitTest(LocalServerTest):
+    HANDLER = MyHandler
+
+    def setUp(self):
+        super(RateLimitTest, self).setUp()
+        self.server.lock = Lock()
+        self.server.times = []
+        self.server.running = self.server.max_running = 0
+        self.server.delay = 0
+
+    def assertSpaced(self, times, delay):
+        # Requests are sent at a steady pace, with some jitter of threads.
+        self.assertGreaterEqual(max(times) - min(times), delay * (len(times) - 1) * 0.9)
+
+    def test_rate(self):
+        # The limit is shared by browsers, and applies to async requests.
+        browsers = [MyLimitedBrowser(), MyLimitedBrowser()]
+        for browser in browsers:
+            browser.open(self.url)
+        futures = [browser.async_open(self.url) for browser in browsers for _ in range(2)]
+        for future in futures:
+            future.result()
+
+        self.assertEqual(len(self.server.times), 6)
+        self.assertSpaced(self.server.times, 1. / MyLimitedBrowser.RATE_LIMIT)
+
+    def test_concurrency(self):
+        self.server.delay = 0.05
+        browsers = [MyConcurrencyBrowser(), MyConcurrencyBrowser()]
+        futures = [browser.async_open(self.url) for browser in browsers for _ in range(3)]
+        for future in futures:
+            future.result()
+        self.assertEqual(self.server.max_running, 2)
+
+    def test_stream(self):
+        browser = MyOneRequestBrowser()
+        first = browser.open(self.url + 'body', stream=True)
+        # The first request is in progress until its body is read.
+        second = browser.async_open(self.url)
+        time.sleep(0.2)
+        self.assertFalse(second.done())
+        self.assertEqual(first.content, b'x' * 10)
+        second.result()
+
+        # Or until the response is closed.
+        first = browser.open(self.url + 'body', stream=True)
+        second = browser.async_open(self.url)
+        first.close()
+        second.result()
+
+    def test_abort(self):
+        browser = MySlowBrowser()
+        browser.open(self.url)
+        future = browser.async_open(self.url)
+        time.sleep(0.1)
+        browser.abort()
+        self.assertRaises(RequestAborted, future.result)
+
+
+class SharedLimitTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_bucket(self):
+        # Instances stand for other processes.
+        path = os.path.join(self.tmpdir, 'host')
+        first, second = FileTokenBucket(path), FileTokenBucket(path)
+        self.assertEqual(first.reserve(10, 1, now=100), 0)
+        self.assertAlmostEqual(second.reserve(10, 1, now=100), 0.1)
+        self.assertAlmostEqual(first.reserve(10, 1, now=100.05), 0.15)
+
+    def test_semaphore(self):
+        path = os.path.join(self.tmpdir, 'host.slot')
+        first, second = FileSemaphore(path, 1), FileSemaphore(path, 1)
+        slot = first.acquire()
+        self.assertRaises(RequestAborted, second.acquire, lambda: True)
+        first.release(slot)
+        second.release(second.acquire(lambda: True))
+
+    def test_limiter(self):
+        limiter = HostLimiter(rate=10, shared=True)
+        self.assertIsInstance(limiter.bucket('example.org:443'), FileTokenBucket)
+        self.assertIs(limiter.bucket('example.org:443'), HostLimiter(rate=10, shared=True).bucket('example.org:443'))
+        # Browsers with other limits do not share their bucket.
+        self.assertIsNot(limiter.bucket('example.org:443'), HostLimiter(rate=5, shared=True).bucket('example.org:443'))
+        self.assertEqual(os.stat(limiter.directory()).st_mode & 0o777, 0o700)
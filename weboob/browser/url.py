@@ -19,13 +19,16 @@
 
 from functools import wraps
 import re
-import requests
 
 from weboob.tools.compat import basestring, unquote
+from weboob.tools.lazy import lazy_import
 from weboob.tools.regex_helper import normalize
 from weboob.tools.misc import to_unicode
 
 
+requests = lazy_import('requests')
+
+
 class UrlNotResolvable(Exception):
     """
     Raised when trying to locate on an URL instance which url pattern is not resolvable as a real url.
@@ -18,7 +18,7 @@
 # along with weboob. If not, see <http://www.gnu.org/licenses/>.
 
 
-from .bcall import CallErrors
+from .bcall import BackendTimeout, CallErrors
 from .ouiboube import Weboob, WebNip
 
-__all__ = ['CallErrors', 'Weboob', 'WebNip']
+__all__ = ['BackendTimeout', 'CallErrors', 'Weboob', 'WebNip']
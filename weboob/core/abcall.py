@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2010-2014 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+
+import asyncio
+
+from weboob.core.bcall import BackendsCall, CallErrors
+
+
+__all__ = ['AsyncBackendsCall']
+
+
+class AsyncBackendsCall(BackendsCall):
+    """
+    Call backends from an :mod:`asyncio` event loop.
+
+    Backends are still run by the workers, but results are consumed with
+    ``async for``, or all at once with ``await``:
+
+    >>> async for result in weboob.ado('iter_accounts'):  # doctest: +SKIP
+    ...     print(result)
+    >>> results = await weboob.ado('iter_accounts')  # doctest: +SKIP
+
+    The event loop is woken up by workers each time something happens on
+    the call. When the consuming task is cancelled, the call is stopped.
+
+    It has to be instanciated from the thread running the event loop.
+
+    :param loop: event loop to use; default is the current one
+    :type loop: :class:`asyncio.AbstractEventLoop`
+    """
+
+    def __init__(self, backends, function, *args, **kwargs):
+        self.loop = kwargs.pop('loop', None) or asyncio.get_event_loop()
+        # Created by the consuming coroutine, so it is bound to its loop.
+        self.changed = None
+        super(AsyncBackendsCall, self).__init__(backends, function, *args, **kwargs)
+
+    def _notify(self):
+        super(AsyncBackendsCall, self)._notify()
+        if self.changed is None or self.loop.is_closed():
+            # Nobody is waiting anymore, but backends still run.
+            return
+        try:
+            self.loop.call_soon_threadsafe(self.changed.set)
+        except RuntimeError:
+            # The loop has been closed meanwhile.
+            pass
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            while True:
+                with self.cond:
+                    if self.changed is None:
+                        self.changed = asyncio.Event()
+                    delay = self._check_deadlines()
+                    found, response = self._pop_response()
+                    if found:
+                        return response
+                    if not self.pending or self.stop_event.is_set():
+                        break
+                    # Workers set the event after this point.
+                    self.changed.clear()
+
+                try:
+                    await asyncio.wait_for(self.changed.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            # The consuming task has probably been cancelled.
+            self.stop()
+            raise
+
+        if self.errors:
+            raise CallErrors(self.errors)
+        raise StopAsyncIteration
+
+    async def _gather(self):
+        results = []
+        while True:
+            try:
+                results.append(await self.__anext__())
+            except StopAsyncIteration:
+                return results
+
+    def __await__(self):
+        """
+        Wait for every result.
+
+        :rtype: list
+        :raises: :class:`weboob.core.bcall.CallErrors` if a backend failed
+        """
+        return self._gather().__await__()
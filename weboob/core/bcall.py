@@ -18,20 +18,20 @@
 # along with weboob. If not, see <http://www.gnu.org/licenses/>.
 
 
+from collections import deque
 from copy import copy
-from threading import Thread, Event
-try:
-    import Queue
-except ImportError:
-    import queue as Queue
+from heapq import heappop, heappush
+from threading import Thread, Condition, Event
+from time import time
 
 from weboob.capabilities.base import BaseObject
+from weboob.core.workers import WorkerPool
 from weboob.tools.compat import basestring
 from weboob.tools.misc import get_backtrace
 from weboob.tools.log import getLogger
 
 
-__all__ = ['BackendsCall', 'CallErrors']
+__all__ = ['BackendsCall', 'BackendStats', 'BackendTimeout', 'CallErrors', 'CallStats']
 
 
 class CallErrors(Exception):
@@ -47,6 +47,97 @@ class CallErrors(Exception):
         return self.errors.__iter__()
 
 
+class BackendTimeout(Exception):
+    """
+    Raised (in :class:`CallErrors`) when a backend did not finish before
+    the deadline of the call. Its results are ignored from that moment.
+    """
+
+    def __init__(self, backend, timeout):
+        super(BackendTimeout, self).__init__('Backend %s did not finish in %s seconds' % (backend.name, timeout))
+        self.timeout = timeout
+
+
+class BackendStats(object):
+    """
+    Measures of the call of a backend.
+
+    Durations are in seconds.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.start = None
+        """Timestamp of the beginning of the call, None if not called yet."""
+        self.first_result = None
+        """Delay between the beginning of the call and the first result."""
+        self.duration = None
+        """Duration of the call, None if not finished yet."""
+        self.count = 0
+        """Number of results."""
+        self.error = None
+        """Class of the error raised by the backend, if any."""
+
+    def to_dict(self):
+        return {'name': self.name,
+                'start': self.start,
+                'first_result': self.first_result,
+                'duration': self.duration,
+                'count': self.count,
+                'error': self.error.__name__ if self.error else None,
+               }
+
+    def __repr__(self):
+        return '<BackendStats %s count=%s first_result=%s duration=%s error=%s>' % (
+            self.name, self.count, self.first_result, self.duration, self.error and self.error.__name__)
+
+
+class CallStats(object):
+    """
+    Measures of a :class:`BackendsCall`.
+
+    :param function: called function
+    :param backends: called backends
+    """
+
+    def __init__(self, function, backends):
+        self.function = function if isinstance(function, basestring) else getattr(function, '__name__', repr(function))
+        self.start = time()
+        self.duration = None
+        """Duration of the whole call, None until every backend is finished."""
+        self.backends = dict((backend, BackendStats(backend.name)) for backend in backends)
+
+    def __getitem__(self, name):
+        """Get :class:`BackendStats` of a backend from its name."""
+        for backend, stats in self.backends.items():
+            if backend.name == name:
+                return stats
+        raise KeyError(name)
+
+    def __iter__(self):
+        return iter(self.backends.values())
+
+    def to_dict(self):
+        return {'function': self.function,
+                'start': self.start,
+                'duration': self.duration,
+                'backends': [stats.to_dict() for stats in self],
+               }
+
+
+class _ReversedKey(object):
+    __slots__ = ('key',)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+
 class BackendsCall(object):
     def __init__(self, backends, function, *args, **kwargs):
         """
@@ -54,20 +145,110 @@ class BackendsCall(object):
         :type backends: list[:class:`Module`]
         :param function: backends' method name, or callable object.
         :type function: :class:`str` or :class:`callable`
+        :param workers: pool on which backends are called; if not given, a
+                        thread is started for each backend
+        :type workers: :class:`weboob.core.workers.WorkerPool`
+        :param max_buffered: if set, maximum number of results of each backend
+                             waiting to be consumed; a backend is paused when
+                             this limit is reached, unless results are merged
+                             with *sort_key* and another backend has none yet
+        :type max_buffered: :class:`int`
+        :param timeout: if set, maximum duration of the whole call, in seconds
+        :type timeout: :class:`float`
+        :param per_backend_timeout: if set, maximum duration of the call of
+                                    each backend, in seconds, from the moment
+                                    the backend is actually called
+        :type per_backend_timeout: :class:`float`
+        :param sort_key: if set, results are yielded sorted on this key; each
+                         backend has to return results already sorted, and
+                         they are merged as they arrive
+        :type sort_key: :class:`callable`
+        :param sort_reverse: if True, results are sorted in descending order
+        :type sort_reverse: :class:`bool`
+        :param stats_hook: if set, called with the :class:`CallStats` of the
+                           call once every backend is finished
+        :type stats_hook: :class:`callable`
+        :param executor: 'thread' to call backends in this process, or
+                         'process' to call them in their own process, which
+                         requires *function* to be a method name
+        :type executor: :class:`str`
+        :param processes: registry of backends processes, to reuse them
+                          between calls; if not given, processes are stopped
+                          at the end of the call
+        :type processes: :class:`weboob.core.process.BackendProcesses`
         """
         self.logger = getLogger('bcall')
 
-        self.responses = Queue.Queue()
+        workers = kwargs.pop('workers', None)
+        self.max_buffered = kwargs.pop('max_buffered', None)
+        self.timeout = kwargs.pop('timeout', None)
+        self.per_backend_timeout = kwargs.pop('per_backend_timeout', None)
+        self.sort_key = kwargs.pop('sort_key', None)
+        self.sort_reverse = kwargs.pop('sort_reverse', False)
+        self.stats_hook = kwargs.pop('stats_hook', None)
+        executor = kwargs.pop('executor', 'thread')
+        processes = kwargs.pop('processes', None)
+        backends = list(backends)
+
+        self.processes = None
+        self.own_processes = False
+        if executor == 'process':
+            if callable(function):
+                raise TypeError('Only methods of backends can be called in processes')
+
+            from weboob.core.process import BackendProcesses
+            self.own_processes = processes is None
+            self.processes = BackendProcesses() if processes is None else processes
+            for backend in backends:
+                # Start processes from this thread, before backends are locked.
+                self.processes.get(backend)
+        elif executor != 'thread':
+            raise ValueError('Unknown executor %r' % executor)
+
+        # Every state change (new result, started or finished backend, stop)
+        # is notified on this condition, so consumers are woken up exactly
+        # when needed.
+        self.cond = Condition()
+        self.responses = deque()
+        self.buffered = dict((backend, 0) for backend in backends)
         self.errors = []
-        self.tasks = Queue.Queue()
+        self.pending = set(backends)
+        self.started = {}
+        self.abandoned = set()
+        self.aborted = set()
         self.stop_event = Event()
-        self.threads = []
+        self.deadline = time() + self.timeout if self.timeout is not None else None
+        self.stats = CallStats(function, backends)
+        self.running = len(backends)
+
+        if self.sort_key is not None:
+            # k-way merge of the backends streams: results are queued per
+            # backend, and the heap contains the first result of each non
+            # empty queue. The smallest one can be yielded once no pending
+            # backend is starved, i.e. has an empty queue.
+            self.order = dict((backend, i) for i, backend in enumerate(backends))
+            self.queues = dict((backend, deque()) for backend in backends)
+            self.heads = []
+            self.starved = set(backends)
+
+        own_workers = workers is None
+        if own_workers:
+            workers = WorkerPool(name='bcall')
 
         for backend in backends:
-            t = Thread(target=self.backend_process, args=(function, args, kwargs))
-            t.start()
-            self.threads.append(t)
-            self.tasks.put(backend)
+            workers.submit(self.backend_process, backend, function, args, kwargs)
+
+        if own_workers:
+            # workers exit as soon as every backend has been called.
+            workers.shutdown()
+
+    def _notify(self):
+        """
+        Wake up threads waiting for a change on this call.
+
+        Must be called with the condition acquired.
+        """
+        self.cond.notify_all()
 
     def store_result(self, backend, result):
         """Store the result when a backend task finished."""
@@ -76,53 +257,289 @@ class BackendsCall(object):
 
         if isinstance(result, BaseObject):
             result.backend = backend.name
-        self.responses.put(result)
 
-    def backend_process(self, function, args, kwargs):
+        if self.sort_key is not None:
+            key = self.sort_key(result)
+            if self.sort_reverse:
+                key = _ReversedKey(key)
+
+        with self.cond:
+            if self.max_buffered:
+                # Backpressure: wait for the consumer to take results of
+                # this backend. Other backends are not impacted. When
+                # results are merged, the consumer waits for the starved
+                # backends, which may wait for a worker held by this one.
+                while self.buffered[backend] >= self.max_buffered and \
+                      backend not in self.abandoned and not self.stop_event.is_set() and \
+                      not (self.sort_key is not None and self.starved):
+                    self.cond.wait()
+
+            if backend in self.abandoned:
+                return
+
+            stats = self.stats.backends[backend]
+            if not stats.count:
+                stats.first_result = time() - stats.start
+            stats.count += 1
+
+            self.buffered[backend] += 1
+            if self.sort_key is None:
+                self.responses.append((backend, result))
+            else:
+                queue = self.queues[backend]
+                if not queue:
+                    heappush(self.heads, (key, self.order[backend], backend))
+                    self.starved.discard(backend)
+                queue.append((key, result))
+            self._notify()
+
+    def store_error(self, backend, error):
+        """Store an error raised by a backend."""
+        with self.cond:
+            if backend in self.aborted and self.stop_event.is_set():
+                # Most likely caused by the interrupted request.
+                self.logger.debug('%s: Ignored error after abort: %r', backend, error)
+                return
+            if backend not in self.abandoned:
+                # Errors raised in a process come with their own backtrace.
+                backtrace = getattr(error, 'remote_backtrace', None) or get_backtrace(error)
+                self.errors.append((backend, error, backtrace))
+                self.stats.backends[backend].error = error.__class__
+
+    def backend_process(self, backend, function, args, kwargs):
         """
         Internal method to run a method of a backend.
 
         As this method may be blocking, it should be run on its own thread.
         """
-        backend = self.tasks.get()
-        with backend:
+        with self.cond:
+            abandoned = backend in self.abandoned
+            if not abandoned:
+                self.started[backend] = self.stats.backends[backend].start = time()
+                self._notify()
+
+        if abandoned:
+            self._end_backend()
+            return
+
+        try:
+            with backend:
+                try:
+                    self._backend_call(backend, function, args, kwargs)
+                finally:
+                    with self.cond:
+                        # The backend is not running anymore: it can't be
+                        # aborted after this check, so its browser is reset.
+                        aborted = backend in self.aborted
+                        self._finish_backend(backend)
+                        self.started.pop(backend, None)
+                    if aborted:
+                        # Let the next calls use the browser again.
+                        browser = getattr(backend, '_browser', None)
+                        if hasattr(browser, 'reset_abort'):
+                            browser.reset_abort()
+        finally:
+            with self.cond:
+                stats = self.stats.backends[backend]
+                stats.duration = time() - stats.start
+                self._finish_backend(backend)
+                self._notify()
+
+            self.logger.debug('%s: Function %s returned %d results in %.3fs (first one after %s), error: %s',
+                              backend, self.stats.function, stats.count, stats.duration,
+                              '%.3fs' % stats.first_result if stats.first_result is not None else '-',
+                              stats.error.__name__ if stats.error else None)
+            self._end_backend()
+
+    def _end_backend(self):
+        """
+        Called when the task of a backend is over, to call the stats hook
+        after the last one.
+        """
+        with self.cond:
+            self.running -= 1
+            if self.running:
+                return
+            self.stats.duration = time() - self.stats.start
+
+        if self.own_processes:
+            self.processes.close()
+
+        if self.stats_hook:
             try:
-                # Call method on backend
+                self.stats_hook(self.stats)
+            except Exception:
+                self.logger.error('Error in stats hook:\n%s', get_backtrace())
+
+    def _finish_backend(self, backend):
+        """
+        Stop waiting for results of a backend.
+
+        Must be called with the condition acquired.
+        """
+        self.pending.discard(backend)
+        if self.sort_key is not None:
+            self.starved.discard(backend)
+
+    def _abort_backend(self, backend):
+        """
+        Interrupt the HTTP requests in progress of a running backend, so
+        that its task ends without waiting for them.
+
+        Must be called with the condition acquired.
+        """
+        if self.processes is not None or backend not in self.started or backend in self.aborted:
+            # Backends run in processes are only stopped between two results.
+            return
+        if getattr(backend, 'REENTRANT', False):
+            # The browser of this call is not known, and others may be in
+            # use by concurrent calls.
+            return
+
+        browser = getattr(backend, '_browser', None)
+        if hasattr(browser, 'abort'):
+            self.logger.debug('%s: Aborting requests in progress', backend)
+            self.aborted.add(backend)
+            browser.abort()
+
+    def _backend_call(self, backend, function, args, kwargs):
+        # Call method on backend
+        try:
+            self.logger.debug('%s: Calling function %s', backend, function)
+            if self.processes is not None:
+                result = self.processes.get(backend).call(function, args, kwargs)
+            elif callable(function):
+                result = function(backend, *args, **kwargs)
+            else:
+                result = getattr(backend, function)(*args, **kwargs)
+        except Exception as error:
+            self.logger.debug('%s: Called function %s raised an error: %r', backend, function, error)
+            self.store_error(backend, error)
+        else:
+            self.logger.debug('%s: Called function %s returned: %r', backend, function, result)
+
+            if hasattr(result, '__iter__') and not isinstance(result, (bytes, basestring)):
+                # Loop on iterator
                 try:
-                    self.logger.debug('%s: Calling function %s', backend, function)
-                    if callable(function):
-                        result = function(backend, *args, **kwargs)
-                    else:
-                        result = getattr(backend, function)(*args, **kwargs)
+                    for subresult in result:
+                        self.store_result(backend, subresult)
+                        if self.stop_event.is_set() or backend in self.abandoned:
+                            break
                 except Exception as error:
-                    self.logger.debug('%s: Called function %s raised an error: %r', backend, function, error)
-                    self.errors.append((backend, error, get_backtrace(error)))
-                else:
-                    self.logger.debug('%s: Called function %s returned: %r', backend, function, result)
-
-                    if hasattr(result, '__iter__') and not isinstance(result, (bytes, basestring)):
-                        # Loop on iterator
-                        try:
-                            for subresult in result:
-                                self.store_result(backend, subresult)
-                                if self.stop_event.is_set():
-                                    break
-                        except Exception as error:
-                            self.errors.append((backend, error, get_backtrace(error)))
-                    else:
-                        self.store_result(backend, result)
-            finally:
-                self.tasks.task_done()
+                    self.store_error(backend, error)
+                finally:
+                    if hasattr(result, 'close'):
+                        # Run the finally blocks of an interrupted generator.
+                        result.close()
+            else:
+                self.store_result(backend, result)
 
-    def _callback_thread_run(self, callback, errback, finishback):
-        while not self.stop_event.is_set() and (self.tasks.unfinished_tasks or not self.responses.empty()):
-            try:
-                response = self.responses.get(timeout=0.1)
-            except Queue.Empty:
+    def _check_deadlines(self):
+        """
+        Abandon backends which missed their deadline.
+
+        Must be called with the condition acquired.
+
+        :returns: delay until the next deadline, or None
+        :rtype: :class:`float`
+        """
+        if self.deadline is None and self.per_backend_timeout is None:
+            return None
+
+        now = time()
+        delay = None
+        for backend in list(self.pending):
+            timeout = self.timeout
+            deadline = self.deadline
+            if self.per_backend_timeout is not None and backend in self.started:
+                backend_deadline = self.started[backend] + self.per_backend_timeout
+                if deadline is None or backend_deadline < deadline:
+                    timeout = self.per_backend_timeout
+                    deadline = backend_deadline
+
+            if deadline is None:
                 continue
+
+            if deadline <= now:
+                self.logger.debug('%s: Abandoned after %s seconds', backend, timeout)
+                self._finish_backend(backend)
+                self.abandoned.add(backend)
+                self._abort_backend(backend)
+                self.errors.append((backend, BackendTimeout(backend, timeout),
+                                    'Call abandoned after %s seconds.' % timeout))
+                self.stats.backends[backend].error = BackendTimeout
+                self._notify()
+            elif delay is None or deadline - now < delay:
+                delay = deadline - now
+
+        return delay
+
+    def _wait(self):
+        """
+        Wait for a change on the call, or for the next deadline.
+
+        Must be called with the condition acquired.
+        """
+        self.cond.wait(self._check_deadlines())
+        self._check_deadlines()
+
+    def _next_response(self):
+        """
+        Block until a result is available, or until there is nothing more
+        to wait for.
+
+        :returns: True and the result, or False and None
+        """
+        with self.cond:
+            self._check_deadlines()
+            while not self._has_response() and self.pending and not self.stop_event.is_set():
+                self._wait()
+
+            return self._pop_response()
+
+    def _has_response(self):
+        """
+        Whether a result can be yielded.
+
+        Must be called with the condition acquired.
+        """
+        if self.sort_key is None:
+            return bool(self.responses)
+        return bool(self.heads) and not self.starved
+
+    def _pop_response(self):
+        """
+        Take the next available result.
+
+        Must be called with the condition acquired.
+
+        :returns: True and the result, or False and None
+        """
+        if self._has_response() and not self.stop_event.is_set():
+            if self.sort_key is None:
+                backend, response = self.responses.popleft()
             else:
-                if callback:
-                    callback(response)
+                _, _, backend = heappop(self.heads)
+                queue = self.queues[backend]
+                _, response = queue.popleft()
+                if queue:
+                    heappush(self.heads, (queue[0][0], self.order[backend], backend))
+                elif backend in self.pending:
+                    self.starved.add(backend)
+            self.buffered[backend] -= 1
+            if self.max_buffered:
+                self.cond.notify_all()
+            return True, response
+        return False, None
+
+    def _callback_thread_run(self, callback, errback, finishback):
+        while True:
+            found, response = self._next_response()
+            if not found:
+                break
+
+            if callback:
+                callback(response)
 
         # Raise errors
         while errback and self.errors:
@@ -150,9 +567,16 @@ class BackendsCall(object):
         return thread
 
     def wait(self):
-        """Wait until all tasks are finished."""
-        for thread in self.threads:
-            thread.join()
+        """
+        Wait until all tasks are finished.
+
+        When *max_buffered* is set, results have to be consumed by another
+        thread (see :func:`callback_thread`), otherwise backends never end.
+        """
+        with self.cond:
+            self._check_deadlines()
+            while self.pending:
+                self._wait()
 
         if self.errors:
             raise CallErrors(self.errors)
@@ -161,22 +585,30 @@ class BackendsCall(object):
         """
         Stop all tasks.
 
+        Requests in progress of running backends are aborted, and their
+        generators are closed.
+
         :param wait: If True, wait until all tasks stopped.
         :type wait: bool
         """
 
-        self.stop_event.set()
+        with self.cond:
+            self.stop_event.set()
+            for backend in self.pending:
+                self._abort_backend(backend)
+            self._notify()
 
         if wait:
             self.wait()
 
     def __iter__(self):
         try:
-            while not self.stop_event.is_set() and (self.tasks.unfinished_tasks or not self.responses.empty()):
-                try:
-                    yield self.responses.get(timeout=0.1)
-                except Queue.Empty:
-                    continue
+            while True:
+                found, response = self._next_response()
+                if not found:
+                    break
+
+                yield response
         except:
             self.stop()
             raise
@@ -17,16 +17,77 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with weboob. If not, see <http://www.gnu.org/licenses/>.
 
+from hashlib import sha1
 import os
 import imp
 import logging
+import pickle
+from importlib import import_module
 
 from weboob.tools.backend import Module, BackendConfig
 from weboob.tools.compat import basestring
 from weboob.tools.log import getLogger
+from weboob.tools.misc import get_backtrace
 from weboob.exceptions import ModuleLoadError
 
-__all__ = ['LoadedModule', 'ModulesLoader', 'RepositoryModulesLoader']
+__all__ = ['IndexedModule', 'LoadedModule', 'ModulesIndex', 'ModulesLoader', 'RepositoryModulesLoader']
+
+
+def _iter_tree_files(path):
+    """
+    Iterate on files of a tree, except bytecode, in a stable order.
+
+    :returns: paths relative to the tree, and modification times
+    """
+    try:
+        scandir = os.scandir
+    except AttributeError:
+        # python 2
+        for root, dirs, files in os.walk(path):
+            if '__pycache__' in dirs:
+                dirs.remove('__pycache__')
+            dirs.sort()
+            for f in sorted(files):
+                if not f.endswith('.pyc'):
+                    filename = os.path.join(root, f)
+                    yield os.path.relpath(filename, path), os.stat(filename).st_mtime
+        return
+
+    # Directories to scan, with their path relative to the root. Stats of
+    # files are given by scandir() without any other system call on most
+    # platforms.
+    dirs = [(path, '')]
+    while dirs:
+        dirpath, prefix = dirs.pop()
+        subdirs = []
+        for entry in sorted(scandir(dirpath), key=lambda entry: entry.name):
+            if entry.is_dir():
+                if entry.name != '__pycache__':
+                    subdirs.append((entry.path, prefix + entry.name + os.sep))
+            elif not entry.name.endswith('.pyc'):
+                yield prefix + entry.name, entry.stat().st_mtime
+        dirs.extend(reversed(subdirs))
+
+
+def get_tree_fingerprint(path):
+    """
+    Get a value which changes when a file of a tree is added, removed or
+    modified.
+
+    The tree is scanned once, and the first value is the modification time
+    of its most recent file.
+
+    :rtype: tuple
+    """
+    mtime = 0
+    count = 0
+    names = sha1()
+    for name, file_mtime in _iter_tree_files(path):
+        count += 1
+        mtime = max(mtime, file_mtime)
+        # Files added with an older mtime, or removed, change the names.
+        names.update(name.encode('utf-8', 'surrogateescape') + b'\0')
+    return (mtime, count, names.hexdigest())
 
 
 class LoadedModule(object):
@@ -98,16 +159,189 @@ class LoadedModule(object):
         return backend_instance
 
 
+class IndexedModule(LoadedModule):
+    """
+    Module described by its metadata in the :class:`ModulesIndex`.
+
+    Its package is only imported when its class is needed, for example to
+    create a backend.
+    """
+
+    def __init__(self, loader, module_name, metadata):
+        self.logger = getLogger('backend')
+        self.loader = loader
+        self.module_name = module_name
+        self.metadata = metadata
+        self._loaded = None
+
+    def _load(self):
+        if self._loaded is None:
+            self.logger.debug('Importing module "%s"' % self.module_name)
+            self._loaded = LoadedModule(self.loader.import_package(self.module_name))
+        return self._loaded
+
+    @property
+    def package(self):
+        return self._load().package
+
+    @property
+    def klass(self):
+        return self._load().klass
+
+    @property
+    def name(self):
+        return self.metadata['name']
+
+    @property
+    def maintainer(self):
+        return self.metadata['maintainer']
+
+    @property
+    def version(self):
+        return self.metadata['version']
+
+    @property
+    def description(self):
+        return self.metadata['description']
+
+    @property
+    def license(self):
+        return self.metadata['license']
+
+    @property
+    def config(self):
+        if self._loaded is None and self.metadata['config'] is not None:
+            try:
+                return pickle.loads(self.metadata['config'])
+            except Exception:
+                self.logger.debug('Unable to load config of module "%s" from index:\n%s',
+                                  self.module_name, get_backtrace())
+        return self._load().config
+
+    @property
+    def website(self):
+        return self.metadata['website']
+
+    @property
+    def icon(self):
+        return self.metadata['icon']
+
+    def iter_caps(self):
+        for modname, name in self.metadata['caps']:
+            yield getattr(import_module(modname), name)
+
+    def has_caps(self, *caps):
+        """Return True if module implements at least one of the caps."""
+        names = [name for modname, name in self.metadata['caps']]
+        for c in caps:
+            if isinstance(c, type):
+                c = c.__name__
+            if c in names:
+                return True
+        return False
+
+
+class ModulesIndex(object):
+    """
+    Metadata of modules, saved in a file to know what they are without
+    importing them.
+
+    An entry is outdated as soon as a file of the module changes.
+
+    :param path: path of the index file
+    :type path: :class:`str`
+    """
+
+    def __init__(self, path):
+        self.logger = getLogger('modules.index')
+        self.path = path
+        self.entries = {}
+        self.modified = False
+
+        if os.path.exists(path):
+            try:
+                with open(path, 'rb') as f:
+                    self.entries = pickle.load(f)
+            except Exception as e:
+                self.logger.warning('Unable to read modules index %s: %s', path, e)
+
+    def get(self, module_name, fingerprint):
+        """
+        Get metadata of a module, if they are up to date.
+
+        :rtype: :class:`dict`
+        """
+        entry = self.entries.get(module_name)
+        if entry is not None and entry['fingerprint'] == fingerprint:
+            return entry
+        return None
+
+    def set(self, module_name, fingerprint, module):
+        """
+        Store metadata of an imported module.
+
+        :type module: :class:`LoadedModule`
+        """
+        caps = []
+        for cap in module.iter_caps():
+            if (cap.__module__, cap.__name__) not in caps:
+                caps.append((cap.__module__, cap.__name__))
+
+        try:
+            config = pickle.dumps(module.config, pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            # Config will be read from the module itself.
+            config = None
+
+        entry = {'fingerprint': fingerprint,
+                 'name': module.name,
+                 'maintainer': module.maintainer,
+                 'version': module.version,
+                 'description': module.description,
+                 'license': module.license,
+                 'website': module.website,
+                 'icon': module.icon,
+                 'caps': caps,
+                 'config': config,
+                }
+        self.entries[module_name] = entry
+        self.modified = True
+        return entry
+
+    def save(self):
+        if not self.modified:
+            return
+
+        tmp = '%s.tmp' % self.path
+        try:
+            with open(tmp, 'wb') as f:
+                pickle.dump(self.entries, f, pickle.HIGHEST_PROTOCOL)
+            os.rename(tmp, self.path)
+        except (IOError, OSError) as e:
+            self.logger.warning('Unable to save modules index %s: %s', self.path, e)
+        else:
+            self.modified = False
+
+
 class ModulesLoader(object):
     """
     Load modules.
+
+    :param path: path of modules
+    :type path: :class:`str`
+    :param version: version of weboob required by modules
+    :type version: :class:`str`
+    :param index_path: if set, metadata of modules are kept in this file, and
+                       modules are only imported when they are really used
+    :type index_path: :class:`str`
     """
 
-    def __init__(self, path, version=None):
+    def __init__(self, path, version=None, index_path=None):
         self.version = version
         self.path = path
         self.loaded = {}
         self.logger = getLogger('modules')
+        self.index = ModulesIndex(index_path) if index_path else None
 
     def get_or_load_module(self, module_name):
         """
@@ -135,21 +369,25 @@ class ModulesLoader(object):
     def load_all(self):
         for existing_module_name in self.iter_existing_module_names():
             try:
-                self.load_module(existing_module_name)
+                self._load_module(existing_module_name)
             except ModuleLoadError as e:
                 self.logger.warning('could not load module %s: %s', existing_module_name, e)
 
-    def load_module(self, module_name):
-        if module_name in self.loaded:
-            self.logger.debug('Module "%s" is already loaded from %s' % (module_name, self.loaded[module_name].package.__path__[0]))
-            return
+        if self.index is not None:
+            self.index.save()
 
+    def import_package(self, module_name):
+        """
+        Import the package of a module.
+
+        Can raise a ModuleLoadError exception.
+        """
         path = self.get_module_path(module_name)
 
         try:
             fp, pathname, description = imp.find_module(module_name, [path])
             try:
-                module = LoadedModule(imp.load_module(module_name, fp, pathname, description))
+                return imp.load_module(module_name, fp, pathname, description)
             finally:
                 if fp:
                     fp.close()
@@ -158,12 +396,40 @@ class ModulesLoader(object):
                 self.logger.exception(e)
             raise ModuleLoadError(module_name, e)
 
+    def load_module(self, module_name):
+        self._load_module(module_name)
+
+        if self.index is not None:
+            self.index.save()
+
+    def _load_module(self, module_name):
+        if module_name in self.loaded:
+            self.logger.debug('Module "%s" is already loaded' % module_name)
+            return
+
+        if self.index is None:
+            module = self._import_module(module_name)
+        else:
+            fingerprint = get_tree_fingerprint(os.path.join(self.get_module_path(module_name), module_name))
+            metadata = self.index.get(module_name, fingerprint)
+            if metadata is None:
+                metadata = self.index.set(module_name, fingerprint, self._import_module(module_name))
+            module = IndexedModule(self, module_name, metadata)
+
         if module.version != self.version:
             raise ModuleLoadError(module_name, "Module requires Weboob %s, but you use Weboob %s. Hint: use 'weboob-config update'"
                                                % (module.version, self.version))
 
         self.loaded[module_name] = module
-        self.logger.debug('Loaded module "%s" from %s' % (module_name, module.package.__path__[0]))
+        self.logger.debug('Loaded module "%s"' % module_name)
+
+    def _import_module(self, module_name):
+        try:
+            return LoadedModule(self.import_package(module_name))
+        except ModuleLoadError:
+            raise
+        except Exception as e:
+            raise ModuleLoadError(module_name, e)
 
     def get_module_path(self, module_name):
         return self.path
@@ -172,10 +438,15 @@ class ModulesLoader(object):
 class RepositoryModulesLoader(ModulesLoader):
     """
     Load modules from repositories.
+
+    Metadata of modules are indexed in the modules directory.
     """
 
+    INDEX_FILENAME = 'modules.index'
+
     def __init__(self, repositories):
-        super(RepositoryModulesLoader, self).__init__(repositories.modules_dir, repositories.version)
+        super(RepositoryModulesLoader, self).__init__(repositories.modules_dir, repositories.version,
+                                                      os.path.join(repositories.modules_dir, self.INDEX_FILENAME))
         self.repositories = repositories
 
     def iter_existing_module_names(self):
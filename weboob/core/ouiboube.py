@@ -26,6 +26,7 @@ from weboob.core.backendscfg import BackendsConfig
 from weboob.core.requests import RequestsManager
 from weboob.core.repositories import Repositories, PrintProgress
 from weboob.core.scheduler import Scheduler
+from weboob.core.workers import WorkerPool
 from weboob.tools.backend import Module
 from weboob.tools.compat import basestring, unicode
 from weboob.tools.config.iconfig import ConfigError
@@ -59,14 +60,35 @@ class WebNip(object):
     :type storage: :class:`weboob.tools.storage.IStorage`
     :param scheduler: what scheduler to use; default is :class:`weboob.core.scheduler.Scheduler`
     :type scheduler: :class:`weboob.core.scheduler.IScheduler`
+    :param max_workers: maximum number of backends called at the same time;
+                        default is :attr:`MAX_WORKERS`
+    :type max_workers: :class:`int`
     """
     VERSION = '1.6'
+    MAX_WORKERS = None
+    """
+    Default maximum number of threads used to call backends. None means
+    that every backend is called at the same time.
+    """
 
-    def __init__(self, modules_path=None, storage=None, scheduler=None):
+    def __init__(self, modules_path=None, storage=None, scheduler=None, max_workers=None):
         self.logger = getLogger('weboob')
         self.backend_instances = {}
         self.requests = RequestsManager()
 
+        if max_workers is None:
+            max_workers = self.MAX_WORKERS
+        self.workers = WorkerPool(max_workers, name='backend')
+
+        self.processes = None
+
+        self.stats_hook = None
+        """
+        If set, this callable is called with the
+        :class:`weboob.core.bcall.CallStats` of every call made with
+        :func:`do`, once every backend is finished.
+        """
+
         if modules_path is None:
             import pkg_resources
             # Package weboob_modules is provided by
@@ -94,6 +116,9 @@ class WebNip(object):
         properly unload all correctly.
         """
         self.unload_backends()
+        if self.processes is not None:
+            self.processes.close()
+        self.workers.shutdown()
 
     def build_backend(self, module_name, params=None, storage=None, name=None, nofail=False, logger=None):
         """
@@ -167,6 +192,9 @@ class WebNip(object):
         elif names is None:
             names = list(self.backend_instances.keys())
 
+        if self.processes is not None:
+            self.processes.close([self.backend_instances[name] for name in names])
+
         for name in names:
             backend = self.backend_instances.pop(name)
             with backend:
@@ -205,11 +233,21 @@ class WebNip(object):
         """
         return len(self.backend_instances)
 
+    def workers_stats(self):
+        """
+        Get usage of the pool of threads which call backends.
+
+        :returns: max_workers, workers, active, idle and queued counts
+        :rtype: :class:`dict`
+        """
+        return self.workers.stats()
+
     def iter_backends(self, caps=None, module=None):
         """
         Iter on each backends.
 
-        Note: each backend is locked when it is returned.
+        Note: each backend is locked when it is returned, unless its module
+        is :attr:`weboob.tools.backend.Module.REENTRANT`.
 
         :param caps: optional list of capabilities to select backends
         :type caps: tuple[:class:`weboob.capabilities.base.Capability`]
@@ -247,8 +285,75 @@ class WebNip(object):
         :type backends: list[:class:`str`]
         :param caps: iterate on backends which implement this caps
         :type caps: list[:class:`weboob.capabilities.base.Capability`]
+        :param max_buffered: maximum number of results of each backend which
+                             are not consumed yet; when this limit is reached,
+                             the backend is paused
+        :type max_buffered: :class:`int`
+        :param timeout: maximum duration of the call, in seconds; backends
+                        which are not finished are reported with a
+                        :class:`weboob.core.bcall.BackendTimeout` error, and
+                        results they already returned are kept
+        :type timeout: :class:`float`
+        :param per_backend_timeout: maximum duration of the call of each
+                                    backend, in seconds
+        :type per_backend_timeout: :class:`float`
+        :param sort_key: if given, each backend has to return results sorted
+                         on this key, and they are merged to be yielded in
+                         order, without waiting for every result
+        :type sort_key: :class:`callable`
+        :param sort_reverse: sort in descending order
+        :type sort_reverse: :class:`bool`
+        :param stats_hook: called with the :class:`weboob.core.bcall.CallStats`
+                           of the call; default is :attr:`stats_hook`
+        :type stats_hook: :class:`callable`
+        :param executor: 'thread' (default) or 'process'; with 'process',
+                         each backend lives in its own worker process, kept
+                         between calls, and *function* has to be a method name
+        :type executor: :class:`str`
         :rtype: A :class:`weboob.core.bcall.BackendsCall` object (iterable)
         """
+        backends = self._pop_call_backends(kwargs)
+
+        # The return value MUST BE the BackendsCall instance. Please never iterate
+        # here on this object, because caller might want to use other methods, like
+        # wait() on callback_thread().
+        # Thanks a lot.
+        self._set_call_processes(kwargs)
+        kwargs.setdefault('stats_hook', self.stats_hook)
+        return BackendsCall(backends, function, *args, workers=self.workers, **kwargs)
+
+    def ado(self, function, *args, **kwargs):
+        """
+        Same as :func:`do`, but results are consumed from an :mod:`asyncio`
+        event loop, with ``async for``, or all at once with ``await``.
+
+        Takes the same parameters as :func:`do`.
+
+        :rtype: A :class:`weboob.core.abcall.AsyncBackendsCall` object (async iterable)
+        """
+        from weboob.core.abcall import AsyncBackendsCall
+
+        backends = self._pop_call_backends(kwargs)
+        self._set_call_processes(kwargs)
+        kwargs.setdefault('stats_hook', self.stats_hook)
+        return AsyncBackendsCall(backends, function, *args, workers=self.workers, **kwargs)
+
+    def _set_call_processes(self, kwargs):
+        """
+        Give the registry of backends processes to calls which run in
+        processes, so that they are kept between calls.
+        """
+        if kwargs.get('executor') == 'process':
+            if self.processes is None:
+                from weboob.core.process import BackendProcesses
+                self.processes = BackendProcesses()
+            kwargs.setdefault('processes', self.processes)
+
+    def _pop_call_backends(self, kwargs):
+        """
+        Get backends to call from the *backends* and *caps* parameters of
+        :func:`do`, and remove them from *kwargs*.
+        """
         backends = list(self.backend_instances.values())
         _backends = kwargs.pop('backends', None)
         if _backends is not None:
@@ -277,11 +382,7 @@ class WebNip(object):
             caps = kwargs.pop('caps')
             backends = [backend for backend in backends if backend.has_caps(caps)]
 
-        # The return value MUST BE the BackendsCall instance. Please never iterate
-        # here on this object, because caller might want to use other methods, like
-        # wait() on callback_thread().
-        # Thanks a lot.
-        return BackendsCall(backends, function, *args, **kwargs)
+        return backends
 
     def schedule(self, interval, function, *args):
         """
@@ -348,18 +449,24 @@ class Weboob(WebNip):
     :type backends_filename: str
     :param storage: provide a storage where backends can save data
     :type storage: :class:`weboob.tools.storage.IStorage`
+    :param max_workers: maximum number of backends called at the same time
+    :type max_workers: :class:`int`
     """
     BACKENDS_FILENAME = 'backends'
 
-    def __init__(self, workdir=None, datadir=None, backends_filename=None, scheduler=None, storage=None):
-        super(Weboob, self).__init__(modules_path=False, scheduler=scheduler, storage=storage)
+    def __init__(self, workdir=None, datadir=None, backends_filename=None, scheduler=None, storage=None,
+                 max_workers=None):
+        super(Weboob, self).__init__(modules_path=False, scheduler=scheduler, storage=storage,
+                                     max_workers=max_workers)
 
         # Create WORKDIR
         if workdir is None:
             if 'WEBOOB_WORKDIR' in os.environ:
                 workdir = os.environ['WEBOOB_WORKDIR']
             else:
-                workdir = os.path.join(os.environ.get('XDG_CONFIG_HOME', os.path.join(os.path.expanduser('~'), '.config')), 'weboob')
+                workdir = os.path.join(os.environ.get('XDG_CONFIG_HOME',
+                                                      os.path.join(os.path.expanduser('~'), '.config')),
+                                       'weboob')
 
         self.workdir = os.path.realpath(workdir)
         self._create_dir(workdir)
@@ -371,7 +478,9 @@ class Weboob(WebNip):
             elif 'WEBOOB_WORKDIR' in os.environ:
                 datadir = os.environ['WEBOOB_WORKDIR']
             else:
-                datadir = os.path.join(os.environ.get('XDG_DATA_HOME', os.path.join(os.path.expanduser('~'), '.local', 'share')), 'weboob')
+                datadir = os.path.join(os.environ.get('XDG_DATA_HOME',
+                                                      os.path.join(os.path.expanduser('~'), '.local', 'share')),
+                                       'weboob')
 
         _datadir = os.path.realpath(datadir)
         self._create_dir(_datadir)
@@ -400,10 +509,16 @@ class Weboob(WebNip):
         self.repositories.update(progress)
 
         modules_to_check = set([module_name for _, module_name, _ in self.backends_config.iter_backends()])
+        to_install = []
         for module_name in modules_to_check:
             minfo = self.repositories.get_module_info(module_name)
             if minfo and not minfo.is_installed():
-                self.repositories.install(minfo, progress)
+                to_install.append(minfo)
+
+        if to_install:
+            errors = self.repositories.install_modules(to_install, progress)
+            if errors:
+                raise list(errors.values())[0]
 
     def build_backend(self, module_name, params=None, storage=None, name=None, nofail=False):
         """
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2010-2014 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+
+import multiprocessing
+import pickle
+from io import BytesIO
+from threading import Condition, Lock, RLock, local
+
+from weboob.capabilities.base import NotAvailable, NotLoaded, FetchError
+from weboob.tools.compat import basestring
+from weboob.tools.log import getLogger
+from weboob.tools.misc import get_backtrace
+
+
+__all__ = ['BackendProcess', 'BackendProcesses']
+
+
+# Results are pickled as is, with private attributes used by modules in
+# next calls. Constants compared with the "is" operator have to be kept as
+# is.
+CONSTANTS = {'NotAvailable': NotAvailable, 'NotLoaded': NotLoaded, 'FetchError': FetchError}
+
+
+class _Pickler(pickle.Pickler):
+    def persistent_id(self, obj):
+        for name, value in CONSTANTS.items():
+            if obj is value:
+                return name
+        return None
+
+
+class _Unpickler(pickle.Unpickler):
+    def persistent_load(self, pid):
+        return CONSTANTS[pid]
+
+
+def dumps(obj):
+    f = BytesIO()
+    _Pickler(f, pickle.HIGHEST_PROTOCOL).dump(obj)
+    return f.getvalue()
+
+
+def loads(data):
+    return _Unpickler(BytesIO(data)).load()
+
+
+class BackendProcess(object):
+    """
+    Process in which a backend lives, to call its methods.
+
+    The process is forked from the current one, so it inherits the backend
+    instance, and then keeps it: browser sessions and other states are
+    kept between calls.
+
+    :param backend: backend to run in the process
+    :type backend: :class:`weboob.tools.backend.Module`
+    """
+
+    def __init__(self, backend):
+        self.logger = getLogger('process', backend.logger)
+        self.backend = backend
+        self.lock = Lock()
+
+        ctx = multiprocessing.get_context('fork')
+        self.conn, child_conn = ctx.Pipe()
+
+        # Prevent any call on the backend while it is copied.
+        with backend:
+            self.process = ctx.Process(target=self._child_run, args=(child_conn,),
+                                       name='backend %s' % backend.name)
+            self.process.daemon = True
+            self.process.start()
+        child_conn.close()
+
+    def _send(self, conn, *msg):
+        conn.send_bytes(dumps(msg))
+
+    def _recv(self, conn):
+        return loads(conn.recv_bytes())
+
+    def _child_run(self, conn):
+        backend = self.backend
+        # The lock may have been held by another thread of the parent
+        # process, which doesn't exist here.
+        backend.lock = RLock()
+        if getattr(backend, 'REENTRANT', False):
+            # Browsers in use by other threads are in an unknown state.
+            backend._browsers_cond = Condition()
+            backend._browsers = list(backend._idle_browsers)
+            backend._local = local()
+            if backend._browser not in backend._browsers:
+                backend._browser = backend._browsers[-1] if backend._browsers else None
+
+        while True:
+            try:
+                msg = self._recv(conn)
+            except EOFError:
+                break
+
+            if msg[0] == 'quit':
+                state = None
+                if backend._browser is not None and hasattr(backend.browser, 'dump_state'):
+                    state = backend.browser.dump_state()
+                self._send(conn, 'state', state)
+                break
+            elif msg[0] == 'call':
+                self._child_call(backend, conn, *msg[1:])
+                self._send(conn, 'end')
+
+    def _child_call(self, backend, conn, function, args, kwargs):
+        try:
+            with backend:
+                result = getattr(backend, function)(*args, **kwargs)
+                if not hasattr(result, '__iter__') or isinstance(result, (bytes, basestring)):
+                    self._send(conn, 'result', result)
+                    return
+
+                try:
+                    for subresult in result:
+                        self._send(conn, 'result', subresult)
+                        if conn.poll() and self._recv(conn)[0] == 'stop':
+                            break
+                finally:
+                    if hasattr(result, 'close'):
+                        result.close()
+        except Exception as error:
+            backtrace = get_backtrace(error)
+            try:
+                data = dumps(error)
+            except Exception:
+                # unpicklable exception
+                data = dumps(Exception(u'%s: %s' % (error.__class__.__name__, error)))
+            self._send(conn, 'error', data, backtrace)
+
+    def call(self, function, args, kwargs):
+        """
+        Call a method of the backend in the process.
+
+        Results are yielded as soon as they are sent by the process. If the
+        iteration is interrupted, the process stops to iterate too.
+
+        :param function: name of the backend's method
+        :type function: :class:`str`
+        """
+        with self.lock:
+            self._send(self.conn, 'call', function, args, kwargs)
+            error = None
+            ended = False
+            try:
+                while True:
+                    msg = self._recv(self.conn)
+                    if msg[0] == 'result':
+                        yield msg[1]
+                    elif msg[0] == 'error':
+                        error = loads(msg[1])
+                        error.remote_backtrace = msg[2]
+                    elif msg[0] == 'end':
+                        ended = True
+                        break
+            finally:
+                if not ended:
+                    # The iteration has been interrupted.
+                    self._send(self.conn, 'stop')
+                    while self._recv(self.conn)[0] != 'end':
+                        pass
+
+            if error is not None:
+                raise error
+
+    def close(self):
+        """
+        Stop the process, and save the browser state.
+        """
+        with self.lock:
+            try:
+                self._send(self.conn, 'quit')
+                msg = self._recv(self.conn)
+            except (EOFError, IOError, OSError):
+                self.logger.warning('Process of backend %s is dead', self.backend.name)
+            else:
+                if msg[1] is not None:
+                    self.backend.storage.set('browser_state', msg[1])
+                    self.backend.storage.save()
+            self.conn.close()
+            self.process.join()
+
+
+class BackendProcesses(object):
+    """
+    Registry of processes in which backends are called.
+
+    Each backend gets its own process, reused by every call.
+    """
+
+    def __init__(self):
+        self.mutex = Lock()
+        self.processes = {}
+
+    def get(self, backend):
+        """
+        Get process of a backend, and start it if needed.
+
+        :rtype: :class:`BackendProcess`
+        """
+        with self.mutex:
+            process = self.processes.get(backend)
+            if process is None or not process.process.is_alive():
+                process = self.processes[backend] = BackendProcess(backend)
+            return process
+
+    def close(self, backends=None):
+        """
+        Stop processes.
+
+        :param backends: if specified, only stop processes of these backends
+        :type backends: list[:class:`weboob.tools.backend.Module`]
+        """
+        with self.mutex:
+            if backends is None:
+                backends = list(self.processes.keys())
+            processes = [self.processes.pop(backend) for backend in backends if backend in self.processes]
+
+        for process in processes:
+            process.close()
@@ -27,14 +27,21 @@ import sys
 import os
 import subprocess
 import hashlib
+import multiprocessing
 from compileall import compile_dir
 from contextlib import closing, contextmanager
 from datetime import datetime
 from io import BytesIO, StringIO
 from tempfile import NamedTemporaryFile
+from threading import Lock
+
+try:
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+except ImportError:
+    ThreadPoolExecutor = None
 
 from weboob.exceptions import BrowserHTTPError, BrowserHTTPNotFound, ModuleInstallError
-from .modules import LoadedModule
+from .modules import LoadedModule, get_tree_fingerprint
 from weboob.tools.log import getLogger
 from weboob.tools.misc import get_backtrace, to_unicode, find_exe
 from weboob.tools.compat import basestring, unicode
@@ -78,6 +85,8 @@ class ModuleInfo(object):
         self.license = u''
         self.icon = u''
         self.urls = u''
+        # files of the module when the index was built.
+        self.fingerprint = u''
 
     def load(self, items):
         self.version = int(items['version'])
@@ -87,6 +96,7 @@ class ModuleInfo(object):
         self.license = to_unicode(items['license'])
         self.icon = items['icon'].strip() or None
         self.urls = items['urls']
+        self.fingerprint = items.get('fingerprint', u'')
 
     def has_caps(self, *caps):
         """Return True if module implements at least one of the caps."""
@@ -113,9 +123,42 @@ class ModuleInfo(object):
                 ('license', self.license),
                 ('icon', self.icon or ''),
                 ('urls', self.urls),
+                ('fingerprint', self.fingerprint),
                )
 
 
+def build_module_info(path, name):
+    """
+    Import a module to get its information.
+
+    It can be run in a child process.
+
+    :returns: the :class:`ModuleInfo`, or None and the error backtrace
+    :rtype: tuple
+    """
+    try:
+        fp, pathname, description = imp.find_module(name, [path])
+        try:
+            module = LoadedModule(imp.load_module(name, fp, pathname, description))
+        finally:
+            if fp:
+                fp.close()
+    except Exception as e:
+        return None, '[%s] %s' % (type(e).__name__, e), get_backtrace(e)
+
+    m = ModuleInfo(module.name)
+    m.capabilities = list(set([c.__name__ for c in module.iter_caps()]))
+    m.description = module.description
+    m.maintainer = module.maintainer
+    m.license = module.license
+    m.icon = module.icon or ''
+    return m, None, None
+
+
+def _build_module_info(args):
+    return args[1], build_module_info(*args)
+
+
 class RepositoryUnavailable(Exception):
     """
     Repository in not available.
@@ -277,16 +320,24 @@ class Repository(object):
                 module.signed = self.signed
             self.modules[section] = module
 
-    def build_index(self, path, filename):
+    def build_index(self, path, filename, processes=None):
         """
         Rebuild index of modules of repository.
 
+        Modules which haven't been modified since the previous build of the
+        index are not imported again.
+
         :param path: path of the repository
         :type path: str
         :param filename: file to save index
         :type filename: str
+        :param processes: if greater than 1, number of processes in which
+                          modified modules are imported
+        :type processes: int
         """
         self.logger.debug('Rebuild index')
+        # Index as read by parse_index().
+        previous = dict(self.modules)
         self.modules.clear()
         self.errors.clear()
 
@@ -297,49 +348,59 @@ class Repository(object):
             self.signed = False
             self.key_update = 0
 
+        fingerprints = {}
         for name in sorted(os.listdir(path)):
             module_path = os.path.join(path, name)
-            if not os.path.isdir(module_path) or '.' in name or name == self.KEYDIR or not os.path.exists(os.path.join(module_path, '__init__.py')):
+            if not os.path.isdir(module_path) or '.' in name or name == self.KEYDIR or \
+               not os.path.exists(os.path.join(module_path, '__init__.py')):
                 continue
 
+            # The version of changed modules comes from the same scan.
+            mtime, count, names = get_tree_fingerprint(module_path)
+            fingerprint = u':'.join(str(value) for value in (mtime, count, names))
+            m = previous.get(name)
+            if m is not None and m.fingerprint == fingerprint:
+                self.modules[name] = m
+            else:
+                fingerprints[name] = (fingerprint, mtime)
+
+        self.logger.debug('%d modules to build, %d unchanged', len(fingerprints), len(self.modules))
+        tasks = [(path, name) for name in sorted(fingerprints)]
+        if processes is not None and processes > 1 and len(tasks) > 1:
+            pool = multiprocessing.Pool(processes)
             try:
-                fp, pathname, description = imp.find_module(name, [path])
-                try:
-                    module = LoadedModule(imp.load_module(name, fp, pathname, description))
-                finally:
-                    if fp:
-                        fp.close()
-            except Exception as e:
-                self.logger.warning('Unable to build module %s: [%s] %s' % (name, type(e).__name__, e))
-                bt = get_backtrace(e)
+                results = pool.map(_build_module_info, tasks)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            results = map(_build_module_info, tasks)
+
+        for name, (m, error, bt) in results:
+            if m is None:
+                self.logger.warning('Unable to build module %s: %s' % (name, error))
                 self.logger.debug(bt)
                 self.errors[name] = bt
             else:
-                m = ModuleInfo(module.name)
-                m.version = self.get_tree_mtime(module_path)
-                m.capabilities = list(set([c.__name__ for c in module.iter_caps()]))
-                m.description = module.description
-                m.maintainer = module.maintainer
-                m.license = module.license
-                m.icon = module.icon or ''
-                self.modules[module.name] = m
+                m.fingerprint, mtime = fingerprints[name]
+                m.version = self.format_mtime(mtime)
+                self.modules[m.name] = m
 
         self.update = int(datetime.now().strftime('%Y%m%d%H%M'))
         self.save(filename)
 
-    @staticmethod
-    def get_tree_mtime(path, include_root=False):
-        mtime = 0
+    @classmethod
+    def get_tree_mtime(cls, path, include_root=False):
+        mtime = get_tree_fingerprint(path)[0]
         if include_root:
-            mtime = int(datetime.fromtimestamp(os.path.getmtime(path)).strftime('%Y%m%d%H%M'))
-        for root, dirs, files in os.walk(path):
-            for f in files:
-                if f.endswith('.pyc'):
-                    continue
-                m = int(datetime.fromtimestamp(os.path.getmtime(os.path.join(root, f))).strftime('%Y%m%d%H%M'))
-                mtime = max(mtime, m)
+            mtime = max(mtime, os.path.getmtime(path))
+        return cls.format_mtime(mtime)
 
-        return mtime
+    @staticmethod
+    def format_mtime(mtime):
+        if not mtime:
+            return 0
+        return int(datetime.fromtimestamp(int(mtime)).strftime('%Y%m%d%H%M'))
 
     def save(self, filename, private=False):
         """
@@ -456,9 +517,13 @@ class Repositories(object):
 
     SHARE_DIRS = [MODULES_DIR, REPOS_DIR, KEYRINGS_DIR, ICONS_DIR]
 
+    MAX_WORKERS = 4
+    """Maximum number of modules checked and extracted at the same time."""
+
     def __init__(self, workdir, datadir, version):
         self.logger = getLogger('repositories')
         self.version = version
+        self.mutex = Lock()
 
         self.browser = None
 
@@ -610,15 +675,28 @@ class Repositories(object):
             os.remove(os.path.join(self.repos_dir, name))
 
         gpg_found = Keyring.find_gpg() or Keyring.find_gpgv()
+        repositories = []
         for line in self._parse_source_list():
             progress.progress(0.0, 'Getting %s' % line)
-            repository = Repository(line)
+            repositories.append(Repository(line))
+
+        def retrieve_index(repository):
+            try:
+                repository.retrieve_index(self.browser, None)
+            except RepositoryUnavailable as e:
+                return e
+
+        # Indexes are retrieved concurrently, then processed in the order
+        # of the sources.list.
+        for repository, error in zip(repositories, self._map(retrieve_index, repositories)):
             filename = self.url2filename(repository.url)
             prio_filename = '%02d-%s' % (len(self.repositories), filename)
             repo_path = os.path.join(self.repos_dir, prio_filename)
             keyring_path = os.path.join(self.keyrings_dir, filename)
             try:
-                repository.retrieve_index(self.browser, repo_path)
+                if error is not None:
+                    raise error
+                repository.save(repo_path, private=True)
                 if gpg_found:
                     repository.retrieve_keyring(self.browser, keyring_path, progress)
                 else:
@@ -633,6 +711,19 @@ class Repositories(object):
                     progress.error('This repository does not receive updates anymore (since %s).\n'
                                    'Your weboob version is probably obsolete and should be upgraded.' % last_update)
 
+    def _map(self, function, items):
+        """
+        Call a function on items in threads.
+
+        :returns: results, in the order of items
+        :rtype: list
+        """
+        if ThreadPoolExecutor is None or len(items) < 2:
+            return [function(item) for item in items]
+
+        with ThreadPoolExecutor(max_workers=len(items)) as executor:
+            return list(executor.map(function, items))
+
     def check_repositories(self):
         """
         Check if sources.list is consistent with repositories
@@ -667,19 +758,91 @@ class Repositories(object):
             progress.progress(1.0, 'All modules are up-to-date.')
             return
 
+        self.install_modules(to_update, progress)
+
+    def install_modules(self, modules, progress=PrintProgress()):
+        """
+        Install several modules.
+
+        Tarballs of modules are downloaded concurrently with the session of
+        the browser. As soon as one is received, it is checked and extracted
+        by a pool of workers, while others are still being downloaded.
+
+        :param modules: modules to install
+        :type modules: list[:class:`str` or :class:`ModuleInfo`]
+        :param progress: observer object
+        :type progress: :class:`IProgress`
+        :returns: errors of modules which failed to be installed
+        :rtype: dict[:class:`str`, :class:`ModuleInstallError`]
+        """
+        if ThreadPoolExecutor is None:
+            errors = {}
+            for module in modules:
+                try:
+                    self.install(module, progress)
+                except ModuleInstallError as e:
+                    progress.progress(1.0, unicode(e))
+                    errors[getattr(module, 'name', module)] = e
+            return errors
+
+        self.load_browser()
+        errors = {}
+        count = [0]
+        total = len(modules)
+
         class InstallProgress(PrintProgress):
             def __init__(self, n):
                 self.n = n
 
             def progress(self, percent, message):
-                progress.progress(float(self.n)/len(to_update) + 1.0/len(to_update)*percent, message)
+                progress.progress(float(self.n)/total + 1.0/total*percent, message)
+
+        class SetupProgress(PrintProgress):
+            # Steps of modules set up concurrently are not reported.
+            def progress(self, percent, message):
+                pass
 
-        for n, info in enumerate(to_update):
-            inst_progress = InstallProgress(n)
+        def done(name, message, error=None):
+            count[0] += 1
+            progress.progress(float(count[0]) / total, message)
+            if error is not None:
+                errors[name] = error
+
+        downloads = {}
+        for n, module in enumerate(modules):
             try:
-                self.install(info, inst_progress)
+                info = self._get_module_to_install(module, InstallProgress(n))
             except ModuleInstallError as e:
-                inst_progress.progress(1.0, unicode(e))
+                done(getattr(module, 'name', module), unicode(e), e)
+                continue
+
+            futures = self._download_module(info, is_async=True)
+            downloads[futures[0]] = (info, futures[1:])
+
+        with ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as executor:
+            setups = {}
+            for future in as_completed(list(downloads)):
+                info, sig_futures = downloads[future]
+                try:
+                    tardata = future.result().content
+                    sig_data = sig_futures[0].result().content if sig_futures else None
+                except BrowserHTTPError as e:
+                    error = ModuleInstallError('Unable to fetch module: %s' % e)
+                    done(info.name, unicode(error), error)
+                    continue
+
+                setups[executor.submit(self._setup_module, info, tardata, sig_data, SetupProgress())] = info
+
+            for future in as_completed(list(setups)):
+                info = setups[future]
+                try:
+                    future.result()
+                except ModuleInstallError as e:
+                    done(info.name, unicode(e), e)
+                else:
+                    done(info.name, 'Module %s has been installed!' % info.name)
+
+        return errors
 
     def install(self, module, progress=PrintProgress()):
         """
@@ -690,9 +853,24 @@ class Repositories(object):
         :param progress: observer object
         :type progress: :class:`IProgress`
         """
-        import tarfile
         self.load_browser()
 
+        module = self._get_module_to_install(module, progress)
+
+        progress.progress(0.3, 'Downloading module...')
+        try:
+            data = [response.content for response in self._download_module(module)]
+        except BrowserHTTPError as e:
+            raise ModuleInstallError('Unable to fetch module: %s' % e)
+
+        self._setup_module(module, data[0], data[1] if len(data) > 1 else None, progress)
+
+    def _get_module_to_install(self, module, progress):
+        """
+        Get information of a module, and check it can be installed.
+
+        :rtype: :class:`ModuleInfo`
+        """
         if isinstance(module, ModuleInfo):
             info = module
         elif isinstance(module, basestring):
@@ -717,16 +895,35 @@ class Repositories(object):
         else:
             raise ModuleInstallError('The latest version of %s is already installed' % module.name)
 
-        progress.progress(0.3, 'Downloading module...')
-        try:
-            tardata = self.browser.open(module.url).content
-        except BrowserHTTPError as e:
-            raise ModuleInstallError('Unable to fetch module: %s' % e)
+        return module
 
-        # Check signature
+    def _download_module(self, module, is_async=False):
+        """
+        Download the tarball of a module, and its signature if it has to
+        be checked.
+
+        :returns: responses, or futures if is_async is True
+        :rtype: list
+        """
+        urls = [module.url]
         if module.signed and (Keyring.find_gpg() or Keyring.find_gpgv()):
+            urls.append(module.url + '.sig')
+
+        return [self.browser.open(url, is_async=is_async) for url in urls]
+
+    def _setup_module(self, module, tardata, sig_data, progress):
+        """
+        Check a downloaded module and extract it.
+
+        It can be called from several threads at once.
+        """
+        import tarfile
+
+        module_dir = os.path.join(self.modules_dir, module.name)
+
+        # Check signature
+        if sig_data is not None:
             progress.progress(0.5, 'Checking module authenticity...')
-            sig_data = self.browser.open(posixpath.join(module.url + '.sig')).content
             keyring_path = os.path.join(self.keyrings_dir, self.url2filename(module.repo_url))
             keyring = Keyring(keyring_path)
             if not keyring.exists():
@@ -745,7 +942,8 @@ class Repositories(object):
         # Precompile
         compile_dir(module_dir, quiet=True)
 
-        self.versions.set(module.name, module.version)
+        with self.mutex:
+            self.versions.set(module.name, module.version)
 
         progress.progress(0.9, 'Downloading icon...')
         self.retrieve_icon(module)
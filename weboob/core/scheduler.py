@@ -20,17 +20,20 @@
 
 from __future__ import print_function
 
-from threading import Event, RLock
+from heapq import heapify, heappop, heappush
+from threading import Condition, Event, Lock, RLock, Thread
+from time import time
 try:
     from threading import _Timer as Timer
 except ImportError:
     from threading import Timer
 
+from weboob.core.workers import WorkerPool
 from weboob.tools.log import getLogger
 from weboob.tools.misc import get_backtrace
 
 
-__all__ = ['Scheduler']
+__all__ = ['HeapScheduler', 'Scheduler']
 
 
 class IScheduler(object):
@@ -176,3 +179,161 @@ class Scheduler(IScheduler):
                 # Contrary to _wait_to_stop(), don't call t.join
                 # because want_stop() have to be non-blocking.
             self.queue = {}
+
+
+class ScheduledEvent(object):
+    __slots__ = ('id', 'interval', 'function', 'args', 'repeat', 'deadline')
+
+    def __init__(self, id, interval, function, args, repeat):
+        self.id = id
+        self.interval = interval
+        self.function = function
+        self.args = args
+        self.repeat = repeat
+        self.deadline = None
+
+
+class HeapScheduler(IScheduler):
+    """
+    Scheduler using a single dispatcher thread.
+
+    Deadlines of events are kept in a heap, and due functions are called
+    by a pool of workers, so the number of threads doesn't depend on the
+    number of scheduled events.
+
+    As with :class:`Scheduler`, a repeated function is called at once,
+    then *interval* seconds after the end of each call.
+
+    It is used by giving it to :class:`weboob.core.ouiboube.WebNip`:
+
+    >>> weboob = Weboob(scheduler=HeapScheduler())  # doctest: +SKIP
+
+    :param max_workers: maximum number of functions called at the same time
+    :type max_workers: :class:`int`
+    """
+
+    def __init__(self, max_workers=10):
+        self.logger = getLogger('scheduler')
+        self.mutex = Lock()
+        self.cond = Condition(self.mutex)
+        self.stop_event = Event()
+        self.count = 0
+        self.queue = {}
+        # (deadline, id) of events. Entries of canceled events are only
+        # skipped when they are popped.
+        self.heap = []
+        self.workers = WorkerPool(max_workers, name='scheduler')
+        self.thread = None
+
+    def schedule(self, interval, function, *args):
+        return self._schedule(interval, interval, function, args, False)
+
+    def repeat(self, interval, function, *args):
+        return self._schedule(0, interval, function, args, True)
+
+    def _schedule(self, delay, interval, function, args, repeat):
+        if self.stop_event.is_set():
+            return
+
+        with self.mutex:
+            self.count += 1
+            self.logger.debug('function "%s" will be called in %s seconds' % (function.__name__, delay))
+            event = ScheduledEvent(self.count, interval, function, args, repeat)
+            self.queue[event.id] = event
+            self._push(event, delay)
+
+            if self.thread is None:
+                self.thread = Thread(target=self._dispatch, name='scheduler')
+                self.thread.daemon = True
+                self.thread.start()
+            return event.id
+
+    def _push(self, event, delay):
+        """
+        Must be called with the mutex acquired.
+        """
+        event.deadline = time() + delay
+        if not self.heap or event.deadline < self.heap[0][0]:
+            # The dispatcher has to wait less.
+            self.cond.notify()
+        heappush(self.heap, (event.deadline, event.id))
+
+    def _dispatch(self):
+        with self.mutex:
+            while not self.stop_event.is_set():
+                if not self.heap:
+                    self.cond.wait()
+                    continue
+
+                deadline, id = self.heap[0]
+                event = self.queue.get(id)
+                if event is None or event.deadline != deadline:
+                    heappop(self.heap)
+                    continue
+
+                delay = deadline - time()
+                if delay > 0:
+                    self.cond.wait(delay)
+                    continue
+
+                heappop(self.heap)
+                if event.repeat:
+                    # Not scheduled again until the end of this call.
+                    event.deadline = None
+                else:
+                    self.queue.pop(id)
+                self.workers.submit(self._call, event)
+
+    def _call(self, event):
+        try:
+            event.function(*event.args)
+        except Exception:
+            # do not stop repeating because of an exception
+            self.logger.error('Error in scheduled function "%s":\n%s', event.function.__name__, get_backtrace())
+
+        if event.repeat:
+            with self.mutex:
+                if self.queue.get(event.id) is event and not self.stop_event.is_set():
+                    self.logger.debug('function "%s" will be called in %s seconds',
+                                      event.function.__name__, event.interval)
+                    self._push(event, event.interval)
+
+    def cancel(self, ev):
+        with self.mutex:
+            try:
+                e = self.queue.pop(ev)
+            except KeyError:
+                return False
+
+            if len(self.heap) > 2 * len(self.queue) + 64:
+                # Too many canceled entries.
+                self.heap = [(event.deadline, event.id) for event in self.queue.values()
+                             if event.deadline is not None]
+                heapify(self.heap)
+            self.logger.debug('scheduled function "%s" is canceled' % e.function.__name__)
+            return True
+
+    def _wait_to_stop(self):
+        self.want_stop()
+        self.workers.shutdown(wait=True)
+        if self.thread is not None:
+            self.thread.join()
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                self.stop_event.wait(0.1)
+        except KeyboardInterrupt:
+            self._wait_to_stop()
+            raise
+        else:
+            self._wait_to_stop()
+        return True
+
+    def want_stop(self):
+        self.stop_event.set()
+        with self.mutex:
+            self.queue = {}
+            self.heap = []
+            self.cond.notify()
+        self.workers.shutdown()
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+# Copyright(C) 2010-2014 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+import asyncio
+import time
+from threading import Event
+from unittest import TestCase
+
+from weboob.capabilities.base import BaseObject
+from weboob.core.abcall import AsyncBackendsCall
+from weboob.core.bcall import CallErrors
+from weboob.core.workers import WorkerPool
+
+from .bcall import MyMockBackend
+
+
+class AsyncBackendsCallTest(TestCase):
+    def setUp(self):
+        self.pool = WorkerPool(2)
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+        asyncio.set_event_loop(None)
+        self.pool.shutdown(wait=True)
+
+    def test_async_for(self):
+        backends = [MyMockBackend('a', [BaseObject('1')]), MyMockBackend('b', [], ValueError('boom'))]
+
+        async def consume():
+            results = []
+            try:
+                async for result in AsyncBackendsCall(backends, 'iter_items', workers=self.pool):
+                    results.append(result)
+            except CallErrors as errors:
+                return results, errors
+
+        results, errors = self.loop.run_until_complete(consume())
+        self.assertEqual([(obj.id, obj.backend) for obj in results], [('1', 'a')])
+        self.assertEqual([backend.name for backend, error, backtrace in errors], ['b'])
+
+    def test_await(self):
+        backends = [MyMockBackend('b%d' % i, range(3)) for i in range(3)]
+
+        async def consume():
+            return await AsyncBackendsCall(backends, 'iter_items', workers=self.pool)
+
+        self.assertEqual(sorted(self.loop.run_until_complete(consume())), [0, 0, 0, 1, 1, 1, 2, 2, 2])
+
+    def test_loop(self):
+        # The call is made for another loop than the current one.
+        loop = asyncio.new_event_loop()
+
+        def call(backend):
+            time.sleep(0.05)
+            yield 1
+
+        bcall = AsyncBackendsCall([MyMockBackend('a')], call, workers=self.pool, loop=loop)
+
+        async def consume():
+            return await bcall
+
+        try:
+            self.assertEqual(loop.run_until_complete(consume()), [1])
+        finally:
+            loop.close()
+
+    def test_cancel(self):
+        release = Event()
+
+        def call(backend):
+            yield 1
+            release.wait()
+            yield 2
+
+        bcall = AsyncBackendsCall([MyMockBackend('a')], call, workers=self.pool)
+
+        async def consume():
+            async for result in bcall:
+                pass
+
+        task = self.loop.create_task(consume())
+        self.loop.call_later(0.1, task.cancel)
+        with self.assertRaises(asyncio.CancelledError):
+            self.loop.run_until_complete(task)
+        self.assertTrue(bcall.stop_event.is_set())
+        release.set()
+
+    def test_closed_loop(self):
+        release = Event()
+        finished = Event()
+
+        def call(backend):
+            yield 1
+            release.wait()
+            try:
+                yield 2
+            finally:
+                finished.set()
+
+        bcall = AsyncBackendsCall([MyMockBackend('a')], call, workers=self.pool)
+
+        async def consume():
+            async for result in bcall:
+                pass
+
+        task = self.loop.create_task(consume())
+        self.loop.call_later(0.1, task.cancel)
+        with self.assertRaises(asyncio.CancelledError):
+            self.loop.run_until_complete(task)
+        self.loop.close()
+
+        # The backend still running does not wake up the closed loop.
+        release.set()
+        self.assertTrue(finished.wait(5))
+        self.pool.shutdown(wait=True)
+        self.assertEqual(bcall.errors, [])
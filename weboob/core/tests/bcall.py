@@ -0,0 +1,412 @@
+# -*- coding: utf-8 -*-
+# Copyright(C) 2010-2014 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+import time
+from threading import Event, RLock, Lock, Semaphore
+from unittest import TestCase
+
+from weboob.core.bcall import BackendsCall, BackendTimeout, CallErrors
+from weboob.core.workers import WorkerPool
+from weboob.tools.backend import Module
+
+
+# Mock that allows to represent a Module
+class MyMockBackend(object):
+    def __init__(self, name, items=(), error=None):
+        self.name = name
+        self.items = items
+        self.error = error
+        self.lock = RLock()
+
+    def __enter__(self):
+        self.lock.acquire()
+
+    def __exit__(self, t, v, tb):
+        self.lock.release()
+
+    def __repr__(self):
+        return '<Backend %r>' % self.name
+
+    def iter_items(self):
+        for item in self.items:
+            yield item
+        if self.error:
+            raise self.error
+
+
+class MyMockBrowser(object):
+    def __init__(self, *args, **kwargs):
+        self.cookies = {}
+
+    def dump_state(self):
+        return dict(self.cookies)
+
+    def load_state(self, state):
+        self.cookies.update(state)
+
+
+class MyReentrantModule(Module):
+    NAME = 'reentrant'
+    BROWSER = MyMockBrowser
+    REENTRANT = True
+
+
+class MyLimitedReentrantModule(MyReentrantModule):
+    MAX_BROWSERS = 1
+
+
+class WorkerPoolTest(TestCase):
+    def test_max_workers(self):
+        pool = WorkerPool(2)
+        lock = Lock()
+        release = Event()
+        started = Semaphore(0)
+        running = []
+
+        def task():
+            with lock:
+                running.append(1)
+            started.release()
+            release.wait()
+
+        for _ in range(5):
+            pool.submit(task)
+
+        started.acquire()
+        started.acquire()
+        self.assertEqual(pool.stats()['workers'], 2)
+        self.assertEqual(pool.active_workers, 2)
+        self.assertEqual(pool.queue_depth, 3)
+
+        release.set()
+        pool.shutdown(wait=True)
+        self.assertEqual(len(running), 5)
+        self.assertEqual(pool.stats()['workers'], 0)
+
+    def test_reuse(self):
+        pool = WorkerPool(4)
+        for _ in range(3):
+            list(BackendsCall([MyMockBackend('a', [1])], 'iter_items', workers=pool))
+        self.assertEqual(pool.count, 1)
+        pool.shutdown(wait=True)
+
+    def test_nested_submit(self):
+        pool = WorkerPool(1)
+        done = Event()
+
+        def outer():
+            inner = Event()
+            pool.submit(inner.set)
+            inner.wait()
+            done.set()
+
+        pool.submit(outer)
+        self.assertTrue(done.wait(5))
+        pool.shutdown(wait=True)
+
+
+class BackendsCallTest(TestCase):
+    def setUp(self):
+        self.pool = WorkerPool(2)
+
+    def tearDown(self):
+        self.pool.shutdown(wait=True)
+
+    def test_results(self):
+        backends = [MyMockBackend('b%d' % i, range(3)) for i in range(5)]
+        results = list(BackendsCall(backends, 'iter_items', workers=self.pool))
+        self.assertEqual(sorted(results), sorted(list(range(3)) * 5))
+
+    def test_errors(self):
+        backends = [MyMockBackend('ok', [1]), MyMockBackend('ko', [2], ValueError('boom'))]
+        results = []
+        with self.assertRaises(CallErrors) as cm:
+            for result in BackendsCall(backends, 'iter_items', workers=self.pool):
+                results.append(result)
+
+        self.assertEqual(sorted(results), [1, 2])
+        self.assertEqual([backend.name for backend, error, backtrace in cm.exception], ['ko'])
+
+    def test_without_pool(self):
+        backends = [MyMockBackend('b%d' % i, [i]) for i in range(3)]
+        call = BackendsCall(backends, 'iter_items')
+        call.wait()
+        self.assertEqual(sorted(call), [0, 1, 2])
+
+    def test_callback_thread(self):
+        backends = [MyMockBackend('b%d' % i, [i]) for i in range(3)]
+        results = []
+        finished = Event()
+
+        call = BackendsCall(backends, 'iter_items', workers=self.pool)
+        call.callback_thread(results.append, None, finished.set)
+        self.assertTrue(finished.wait(5))
+        self.assertEqual(sorted(results), [0, 1, 2])
+
+    def test_stop(self):
+        release = Event()
+
+        def blocking(backend):
+            yield 1
+            release.wait()
+            yield 2
+
+        call = BackendsCall([MyMockBackend('a')], blocking, workers=self.pool)
+        for result in call:
+            self.assertEqual(result, 1)
+            call.stop()
+        release.set()
+        call.wait()
+
+    def test_stop_aborts_browser(self):
+        class MyMockBrowser(object):
+            def __init__(self):
+                self.aborted = Event()
+                self.reset = Event()
+
+            def abort(self):
+                self.aborted.set()
+
+            def reset_abort(self):
+                self.reset.set()
+
+        def request(backend):
+            yield 1
+            # Blocked on a request until it is aborted.
+            backend._browser.aborted.wait(5)
+            raise IOError('connection reset')
+
+        backend = MyMockBackend('a')
+        backend._browser = MyMockBrowser()
+        call = BackendsCall([backend], request, workers=self.pool)
+        for result in call:
+            call.stop()
+        call.wait()
+
+        self.assertTrue(backend._browser.aborted.is_set())
+        self.assertTrue(backend._browser.reset.is_set())
+        # The error caused by the abort is not reported.
+        self.assertEqual(call.errors, [])
+
+    def test_stop_after_call(self):
+        class MyMockBrowser(object):
+            aborted = False
+
+            def abort(self):
+                self.aborted = True
+
+            def reset_abort(self):
+                self.aborted = False
+
+        class MyStoppingBackend(MyMockBackend):
+            def __exit__(self, t, v, tb):
+                # Stopped when the call is over, but before the end of the
+                # task.
+                call.stop()
+                super(MyStoppingBackend, self).__exit__(t, v, tb)
+
+        backend = MyStoppingBackend('a', [1])
+        backend._browser = MyMockBrowser()
+        call = BackendsCall([backend], 'iter_items', workers=self.pool)
+        list(call)
+        call.wait()
+
+        # The browser is not left aborted.
+        self.assertFalse(backend._browser.aborted)
+
+    def test_max_buffered(self):
+        produced = {'fast': 0, 'slow': 0}
+        slow_done = Event()
+
+        def produce(backend):
+            for i in range(20):
+                produced[backend.name] += 1
+                yield (backend.name, i)
+            if backend.name == 'slow':
+                slow_done.set()
+
+        backends = [MyMockBackend('fast'), MyMockBackend('slow')]
+        call = BackendsCall(backends, produce, workers=self.pool, max_buffered=3)
+
+        # Without a consumer, each backend is paused when its buffer is full.
+        with call.cond:
+            while sum(call.buffered.values()) < 6:
+                call.cond.wait()
+        self.assertLessEqual(produced['fast'], 4)
+        self.assertLessEqual(produced['slow'], 4)
+        self.assertFalse(slow_done.is_set())
+
+        results = list(call)
+        self.assertEqual(len(results), 40)
+        self.assertEqual([i for name, i in results if name == 'slow'], list(range(20)))
+
+    def test_timeout(self):
+        release = Event()
+
+        def call(backend):
+            yield backend.name
+            if backend.name == 'slow':
+                release.wait()
+                yield 'too late'
+
+        backends = [MyMockBackend('fast'), MyMockBackend('slow')]
+        results = []
+        with self.assertRaises(CallErrors) as cm:
+            for result in BackendsCall(backends, call, workers=self.pool, timeout=0.2):
+                results.append(result)
+        release.set()
+
+        self.assertEqual(sorted(results), ['fast', 'slow'])
+        errors = list(cm.exception)
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0][0].name, 'slow')
+        self.assertIsInstance(errors[0][1], BackendTimeout)
+
+    def test_per_backend_timeout(self):
+        release = Event()
+        closed = []
+
+        def call(backend):
+            try:
+                yield 1
+                if backend.name == 'slow':
+                    release.wait()
+                    yield 2
+            finally:
+                closed.append(backend.name)
+
+        pool = WorkerPool(2)
+        backends = [MyMockBackend('slow'), MyMockBackend('fast')]
+        bcall = BackendsCall(backends, call, workers=pool, per_backend_timeout=0.2)
+        with self.assertRaises(CallErrors) as cm:
+            bcall.wait()
+        self.assertEqual([backend.name for backend, error, backtrace in cm.exception], ['slow'])
+
+        # The slow backend's generator is closed on its next result.
+        release.set()
+        pool.shutdown(wait=True)
+        self.assertEqual(sorted(closed), ['fast', 'slow'])
+        # Results returned in time are kept.
+        self.assertEqual([result for backend, result in bcall.responses], [1, 1])
+
+    def test_sort_key(self):
+        backends = [MyMockBackend('a', [9, 6, 3, 0]),
+                    MyMockBackend('b', [8, 5, 2]),
+                    MyMockBackend('c', [7, 4, 1, 1]),
+                    MyMockBackend('d', [])]
+        results = list(BackendsCall(backends, 'iter_items', workers=self.pool,
+                                    sort_key=lambda x: x, sort_reverse=True))
+        self.assertEqual(results, [9, 8, 7, 6, 5, 4, 3, 2, 1, 1, 0])
+
+    def test_sort_key_max_buffered(self):
+        # The second backend waits for the worker used by the first one.
+        pool = WorkerPool(1)
+        try:
+            backends = [MyMockBackend('a', range(10)), MyMockBackend('b', range(10))]
+            results = list(BackendsCall(backends, 'iter_items', workers=pool,
+                                        sort_key=lambda x: x, max_buffered=2))
+        finally:
+            pool.shutdown(wait=True)
+        self.assertEqual(results, sorted(list(range(10)) * 2))
+
+    def test_sort_key_streaming(self):
+        release = Event()
+
+        def call(backend):
+            yield backend.name
+            if backend.name == 'a':
+                release.wait()
+                yield 'c'
+
+        backends = [MyMockBackend('a'), MyMockBackend('b')]
+        results = []
+        for result in BackendsCall(backends, call, workers=self.pool, sort_key=lambda x: x):
+            # 'a' is yielded as soon as 'b' is known, before backend 'a' ends.
+            results.append(result)
+            release.set()
+        self.assertEqual(results, ['a', 'b', 'c'])
+
+    def test_reentrant(self):
+        backend = MyReentrantModule(None, 'a')
+        backend.browser.cookies['session'] = 'logged'
+        lock = Lock()
+        running = []
+        both = Event()
+
+        def call(backend):
+            browser = backend.browser
+            # Both calls run at the same time.
+            with lock:
+                running.append(browser)
+                if len(running) == 2:
+                    both.set()
+            self.assertTrue(both.wait(5))
+            yield browser
+
+        calls = [BackendsCall([backend], call, workers=self.pool) for _ in range(2)]
+        browsers = [result for c in calls for result in c]
+        self.assertIsNot(browsers[0], browsers[1])
+        # The new browser has been cloned from the logged in one.
+        self.assertEqual([b.cookies for b in browsers], [{'session': 'logged'}] * 2)
+        self.assertEqual(len(backend._idle_browsers), 2)
+        self.assertIn(backend.browser, browsers)
+
+    def test_max_browsers(self):
+        backend = MyLimitedReentrantModule(None, 'a')
+        lock = Lock()
+        running = []
+        browsers = []
+
+        def call(backend):
+            browser = backend.browser
+            with lock:
+                running.append(browser)
+                browsers.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.remove(browser)
+            yield browser
+
+        calls = [BackendsCall([backend], call, workers=self.pool) for _ in range(2)]
+        results = [result for c in calls for result in c]
+        # The second call waited for the browser of the first one.
+        self.assertIs(results[0], results[1])
+        self.assertEqual(browsers, [1, 1])
+        self.assertEqual(backend._browsers, [results[0]])
+
+    def test_stats(self):
+        hooked = []
+        finished = Event()
+
+        def hook(stats):
+            hooked.append(stats)
+            finished.set()
+
+        backends = [MyMockBackend('ok', range(3)), MyMockBackend('ko', [], ValueError('boom'))]
+        call = BackendsCall(backends, 'iter_items', workers=self.pool, stats_hook=hook)
+        self.assertRaises(CallErrors, list, call)
+        self.assertTrue(finished.wait(5))
+
+        self.assertEqual(hooked, [call.stats])
+        self.assertEqual(call.stats.function, 'iter_items')
+        self.assertEqual(call.stats['ok'].count, 3)
+        self.assertIsNotNone(call.stats['ok'].first_result)
+        self.assertIsNone(call.stats['ok'].error)
+        self.assertEqual(call.stats['ko'].count, 0)
+        self.assertIs(call.stats['ko'].error, ValueError)
+        self.assertGreaterEqual(call.stats.duration, call.stats['ok'].duration)
+        self.assertEqual(call.stats.to_dict()['function'], 'iter_items')
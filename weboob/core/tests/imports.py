@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+# Copyright(C) 2010-2014 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+import json
+import os
+import subprocess
+import sys
+from unittest import TestCase
+
+import weboob
+
+
+HEAVY = ('requests', 'urllib3', 'urllib.request', 'lxml', 'lxml.html', 'dateutil.parser', 'yaml',
+         'PIL', 'xlrd', 'pdfminer', 'html2text')
+
+# Heavy modules each module is allowed to import.
+BUDGET = {
+    'weboob.core': (),
+    'weboob.tools.backend': (),
+    'weboob.tools.date': (),
+    'weboob.capabilities.bank': (),
+    'weboob.browser': (),
+    'weboob.browser.filters.standard': (),
+    'weboob.browser.filters.json': (),
+    'weboob.browser.filters.html': (),
+    'weboob.browser.browsers': ('requests', 'urllib3', 'urllib.request'),
+}
+
+
+def imported_modules(name):
+    # A fresh interpreter is needed, as tests have already imported everything.
+    code = 'import sys, json, %s; print(json.dumps(sorted(sys.modules)))' % name
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([os.path.dirname(os.path.dirname(weboob.__file__))] +
+                                        [p for p in env.get('PYTHONPATH', '').split(os.pathsep) if p])
+    output = subprocess.check_output([sys.executable, '-c', code], env=env)
+    return set(json.loads(output.decode('utf-8')))
+
+
+class ImportBudgetTest(TestCase):
+    def test_budget(self):
+        for name, allowed in sorted(BUDGET.items()):
+            loaded = imported_modules(name)
+            self.assertIn(name, loaded)
+            self.assertEqual(sorted(m for m in HEAVY if m in loaded and m not in allowed), [],
+                             'heavy modules imported by %s' % name)
+
+    def test_lazy(self):
+        from weboob.browser.filters.html import CleanHTML
+        from weboob.browser import URL
+
+        self.assertEqual(CleanHTML('.').filter('<p>a <b>b</b></p>').strip(), u'a **b**')
+        self.assertEqual(URL('/a').urls, ['/a'])
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+# Copyright(C) 2010-2014 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+import os
+import shutil
+import sys
+import tempfile
+from unittest import TestCase
+
+from weboob.capabilities.bank import CapBank
+from weboob.capabilities.messages import CapMessages
+from weboob.core.modules import IndexedModule, ModulesLoader
+from weboob.core.ouiboube import WebNip
+
+
+MODULE_SOURCE = u'''
+from weboob.capabilities.bank import CapBank
+from weboob.tools.backend import BackendConfig, Module
+from weboob.tools.value import Value
+
+
+class %(klass)s(Module, CapBank):
+    NAME = '%(name)s'
+    VERSION = '1.6'
+    DESCRIPTION = u'Test module'
+    CONFIG = BackendConfig(Value('login', label='Login'))
+'''
+
+
+class ModulesIndexTest(TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.modules_dir = os.path.join(self.tmpdir, 'modules')
+        self.index_path = os.path.join(self.tmpdir, 'index')
+        os.mkdir(self.modules_dir)
+        self.write_module('indexedtest', 'IndexedTestModule')
+
+    def tearDown(self):
+        sys.modules.pop('indexedtest', None)
+        shutil.rmtree(self.tmpdir)
+
+    def write_module(self, name, klass):
+        path = os.path.join(self.modules_dir, name)
+        if not os.path.isdir(path):
+            os.mkdir(path)
+        with open(os.path.join(path, '__init__.py'), 'w') as f:
+            f.write(MODULE_SOURCE % {'name': name, 'klass': klass})
+
+    def test_index(self):
+        loader = ModulesLoader(self.modules_dir, '1.6', self.index_path)
+        loader.load_all()
+        self.assertIn('indexedtest', sys.modules)
+        self.assertTrue(os.path.exists(self.index_path))
+        sys.modules.pop('indexedtest')
+
+        # A new loader reads metadata from the index.
+        loader = ModulesLoader(self.modules_dir, '1.6', self.index_path)
+        module = loader.get_or_load_module('indexedtest')
+        self.assertIsInstance(module, IndexedModule)
+        self.assertEqual(module.name, 'indexedtest')
+        self.assertTrue(module.has_caps(CapBank))
+        self.assertTrue(module.has_caps('CapBank'))
+        self.assertFalse(module.has_caps(CapMessages))
+        self.assertIn(CapBank, list(module.iter_caps()))
+        self.assertEqual(list(module.config.keys()), ['login'])
+        self.assertNotIn('indexedtest', sys.modules)
+
+        # It is imported to build a backend.
+        weboob = WebNip(self.modules_dir)
+        backend = module.create_instance(weboob, 'test', {'login': 'foo'}, None)
+        weboob.deinit()
+        self.assertEqual(backend.config['login'].get(), 'foo')
+        self.assertIn('indexedtest', sys.modules)
+
+    def test_outdated(self):
+        ModulesLoader(self.modules_dir, '1.6', self.index_path).load_all()
+        sys.modules.pop('indexedtest')
+
+        # The module has been modified.
+        open(os.path.join(self.modules_dir, 'indexedtest', 'browser.py'), 'w').close()
+        loader = ModulesLoader(self.modules_dir, '1.6', self.index_path)
+        loader.load_module('indexedtest')
+        self.assertIn('indexedtest', sys.modules)
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+# Copyright(C) 2010-2014 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+import os
+from threading import Event, Thread
+from unittest import TestCase
+
+from weboob.capabilities.base import BaseObject, NotAvailable, NotLoaded
+from weboob.core.bcall import BackendsCall, CallErrors
+from weboob.core.process import BackendProcesses
+from weboob.core.workers import WorkerPool
+from weboob.tools.log import getLogger
+
+from .bcall import MyMockBackend, MyReentrantModule
+
+
+class MyMockProcessBackend(MyMockBackend):
+    _browser = None
+
+    def __init__(self, *args, **kwargs):
+        super(MyMockProcessBackend, self).__init__(*args, **kwargs)
+        self.logger = getLogger(self.name)
+        self.calls = 0
+
+    def iter_objects(self):
+        self.calls += 1
+        for i in range(3):
+            obj = BaseObject(str(i), url=NotAvailable)
+            obj.url = u'%s/%s' % (os.getpid(), self.calls)
+            yield obj
+
+    def get_object(self, id):
+        obj = BaseObject(id)
+        obj.backend = self.name
+        obj._link = u'/objects/%s' % id
+        return obj
+
+    def iter_links(self, obj):
+        yield obj.id
+        yield obj._link
+
+    def fail(self):
+        raise ValueError('boom')
+
+
+class MyReentrantProcessModule(MyReentrantModule):
+    def get_session(self):
+        return self.browser.cookies.get('session')
+
+
+class BackendProcessesTest(TestCase):
+    def setUp(self):
+        self.pool = WorkerPool(2)
+        self.processes = BackendProcesses()
+
+    def tearDown(self):
+        self.processes.close()
+        self.pool.shutdown(wait=True)
+
+    def call(self, backends, function, *args):
+        return list(BackendsCall(backends, function, *args, workers=self.pool,
+                                 executor='process', processes=self.processes))
+
+    def test_sticky(self):
+        backend = MyMockProcessBackend('a')
+        first = self.call([backend], 'iter_objects')
+        second = self.call([backend], 'iter_objects')
+
+        self.assertEqual([obj.id for obj in first], ['0', '1', '2'])
+        self.assertEqual(set(obj.backend for obj in first), set(['a']))
+        pids = set(obj.url.split('/')[0] for obj in first + second)
+        self.assertEqual(len(pids), 1)
+        self.assertNotEqual(pids.pop(), str(os.getpid()))
+        # state is kept in the process, not in this one.
+        self.assertEqual(second[0].url.split('/')[1], '2')
+        self.assertEqual(backend.calls, 0)
+
+    def test_constants(self):
+        obj, = self.call([MyMockProcessBackend('b', [BaseObject('1')])], 'iter_items')
+        self.assertIs(obj.url, NotLoaded)
+
+    def test_chain(self):
+        # An object returned by a call is given to the next one.
+        backend = MyMockProcessBackend('d')
+        obj, = self.call([backend], 'get_object', '123')
+        self.assertEqual((obj.id, obj.fullid), ('123', '123@d'))
+        self.assertEqual(self.call([backend], 'iter_links', obj), ['123', '/objects/123'])
+
+    def test_reentrant(self):
+        backend = MyReentrantProcessModule(None, 'e')
+        backend.browser.cookies['session'] = 'logged'
+        locked = Event()
+        release = Event()
+
+        def use_pool():
+            with backend._browsers_cond:
+                locked.set()
+                release.wait()
+
+        # Another thread uses the browsers pool while the process is forked.
+        thread = Thread(target=use_pool)
+        thread.start()
+        locked.wait()
+        try:
+            process = self.processes.get(backend)
+        finally:
+            release.set()
+            thread.join()
+        self.assertEqual(list(process.call('get_session', (), {})), ['logged'])
+
+    def test_error(self):
+        with self.assertRaises(CallErrors) as cm:
+            self.call([MyMockProcessBackend('c')], 'fail')
+        (backend, error, backtrace), = cm.exception
+        self.assertIsInstance(error, ValueError)
+        self.assertIn('boom', backtrace)
+
+    def test_callable(self):
+        self.assertRaises(TypeError, BackendsCall, [], lambda backend: None, executor='process')
@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+# Copyright(C) 2010-2014 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+import io
+import os
+import shutil
+import sys
+import tarfile
+import tempfile
+import time
+from contextlib import closing
+from unittest import TestCase
+
+try:
+    from http.server import SimpleHTTPRequestHandler
+except ImportError:
+    from SimpleHTTPServer import SimpleHTTPRequestHandler
+
+from weboob.core.repositories import IProgress, Repositories, Repository
+from weboob.tools.test import LocalServerTest
+
+
+MODULE_SOURCE = u'''
+from weboob.capabilities.bank import CapBank
+from weboob.tools.backend import Module
+
+
+class RepoTestModule(Module, CapBank):
+    NAME = '%(name)s'
+    VERSION = '1.6'
+    DESCRIPTION = u'%(description)s'
+'''
+
+
+class BuildIndexTest(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.index = os.path.join(self.path, Repository.INDEX)
+        # Modules were last modified one hour ago.
+        for name in ('repotesta', 'repotestb'):
+            self.write_module(name, time.time() - 3600)
+
+    def tearDown(self):
+        for name in ('repotesta', 'repotestb'):
+            sys.modules.pop(name, None)
+        shutil.rmtree(self.path)
+
+    def write_module(self, name, mtime=None, description=u'Test module'):
+        path = os.path.join(self.path, name)
+        if not os.path.isdir(path):
+            os.mkdir(path)
+        filename = os.path.join(path, '__init__.py')
+        with io.open(filename, 'w') as f:
+            f.write(MODULE_SOURCE % {'name': name, 'description': description})
+        if mtime is not None:
+            os.utime(filename, (mtime, mtime))
+
+    def build(self, **kwargs):
+        repository = Repository('http://')
+        repository.name = u'test'
+        if os.path.exists(self.index):
+            with io.open(self.index, 'r') as fp:
+                repository.parse_index(fp)
+        repository.build_index(self.path, self.index, **kwargs)
+        return repository
+
+    def test_incremental(self):
+        repository = self.build()
+        self.assertEqual(sorted(repository.modules), ['repotesta', 'repotestb'])
+        self.assertEqual(sorted(repository.modules['repotesta'].capabilities), ['CapBank', 'CapCollection'])
+
+        sys.modules.pop('repotesta')
+        sys.modules.pop('repotestb')
+        self.write_module('repotestb', description=u'Modified')
+        repository = self.build()
+
+        # Only the modified module is imported again.
+        self.assertNotIn('repotesta', sys.modules)
+        self.assertIn('repotestb', sys.modules)
+        self.assertEqual(repository.modules['repotesta'].description, u'Test module')
+        self.assertEqual(repository.modules['repotestb'].description, u'Modified')
+
+    def test_files_changed(self):
+        self.build()
+        sys.modules.pop('repotesta')
+        sys.modules.pop('repotestb')
+
+        # A file extracted from an archive keeps its older mtime.
+        filename = os.path.join(self.path, 'repotesta', 'pages.py')
+        with io.open(filename, 'w') as f:
+            f.write(u'')
+        os.utime(filename, (time.time() - 7200, time.time() - 7200))
+        self.build()
+        self.assertIn('repotesta', sys.modules)
+        self.assertNotIn('repotestb', sys.modules)
+
+        sys.modules.pop('repotesta')
+        os.remove(filename)
+        self.build()
+        self.assertIn('repotesta', sys.modules)
+        self.assertNotIn('repotestb', sys.modules)
+
+    def test_processes(self):
+        repository = self.build(processes=2)
+        self.assertEqual(sorted(repository.modules), ['repotesta', 'repotestb'])
+        self.assertEqual(repository.errors, {})
+        # Modules have been imported in child processes.
+        self.assertNotIn('repotesta', sys.modules)
+
+
+class MyProgress(IProgress):
+    def __init__(self):
+        self.messages = []
+        self.errors = []
+
+    def progress(self, percent, message):
+        self.messages.append(message)
+
+    def error(self, message):
+        self.errors.append(message)
+
+    def prompt(self, message):
+        return True
+
+
+class InstallTest(LocalServerTest):
+    HANDLER = SimpleHTTPRequestHandler
+    NAMES = ('repotestc', 'repotestd', 'repoteste')
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.source = os.path.join(self.tmpdir, 'source')
+        self.remote = os.path.join(self.tmpdir, 'remote')
+        self.local = os.path.join(self.tmpdir, 'local')
+        self.workdir = os.path.join(self.tmpdir, 'workdir')
+        for path in (self.source, self.remote, self.local, self.workdir):
+            os.mkdir(path)
+
+        for name in self.NAMES:
+            os.mkdir(os.path.join(self.source, name))
+            with io.open(os.path.join(self.source, name, '__init__.py'), 'w') as f:
+                f.write(MODULE_SOURCE % {'name': name, 'description': u'Test module'})
+            with closing(tarfile.open(os.path.join(self.remote, '%s.tar.gz' % name), 'w:gz')) as tar:
+                tar.add(os.path.join(self.source, name), arcname=name)
+
+        shutil.copytree(os.path.join(self.source, 'repotestc'), os.path.join(self.local, 'repotestc'))
+
+        # The HTTP server serves the current directory.
+        self.cwd = os.getcwd()
+        os.chdir(self.remote)
+        super(InstallTest, self).setUp()
+
+        repository = Repository(self.url)
+        repository.name = u'remote'
+        repository.build_index(self.source, os.path.join(self.remote, Repository.INDEX))
+
+        with io.open(os.path.join(self.workdir, Repositories.SOURCES_LIST), 'w') as f:
+            f.write(u'%s\nfile://%s\n' % (self.url, self.local))
+
+    def tearDown(self):
+        super(InstallTest, self).tearDown()
+        for name in self.NAMES:
+            sys.modules.pop(name, None)
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmpdir)
+
+    def test_install_modules(self):
+        progress = MyProgress()
+        repositories = Repositories(self.workdir, self.workdir, '1.6')
+        repositories.update_repositories(progress)
+
+        self.assertEqual(len(repositories.repositories), 2)
+        self.assertFalse(repositories.repositories[0].local)
+        self.assertTrue(repositories.repositories[1].local)
+        # Modules of the local repository take precedence.
+        self.assertTrue(repositories.get_module_info('repotestc').is_local())
+
+        errors = repositories.install_modules(['repotestc', 'repotestd', 'repoteste', 'nonexistent'], progress)
+        self.assertEqual(sorted(errors), ['nonexistent', 'repotestc'])
+        for name in ('repotestd', 'repoteste'):
+            self.assertTrue(os.path.exists(os.path.join(repositories.modules_dir, name, '__init__.py')))
+            self.assertEqual(repositories.versions.get(name), repositories.get_module_info(name).version)
+        self.assertIn('Module repoteste has been installed!', progress.messages)
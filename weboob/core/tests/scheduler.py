@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+# Copyright(C) 2010-2014 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+import time
+from threading import Event, Lock, active_count
+from unittest import TestCase
+
+from weboob.core.scheduler import HeapScheduler
+
+
+class HeapSchedulerTest(TestCase):
+    def setUp(self):
+        self.scheduler = HeapScheduler(max_workers=2)
+
+    def tearDown(self):
+        self.scheduler._wait_to_stop()
+
+    def test_schedule(self):
+        called = []
+        done = Event()
+
+        def call(name):
+            called.append(name)
+            if len(called) == 3:
+                done.set()
+
+        self.scheduler.schedule(0.2, call, 'c')
+        self.scheduler.schedule(0.1, call, 'b')
+        self.scheduler.schedule(0, call, 'a')
+        ev = self.scheduler.schedule(0.1, call, 'canceled')
+        self.assertTrue(self.scheduler.cancel(ev))
+        self.assertFalse(self.scheduler.cancel(ev))
+
+        self.assertTrue(done.wait(5))
+        self.assertEqual(called, ['a', 'b', 'c'])
+        self.assertEqual(self.scheduler.queue, {})
+
+    def test_repeat(self):
+        lock = Lock()
+        called = []
+        done = Event()
+
+        def call():
+            with lock:
+                called.append(1)
+                if len(called) == 3:
+                    done.set()
+            raise ValueError('repeated anyway')
+
+        ev = self.scheduler.repeat(0.01, call)
+        self.assertTrue(done.wait(5))
+        self.assertTrue(self.scheduler.cancel(ev))
+
+    def test_many_events(self):
+        threads = active_count()
+        done = Event()
+        called = []
+        lock = Lock()
+
+        def call():
+            with lock:
+                called.append(1)
+                if len(called) == 2000:
+                    done.set()
+
+        evs = [self.scheduler.repeat(60, call) for _ in range(1000)]
+        evs += [self.scheduler.schedule(0.1, call) for _ in range(1000)]
+        self.assertTrue(done.wait(10))
+        # The dispatcher and the workers.
+        self.assertLessEqual(active_count() - threads, 3)
+
+        for ev in evs[:1000]:
+            self.assertTrue(self.scheduler.cancel(ev))
+        self.assertEqual(self.scheduler.queue, {})
+        self.assertLessEqual(len(self.scheduler.heap), 64)
+
+    def test_cancel_while_running(self):
+        started = Event()
+        release = Event()
+        called = []
+
+        def call():
+            called.append(1)
+            started.set()
+            release.wait(5)
+
+        self.scheduler.repeat(60, call)
+        self.assertTrue(started.wait(5))
+
+        # The heap is rebuilt while the repeated function is running.
+        for ev in [self.scheduler.schedule(60, call) for _ in range(200)]:
+            self.scheduler.cancel(ev)
+        self.assertLess(len(self.scheduler.heap), 200)
+
+        time.sleep(0.1)
+        release.set()
+        self.assertEqual(called, [1])
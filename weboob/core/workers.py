@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2010-2014 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+
+from collections import deque
+from threading import Condition, Lock, Thread, current_thread
+
+from weboob.tools.log import getLogger
+from weboob.tools.misc import get_backtrace
+
+
+__all__ = ['WorkerPool']
+
+
+class WorkerPool(object):
+    """
+    Pool of reusable threads to run tasks.
+
+    Threads are started on demand, up to *max_workers*, and are kept alive
+    to run the next tasks. When every worker is busy, tasks are queued.
+
+    To prevent deadlocks, a task submitted from a worker of the pool itself
+    never waits in the queue: an extra worker is started if needed, and
+    stops as soon as the pool is back under its limit.
+
+    :param max_workers: maximum number of concurrent workers (None for no limit)
+    :type max_workers: :class:`int`
+    :param name: prefix of threads names
+    :type name: :class:`str`
+    """
+
+    def __init__(self, max_workers=None, name='worker'):
+        if max_workers is not None and max_workers < 1:
+            raise ValueError('max_workers must be greater than 0')
+
+        self.logger = getLogger('workers')
+        self.max_workers = max_workers
+        self.name = name
+
+        self.mutex = Lock()
+        self.cond = Condition(self.mutex)
+        self.tasks = deque()
+        self.workers = set()
+        self.idle = 0
+        self.active = 0
+        self.count = 0
+        self.closed = False
+
+    def submit(self, function, *args, **kwargs):
+        """
+        Schedule a call to a function on a worker.
+
+        :param function: function to call
+        :type function: callable
+        :param args: arguments to give to function
+        :param kwargs: keyword arguments to give to function
+        """
+        with self.mutex:
+            if self.closed:
+                raise RuntimeError('Unable to submit a task on a shut down pool')
+
+            self.tasks.append((function, args, kwargs))
+            if self.idle < len(self.tasks) and \
+               (self.max_workers is None or len(self.workers) < self.max_workers or
+                current_thread() in self.workers):
+                self._start_worker()
+            self.cond.notify()
+
+    def _start_worker(self):
+        self.count += 1
+        thread = Thread(target=self._worker_run, name='%s-%d' % (self.name, self.count))
+        thread.daemon = True
+        self.workers.add(thread)
+        thread.start()
+
+    def _worker_run(self):
+        thread = current_thread()
+        with self.mutex:
+            while True:
+                while not self.tasks and not self.closed:
+                    self.idle += 1
+                    self.cond.wait()
+                    self.idle -= 1
+
+                if not self.tasks:
+                    break
+
+                function, args, kwargs = self.tasks.popleft()
+                self.active += 1
+                self.mutex.release()
+                try:
+                    function(*args, **kwargs)
+                except Exception:
+                    self.logger.error('Uncaught exception in worker:\n%s', get_backtrace())
+                finally:
+                    self.mutex.acquire()
+                    self.active -= 1
+
+                if self.max_workers is not None and len(self.workers) > self.max_workers:
+                    # This is an extra worker started by a nested call.
+                    break
+
+            self.workers.discard(thread)
+
+    @property
+    def queue_depth(self):
+        """Number of tasks waiting for a free worker."""
+        with self.mutex:
+            return len(self.tasks)
+
+    @property
+    def active_workers(self):
+        """Number of workers currently running a task."""
+        with self.mutex:
+            return self.active
+
+    def stats(self):
+        """
+        Get a snapshot of the pool usage.
+
+        :rtype: :class:`dict`
+        """
+        with self.mutex:
+            return {'max_workers': self.max_workers,
+                    'workers': len(self.workers),
+                    'active': self.active,
+                    'idle': self.idle,
+                    'queued': len(self.tasks),
+                   }
+
+    def shutdown(self, wait=False):
+        """
+        Stop workers once every queued task is done.
+
+        :param wait: if True, block until every worker is stopped
+        :type wait: bool
+        """
+        with self.mutex:
+            self.closed = True
+            self.cond.notify_all()
+            workers = list(self.workers)
+
+        if wait:
+            for thread in workers:
+                if thread is not current_thread():
+                    thread.join()
@@ -32,6 +32,7 @@ import os
 from weboob.capabilities import UserError
 from weboob.capabilities.account import CapAccount, Account, AccountRegisterError
 from weboob.core.backendscfg import BackendAlreadyExists
+from weboob.core.bcall import BackendTimeout
 from weboob.core.repositories import IProgress
 from weboob.exceptions import BrowserUnavailable, BrowserIncorrectPassword, BrowserForbidden, \
                               BrowserSSLError, BrowserQuestion, BrowserHTTPSDowngrade, \
@@ -612,6 +613,8 @@ class ConsoleApplication(Application):
             print(u'Hint: There are more results for backend %s' % (backend.name), file=self.stderr)
         elif isinstance(error, NoAccountsException):
             print(u'Error(%s): %s' % (backend.name, to_unicode(error) or 'No account on this backend'), file=self.stderr)
+        elif isinstance(error, BackendTimeout):
+            print(u'Error(%s): %s' % (backend.name, to_unicode(error)), file=self.stderr)
         else:
             print(u'Bug(%s): %s' % (backend.name, to_unicode(error)), file=self.stderr)
 
@@ -19,7 +19,7 @@
 
 import os
 from copy import copy
-from threading import RLock
+from threading import Condition, RLock, local
 
 from weboob.capabilities.base import BaseObject, Capability, FieldNotFound, NotAvailable, NotLoaded
 from weboob.exceptions import ModuleInstallError
@@ -260,6 +260,22 @@ class Module(object):
     the module's directory, and keep the ICON value to None.
     """
 
+    REENTRANT = False
+    """If True, several calls can run concurrently on a backend.
+
+    Instead of being locked for the whole call, the backend gives each
+    thread its own browser, taken from a pool. New browsers are cloned from
+    the state of the last one released, and the state saved in storage is
+    the one of the last finished call.
+    """
+
+    MAX_BROWSERS = None
+    """Maximum number of browsers of a :attr:`REENTRANT` backend.
+
+    Once they are all in use, calls wait for one to be released. If None,
+    the `MAX_WORKERS` of :attr:`BROWSER` is used.
+    """
+
     OBJECTS = {}
     """Supported objects to fill
 
@@ -275,10 +291,21 @@ class Module(object):
         """
 
     def __enter__(self):
-        self.lock.acquire()
+        if not self.REENTRANT:
+            self.lock.acquire()
+            return
+
+        self._local.depth = getattr(self._local, 'depth', 0) + 1
 
     def __exit__(self, t, v, tb):
-        self.lock.release()
+        if not self.REENTRANT:
+            self.lock.release()
+            return
+
+        self._local.depth -= 1
+        if not self._local.depth and getattr(self._local, 'browser', None) is not None:
+            self._release_browser(self._local.browser)
+            self._local.browser = None
 
     def __repr__(self):
         return "<Backend %r>" % self.name
@@ -298,6 +325,12 @@ class Module(object):
         self.weboob = weboob
         self.name = name
         self.lock = RLock()
+        # Browsers pool of re-entrant modules.
+        self._local = local()
+        self._browsers_cond = Condition()
+        self._browsers = []
+        self._idle_browsers = []
+        self._browser_state = None
         if config is None:
             config = {}
 
@@ -325,8 +358,9 @@ class Module(object):
         try:
             self.dump_state()
         finally:
-            if hasattr(self.browser, 'deinit'):
-                self.browser.deinit()
+            for browser in [b for b in self._browsers if b is not None] or [self._browser]:
+                if hasattr(browser, 'deinit'):
+                    browser.deinit()
 
     _browser = None
 
@@ -337,11 +371,72 @@ class Module(object):
         of this attribute, to avoid useless pages access.
 
         Note that the :func:`create_default_browser` method is called to create it.
+
+        For a :attr:`REENTRANT` module, each thread in a call gets its own
+        browser.
         """
+        if self.REENTRANT and getattr(self._local, 'depth', 0):
+            if getattr(self._local, 'browser', None) is None:
+                self._local.browser = self._acquire_browser()
+            return self._local.browser
+
         if self._browser is None:
             self._browser = self.create_default_browser()
+            if self.REENTRANT:
+                with self._browsers_cond:
+                    self._browsers.append(self._browser)
+                    self._idle_browsers.append(self._browser)
         return self._browser
 
+    def _acquire_browser(self):
+        """
+        Take a browser from the pool of a re-entrant module, or create a
+        new one if they are all in use, unless there are already
+        :attr:`MAX_BROWSERS` browsers.
+        """
+        limit = self.MAX_BROWSERS or getattr(self.BROWSER, 'MAX_WORKERS', None)
+        with self._browsers_cond:
+            while not self._idle_browsers and limit and len(self._browsers) >= limit:
+                self._browsers_cond.wait()
+            if self._idle_browsers:
+                browser = self._idle_browsers.pop()
+                if self._browser_state is None and hasattr(browser, 'dump_state'):
+                    # It is not in use, so it can be dumped to clone it.
+                    self._browser_state = browser.dump_state()
+                return browser
+            # Reserve the place of the new browser.
+            self._browsers.append(None)
+            state = self._browser_state
+
+        try:
+            browser = self.create_default_browser()
+            if state is not None and hasattr(browser, 'load_state'):
+                # Clone the session of an already logged in browser.
+                browser.load_state(state)
+        except BaseException:
+            with self._browsers_cond:
+                self._browsers.remove(None)
+                self._browsers_cond.notify()
+            raise
+
+        with self._browsers_cond:
+            self._browsers[self._browsers.index(None)] = browser
+            if self._browser is None:
+                self._browser = browser
+        return browser
+
+    def _release_browser(self, browser):
+        # Browsers in use by other threads can't be dumped consistently, so
+        # keep the state of this one while it is still ours.
+        state = browser.dump_state() if hasattr(browser, 'dump_state') else None
+        with self._browsers_cond:
+            self._idle_browsers.append(browser)
+            # Its state is the most recent one.
+            self._browser = browser
+            if state is not None:
+                self._browser_state = state
+            self._browsers_cond.notify()
+
     def create_default_browser(self):
         """
         Method to overload to build the default browser in
@@ -378,6 +473,8 @@ class Module(object):
             kwargs.setdefault('responses_dirname', self._private_config['_debug_dir'])
         if self._private_config.get('_highlight_el', ''):
             kwargs.setdefault('highlight_el', bool(int(self._private_config['_highlight_el'])))
+        if getattr(klass, 'PERSISTENT_CACHE', False) and self.http_cache is not None:
+            kwargs.setdefault('cache', self.http_cache)
 
         browser = klass(*args, **kwargs)
 
@@ -386,6 +483,29 @@ class Module(object):
 
         return browser
 
+    HTTP_CACHE_FILENAME = 'http_cache.sqlite'
+
+    @property
+    def http_cache(self):
+        """
+        Persistent HTTP cache of the backend, shared by its browsers.
+
+        It is None if weboob has no data directory.
+
+        :rtype: :class:`weboob.browser.cache.SQLiteCacheStore`
+        """
+        if self._http_cache is None:
+            repositories = getattr(self.weboob, 'repositories', None)
+            if repositories is None:
+                return None
+
+            from weboob.browser.cache import SQLiteCacheStore
+            self._http_cache = SQLiteCacheStore(os.path.join(repositories.datadir, self.HTTP_CACHE_FILENAME),
+                                                namespace=self.name)
+        return self._http_cache
+
+    _http_cache = None
+
     def get_proxy(self):
         # Get proxies from environment variables
         proxies = getproxies()
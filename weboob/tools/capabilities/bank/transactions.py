@@ -17,7 +17,7 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with weboob. If not, see <http://www.gnu.org/licenses/>.
 
-from collections import OrderedDict
+import heapq
 from decimal import Decimal, InvalidOperation
 import datetime
 import re
@@ -319,24 +319,10 @@ def merge_iterators(*iterables):
     Each iterator must already be sorted in reverse chronological order.
     """
 
-    def keyfunc(kv):
-        return (kv[1].date, kv[1].rdate)
+    def keyfunc(tr):
+        return (tr.date, tr.rdate)
 
-    its = OrderedDict((iter(it), None) for it in iterables)
-    for k in list(its):
-        try:
-            its[k] = next(k)
-        except StopIteration:
-            del its[k]
-
-    while its:
-        k, v = max(its.items(), key=keyfunc)
-        yield v
-
-        try:
-            its[k] = next(k)
-        except StopIteration:
-            del its[k]
+    return heapq.merge(*iterables, key=keyfunc, reverse=True)
 
 
 def keep_only_card_transactions(it, match_func=None):
@@ -121,7 +121,11 @@ except ImportError:
         urlparse, urlunparse, urlsplit, urlunsplit, urljoin, urlencode,
         quote, quote_plus, unquote, unquote_plus, parse_qsl, parse_qs,
     )
-    from urllib.request import getproxies
+
+    def getproxies():
+        # urllib.request is slow to import, and only needed to build browsers.
+        from urllib.request import getproxies
+        return getproxies()
 
 def unpickle(pickled_data):
     if sys.version_info.major < 3:
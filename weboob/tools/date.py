@@ -17,20 +17,20 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with weboob. If not, see <http://www.gnu.org/licenses/>.
 
-import dateutil.parser
 from datetime import date as real_date, datetime as real_datetime, timedelta
 import time
 import re
-try:
-    from dateutil import tz
-except ImportError:
-    raise ImportError('Please install python3-dateutil')
 
 from .compat import range
+from .lazy import lazy_import
 
 __all__ = ['local2utc', 'utc2local', 'LinearDateGuesser', 'date', 'datetime', 'new_date', 'new_datetime', 'closest_date']
 
 
+dateutil_parser = lazy_import('dateutil.parser')
+tz = lazy_import('dateutil.tz')
+
+
 def local2utc(dateobj):
     dateobj = dateobj.replace(tzinfo=tz.tzlocal())
     dateobj = dateobj.astimezone(tz.tzutc())
@@ -305,7 +305,7 @@ def parse_french_date(date, **kwargs):
     if 'dayfirst' not in kwargs:
         kwargs['dayfirst'] = True
 
-    return dateutil.parser.parse(date, **kwargs)
+    return dateutil_parser.parse(date, **kwargs)
 
 
 WEEK   = {'MONDAY': 0,
@@ -18,15 +18,16 @@
 # along with weboob. If not, see <http://www.gnu.org/licenses/>.
 
 from weboob.tools.compat import unicode
+from weboob.tools.lazy import lazy_import
 
 __all__ = ['html2text']
 
 
-from html2text import HTML2Text
+_html2text = lazy_import('html2text')
 
 
 def html2text(html, **options):
-    h = HTML2Text()
+    h = _html2text.HTML2Text()
     defaults = dict(
         unicode_snob=True,
         skip_internal_links=True,
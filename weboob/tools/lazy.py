@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+# Copyright(C) 2010-2014 Romain Bignon
+#
+# This file is part of weboob.
+#
+# weboob is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# weboob is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with weboob. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Helpers to defer imports of heavy dependencies until they are used.
+
+For example, a filter which only needs :mod:`lxml.html` to check the type
+of its result does not need to load it when the module is imported:
+
+>>> html = lazy_import('lxml.html')
+>>> html.fromstring('<p>ok</p>').text
+'ok'
+"""
+
+from importlib import import_module
+import sys
+from types import ModuleType
+
+
+__all__ = ['lazy_import', 'lazy_attributes', 'LazyModule']
+
+
+class LazyModule(object):
+    """
+    Proxy to a module which is imported on first access to one of its
+    attributes.
+
+    :param name: absolute name of the module
+    :type name: :class:`str`
+    """
+
+    def __init__(self, name):
+        self.__dict__['_lazy_name'] = name
+        self.__dict__['_lazy_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_lazy_module']
+        if module is None:
+            module = import_module(self._lazy_name)
+            self.__dict__['_lazy_module'] = module
+        return module
+
+    @property
+    def loaded(self):
+        """True if the module is already imported, by anyone."""
+        return self.__dict__['_lazy_module'] is not None or self._lazy_name in sys.modules
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        if self.__dict__['_lazy_module'] is None:
+            return '<lazy module %r (not loaded)>' % self._lazy_name
+        return '<lazy module %r>' % self._lazy_name
+
+
+def lazy_import(name):
+    """
+    Get a module which is imported only when one of its attributes is
+    accessed. If it is already imported, the real module is returned.
+
+    :param name: absolute name of the module
+    :type name: :class:`str`
+    :rtype: :class:`LazyModule` or module
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
+
+
+class _LazyAttributesModule(ModuleType):
+    def __getattr__(self, attr):
+        try:
+            submodule = self.__dict__['_lazy_attributes'][attr]
+        except KeyError:
+            raise AttributeError('module %r has no attribute %r' % (self.__name__, attr))
+
+        value = getattr(import_module(submodule, self.__name__), attr)
+        setattr(self, attr, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | set(self._lazy_attributes))
+
+
+def lazy_attributes(name, attributes):
+    """
+    Make attributes of a package be imported from its submodules only when
+    they are accessed, so importing one of its submodules does not import
+    the others.
+
+    It is called from the ``__init__`` of the package:
+
+    >>> lazy_attributes(__name__, {'Browser': '.browsers'})  # doctest: +SKIP
+
+    :param name: name of the package
+    :type name: :class:`str`
+    :param attributes: names of attributes, with the (relative) submodule
+                       where they are defined
+    :type attributes: :class:`dict`
+    """
+    module = sys.modules[name]
+    module._lazy_attributes = dict(attributes)
+    module.__class__ = _LazyAttributesModule
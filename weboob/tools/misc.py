@@ -154,6 +154,8 @@ def ratelimit(group, delay):
 
     This function is not thread-safe. For reasonably non-critical rate
     limiting (like accessing a website), it should be sufficient nevertheless.
+    Browsers should rather use
+    :attr:`weboob.browser.browsers.Browser.RATE_LIMIT`.
 
     @param group [string]  rate limiting group name, alphanumeric
     @param delay [int]  delay in seconds between each call
@@ -20,8 +20,16 @@
 from __future__ import print_function
 import sys
 from functools import wraps
+from threading import Thread
 from unittest import TestCase
 
+try:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+
 from weboob.capabilities.base import empty
 from weboob.core import Weboob
 
@@ -33,7 +41,7 @@ except:
     from nose.plugins.skip import SkipTest
 
 
-__all__ = ['BackendTest', 'SkipTest', 'skip_without_config']
+__all__ = ['BackendTest', 'LocalServerTest', 'SkipTest', 'skip_without_config']
 
 
 class BackendTest(TestCase):
@@ -124,3 +132,32 @@ def skip_without_config(*keys):
             return func(self, *args, **kwargs)
         return wrapper
     return decorator
+
+
+class LocalServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class LocalServerTest(TestCase):
+    """
+    Run a local HTTP server during each test, to test browsers without
+    network access.
+
+    Requests are handled by :attr:`HANDLER` in threads, and the server is
+    available as `self.server`, at `self.url`.
+    """
+
+    HANDLER = BaseHTTPRequestHandler
+
+    def setUp(self):
+        # Do not log every request on stderr.
+        handler = type(self.HANDLER.__name__, (self.HANDLER,), {'log_message': lambda self, *args: None})
+        self.server = LocalServer(('127.0.0.1', 0), handler)
+        self.thread = Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.url = 'http://127.0.0.1:%d/' % self.server.server_address[1]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()